@@ -10,13 +10,14 @@ class CustomUserAdmin(UserAdmin):
 
     # Show these columns in the list view
     list_display = ('username', 'email', 'user_type', 'student_id', 'department')
+    readonly_fields = ('face_encoding_version',)
     
     fieldsets = (
         (None, {'fields': ('username', 'password')}),
         ('Personal Info', {'fields': ('first_name', 'last_name', 'email', 'phone_number')}),
         ('Academic Info', {'fields': ('student_id', 'department')}),
         # Add the Profile Image field here so you can upload it
-        ('Face Data', {'fields': ('profile_image',)}), 
+        ('Face Data', {'fields': ('profile_image', 'face_encoding_version')}), 
         ('Reference Data',{'fields': ('reference_image',)}),
         ('Permissions', {'fields': ('is_active', 'is_staff', 'is_superuser', 'user_type')}),
     )
@@ -5,3 +5,6 @@ class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.accounts'
     label = 'accounts'  # This sets the app label to 'accounts' instead of 'apps_accounts'
+
+    def ready(self):
+        import apps.accounts.signals  # This loads the signals
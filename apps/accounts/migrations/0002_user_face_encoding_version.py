@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-17 03:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='face_encoding_source',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='face_encoding_version',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+    ]
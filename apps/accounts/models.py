@@ -24,6 +24,9 @@ class User(AbstractUser):
     reference_image = models.ImageField(upload_to='security_references/', blank=True, null=True)
     # Stores the mathematical representation of the face for AI comparison
     face_encoding = models.BinaryField(null=True, blank=True)
+    # Model/version tag and source image of face_encoding (used to detect stale encodings)
+    face_encoding_version = models.CharField(max_length=50, blank=True, default='')
+    face_encoding_source = models.CharField(max_length=255, blank=True, default='')
 
     def __str__(self):
         return f"{self.username} ({self.user_type})"
@@ -0,0 +1,38 @@
+# accounts/signals.py
+import logging
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+FACE_IMAGE_FIELDS = {'profile_image', 'reference_image'}
+
+
+@receiver(post_save, sender=User)
+def refresh_reference_encoding(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Compute the stored face encoding once, whenever signup or the admin
+    saves a new reference_image / profile_image
+    """
+    if raw:
+        return
+    if update_fields is not None and not FACE_IMAGE_FIELDS & set(update_fields):
+        return
+    if not (instance.reference_image or instance.profile_image or instance.face_encoding):
+        return
+
+    # Imported here so that loading the accounts app does not pull in dlib
+    from apps.attendance.utils import face_encoding_checked, refresh_face_encoding
+
+    # Already encoded, or already known to have no usable face
+    if face_encoding_checked(instance):
+        return
+
+    try:
+        refresh_face_encoding(instance)
+    except Exception as e:
+        # Never block signup/admin saves; verification recomputes lazily
+        logger.warning("Face encoding failed for %s: %s", instance.username, e)
@@ -1,17 +1,25 @@
 # apps/accounts/views.py - COMPLETE VERSION
 
 from django.shortcuts import render, redirect
+from django.http import JsonResponse
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.middleware.csrf import get_token
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.db.models import Sum
 
 from .models import User, Subject
-from apps.attendance.models import AttendanceSession, AttendanceRecord
+from apps.attendance.models import AttendanceSession, AttendanceSummary
+from apps.attendance import dashboard as dashboard_cache
 from django.core.files.base import ContentFile
 import base64
+import logging
 from .forms import CustomUserCreationForm
+
+logger = logging.getLogger(__name__)
+
 def signup(request):
     if request.method == 'POST':
         form = CustomUserCreationForm(request.POST, request.FILES) # Note: Added request.FILES
@@ -38,7 +46,7 @@ def signup(request):
                         user.profile_image = file_data # Fallback
                         
                 except Exception as e:
-                    print(f"Error saving image: {e}")
+                    logger.warning("Error saving signup image for %s: %s", user.username, e)
 
             # 3. Save User & Login
             user.save()
@@ -46,9 +54,8 @@ def signup(request):
             return redirect('dashboard')
             
         else:
-            # --- CRITICAL: Print errors to terminal so you know WHY it failed ---
-            print("❌ SIGNUP FAILED. Form Errors:")
-            print(form.errors)
+            # --- CRITICAL: Log errors so you know WHY it failed ---
+            logger.info("Signup failed: %s", form.errors.as_json())
     else:
         form = CustomUserCreationForm()
     
@@ -92,47 +99,29 @@ def dashboard(request):
     
     # === STUDENT DASHBOARD ===
     if user.user_type == 'student':
-        from datetime import datetime, timedelta
-        import json
-        
-        # Get active sessions
-        active_sessions = AttendanceSession.objects.filter(
-            is_active=True
-        ).select_related('subject', 'teacher').order_by('-start_time')
-        
-        # Get sessions where student already marked attendance
-        marked_session_ids = AttendanceRecord.objects.filter(
-            student=user,
-            session__in=active_sessions
-        ).values_list('session_id', flat=True)
-        
-        # Get attendance history (last 30 days)
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        attendance_history = AttendanceRecord.objects.filter(
-            student=user,
-            timestamp__gte=thirty_days_ago
-        ).select_related('session__subject', 'session__teacher').order_by('-timestamp')[:20]
-        
-        # Prepare calendar data
-        # Get all attendance records for calendar display
-        all_attendance = AttendanceRecord.objects.filter(
-            student=user
-        ).values('timestamp__date', 'status')
+        # Active sessions and history come from the fragment cache, marks are read fresh
+        active_sessions = dashboard_cache.active_sessions()
+        marked_session_ids = dashboard_cache.marked_session_ids(user, active_sessions)
+        attendance_history = dashboard_cache.attendance_history(user)
         
-        # Build calendar data dictionary
-        attendance_calendar = {}
-        for record in all_attendance:
-            date_str = record['timestamp__date'].strftime('%Y-%m-%d')
-            # If present on any session that day, mark as present
-            if date_str not in attendance_calendar or record['status'] == 'present':
-                attendance_calendar[date_str] = record['status']
+        # Per-subject totals (materialized per subject and teacher, summed per subject)
+        subject_summaries = list(
+            AttendanceSummary.objects.filter(student=user)
+            .values('subject_id', 'subject__name')
+            .annotate(present=Sum('present_count'), held=Sum('total_sessions'))
+            .order_by('subject__name')
+        )
+        present_total = sum(s['present'] for s in subject_summaries)
+        sessions_total = sum(s['held'] for s in subject_summaries)
+        attendance_rate = round(present_total * 100 / sessions_total) if sessions_total else None
         
         return render(request, 'student_dashboard.html', {
             'user': user,
             'active_sessions': active_sessions,
-            'marked_session_ids': list(marked_session_ids),
+            'marked_session_ids': marked_session_ids,
             'attendance_history': attendance_history,
-            'attendance_calendar': json.dumps(attendance_calendar),  # JSON for JavaScript
+            'subject_summaries': subject_summaries,
+            'attendance_rate': attendance_rate,
         })
     
     # === FACULTY DASHBOARD ===
@@ -164,4 +153,30 @@ def dashboard(request):
         return redirect('/admin/')
     
     # Fallback
-    return redirect('home')
\ No newline at end of file
+    return redirect('home')
+
+
+@login_required
+def attendance_calendar(request):
+    """
+    One month of the student's attendance calendar, fetched by the dashboard
+    as the student navigates: ?month=YYYY-MM (default: this month)
+    """
+    today = timezone.localdate()
+    try:
+        year, month = map(int, request.GET.get('month', f'{today.year}-{today.month}').split('-'))
+        if not 1 <= month <= 12 or not 1 <= year <= 9998:
+            raise ValueError
+    except ValueError:
+        return JsonResponse({'error': 'month must be YYYY-MM'}, status=400)
+
+    response = JsonResponse({
+        'month': f'{year}-{month:02d}',
+        'days': dashboard_cache.attendance_calendar(request.user, year, month),
+    })
+    # Past months no longer change; the browser may keep them for a while
+    if (year, month) < (today.year, today.month):
+        patch_cache_control(response, private=True, max_age=3600)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import AttendanceSession, AttendanceRecord
+from .models import AttendanceSession, AttendanceRecord, AttendanceSummary
 
 @admin.register(AttendanceSession)
 class AttendanceSessionAdmin(admin.ModelAdmin):
@@ -9,4 +9,9 @@ class AttendanceSessionAdmin(admin.ModelAdmin):
 @admin.register(AttendanceRecord)
 class AttendanceRecordAdmin(admin.ModelAdmin):
     list_display = ('student', 'session', 'timestamp', 'status')
-    list_filter = ('session', 'status')
\ No newline at end of file
+    list_filter = ('session', 'status')
+
+@admin.register(AttendanceSummary)
+class AttendanceSummaryAdmin(admin.ModelAdmin):
+    list_display = ('student', 'subject', 'teacher', 'present_count', 'total_sessions', 'last_marked')
+    list_filter = ('subject', 'teacher')
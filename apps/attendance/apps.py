@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class AttendanceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.attendance'
+
+    def ready(self):
+        # With gunicorn's preload_app (gunicorn.conf.py) this runs once in the
+        # master, so the dlib models are loaded before the workers fork and
+        # their memory is shared copy-on-write instead of loaded per worker
+        if getattr(settings, 'FACE_PRELOAD_MODELS', False):
+            from .utils import warm_up_face_models
+            warm_up_face_models()
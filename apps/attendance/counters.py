@@ -0,0 +1,121 @@
+# apps/attendance/counters.py - PER-SESSION ATTENDANCE COUNTERS
+#
+# The present/pending totals of each session live in the 'attendance' cache
+# (settings.CACHES), so monitor_session, session_details and the live feed
+# read them in O(1) instead of counting records. Every path that creates,
+# promotes or deletes a record adjusts them. A counter that is missing
+# (cold cache, evicted, expired) is rebuilt from the records on the next
+# read; end_session and bulk inserts reconcile from the records directly.
+#
+# Concurrent marks from several workers are only counted right when incr is
+# atomic. It is on Redis/Memcached; on the default file cache (whose incr is
+# a get then a set) the writes are serialized by an flock on a lock file in
+# the cache directory, which covers the workers of one host, the same ones
+# that share the cache. With any other backend (local memory, database, ...)
+# or without fcntl the totals are counted from the records on each read, one
+# aggregate over the (session, status) index.
+
+import os
+from contextlib import contextmanager, nullcontext
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Q
+
+from .models import AttendanceRecord
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, the file cache is not used for counters
+    fcntl = None
+
+COUNTED_STATUSES = {'present': 'present', 'pending': 'PENDING'}
+
+# Backends whose incr() is a single atomic server-side operation
+ATOMIC_INCR_BACKENDS = (
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+)
+
+
+def _cache():
+    return caches['attendance']
+
+
+FILE_CACHE_BACKEND = 'django.core.cache.backends.filebased.FileBasedCache'
+LOCK_FILE_NAME = 'session-counters.lock'
+
+
+def counters_cached():
+    backend = settings.CACHES['attendance']['BACKEND']
+    return backend in ATOMIC_INCR_BACKENDS or (backend == FILE_CACHE_BACKEND and fcntl is not None)
+
+
+@contextmanager
+def _file_cache_lock():
+    directory = settings.CACHES['attendance']['LOCATION']
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE_NAME), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _counter_write_lock():
+    """Serializes counter writes where the backend's incr is not atomic"""
+    if settings.CACHES['attendance']['BACKEND'] == FILE_CACHE_BACKEND:
+        return _file_cache_lock()
+    return nullcontext()
+
+
+def count_session_records(session_id):
+    return AttendanceRecord.objects.filter(session_id=session_id).aggregate(**{
+        name: Count('id', filter=Q(status=status)) for name, status in COUNTED_STATUSES.items()
+    })
+
+
+def counter_key(session_id, name):
+    return f'attendance:session:{session_id}:{name}'
+
+
+def reconcile_session_counters(session_id):
+    """Recount the session's records and store the result; returns the counts"""
+    if not counters_cached():
+        return count_session_records(session_id)
+    with _counter_write_lock():
+        counts = count_session_records(session_id)
+        _cache().set_many(
+            {counter_key(session_id, name): count for name, count in counts.items()},
+            settings.ATTENDANCE_COUNTER_TTL,
+        )
+    return counts
+
+
+def session_counters(session_id):
+    """{'present': n, 'pending': n} for a session"""
+    if not counters_cached():
+        return count_session_records(session_id)
+    keys = {counter_key(session_id, name): name for name in COUNTED_STATUSES}
+    cached = _cache().get_many(keys)
+    if len(cached) < len(keys):
+        return reconcile_session_counters(session_id)
+    return {name: cached[key] for key, name in keys.items()}
+
+
+def adjust_session_counters(session_id, present=0, pending=0):
+    """Apply a record change that has already been saved"""
+    if not counters_cached():
+        return
+    cache = _cache()
+    with _counter_write_lock():
+        for name, delta in (('present', present), ('pending', pending)):
+            if not delta:
+                continue
+            try:
+                cache.incr(counter_key(session_id, name), delta)
+            except ValueError:
+                # Not cached: the next read counts the records, this change included
+                pass
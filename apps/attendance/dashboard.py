@@ -0,0 +1,152 @@
+# apps/attendance/dashboard.py - STUDENT DASHBOARD FRAGMENT CACHE
+#
+# The student dashboard is hit by every student at the start of a lecture.
+# Its fragments are cached in the 'attendance' cache:
+#   active sessions  - shared by all students, short TTL
+#                      (DASHBOARD_ACTIVE_SESSIONS_TTL), dropped when a
+#                      session starts or ends
+#   history          - per student (DASHBOARD_STUDENT_TTL), dropped when the
+#                      student's records change or a session they were
+#                      marked in ends
+#   calendar month   - per student and month, grouped by day in the
+#                      database and fetched by the page one month at a time
+#                      (accounts.views.attendance_calendar); marks only ever
+#                      land in the current month, so only that one (and the
+#                      previous, around midnight on the 1st) is dropped
+# Which active sessions the student is already marked in decides whether
+# the page offers "Mark attendance", so it is read fresh on every load (one
+# indexed query) rather than cached.
+# Lookups are counted in the attendance_dashboard_cache_total metric. The
+# cache must be shared by all workers (settings.CACHES) for an invalidation
+# in one process to reach the others.
+
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Case, IntegerField, Max, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import AttendanceSession, AttendanceRecord
+from .metrics import DASHBOARD_CACHE_LOOKUPS
+
+ACTIVE_SESSIONS_KEY = 'attendance:dashboard:active_sessions'
+STUDENT_FRAGMENTS = ('history',)
+
+
+def _cache():
+    return caches['attendance']
+
+
+def student_key(student_id, fragment):
+    return f'attendance:dashboard:{student_id}:{fragment}'
+
+
+def _cached(key, fragment, timeout, build):
+    cache = _cache()
+    value = cache.get(key)
+    if value is not None:
+        DASHBOARD_CACHE_LOOKUPS.inc(fragment=fragment, result='hit')
+        return value
+    DASHBOARD_CACHE_LOOKUPS.inc(fragment=fragment, result='miss')
+    value = build()
+    cache.set(key, value, timeout)
+    return value
+
+
+def active_sessions():
+    """Active sessions, newest first (only the fields the dashboard shows)"""
+    return _cached(
+        ACTIVE_SESSIONS_KEY, 'active_sessions', settings.DASHBOARD_ACTIVE_SESSIONS_TTL,
+        lambda: list(
+            AttendanceSession.objects.filter(is_active=True)
+            .select_related('subject', 'teacher')
+            .only('start_time', 'subject__name', 'teacher__first_name', 'teacher__last_name')
+            .order_by('-start_time')
+        ),
+    )
+
+
+def marked_session_ids(student, sessions):
+    """Which of `sessions` the student already has a record in"""
+    return list(
+        AttendanceRecord.objects.filter(student=student, session__in=[session.id for session in sessions])
+        .values_list('session_id', flat=True)
+    )
+
+
+def attendance_history(student):
+    """The student's last 20 records of the past 30 days"""
+    return _cached(
+        student_key(student.id, 'history'), 'history', settings.DASHBOARD_STUDENT_TTL,
+        lambda: list(
+            AttendanceRecord.objects.filter(
+                student=student,
+                timestamp__gte=timezone.now() - timedelta(days=30)
+            )
+            .select_related('session__subject', 'session__teacher')
+            .only(
+                'timestamp', 'status', 'session__subject__name',
+                'session__teacher__first_name', 'session__teacher__last_name',
+            )
+            .order_by('-timestamp')[:20]
+        ),
+    )
+
+
+def _flag(status):
+    return Max(Case(When(status=status, then=1), default=0, output_field=IntegerField()))
+
+
+def _build_calendar(student, year, month):
+    start = timezone.make_aware(datetime(year, month, 1))
+    end = timezone.make_aware(datetime(year + month // 12, month % 12 + 1, 1))
+    days = (
+        AttendanceRecord.objects.filter(student=student, timestamp__gte=start, timestamp__lt=end)
+        .annotate(day=TruncDate('timestamp'))
+        .values('day')
+        .annotate(present=_flag('present'), absent=_flag('absent'))
+        .order_by()
+    )
+    # Present on any session that day wins, then absent; otherwise still pending
+    return {
+        row['day'].isoformat(): 'present' if row['present'] else 'absent' if row['absent'] else 'PENDING'
+        for row in days
+    }
+
+
+def attendance_calendar(student, year, month):
+    """{'YYYY-MM-DD': status} for one month of the calendar widget"""
+    fragment = f'calendar:{year}-{month:02d}'
+    return _cached(
+        student_key(student.id, fragment), 'calendar', settings.DASHBOARD_STUDENT_TTL,
+        lambda: _build_calendar(student, year, month),
+    )
+
+
+def _changing_months():
+    today = timezone.localdate()
+    yesterday = today - timedelta(days=1)
+    return {f'calendar:{day.year}-{day.month:02d}' for day in (today, yesterday)}
+
+
+def invalidate_student_dashboards(student_ids):
+    """The records of these students changed"""
+    fragments = STUDENT_FRAGMENTS + tuple(_changing_months())
+    _cache().delete_many([
+        student_key(student_id, fragment)
+        for student_id in student_ids for fragment in fragments
+    ])
+
+
+def invalidate_active_sessions():
+    _cache().delete(ACTIVE_SESSIONS_KEY)
+
+
+def dashboard_session_ended(session):
+    """Drop the fragments that showed `session` as active"""
+    invalidate_active_sessions()
+    invalidate_student_dashboards(
+        AttendanceRecord.objects.filter(session=session).values_list('student_id', flat=True)
+    )
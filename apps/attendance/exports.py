@@ -0,0 +1,175 @@
+# apps/attendance/exports.py - STREAMING SPREADSHEET EXPORTS
+#
+# Built on openpyxl's write_only workbook: rows are serialized to a temporary
+# file as they are appended, and every cell refers to a handful of named
+# styles registered once, so memory stays flat whatever the class size.
+
+import csv
+import tempfile
+from datetime import datetime
+
+import openpyxl
+from django.utils import timezone
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+
+from .reports import iter_subject_summaries, session_totals
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+_thin = Side(style='thin')
+_border = Border(left=_thin, right=_thin, top=_thin, bottom=_thin)
+
+
+def _fill(color):
+    return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+
+def register_styles(wb):
+    """Named styles shared by every cell of the report (created once per workbook)"""
+    styles = [
+        NamedStyle(name='att_title', font=Font(bold=True, size=16)),
+        NamedStyle(name='att_bold', font=Font(bold=True, size=12)),
+        NamedStyle(name='att_header', font=Font(color="FFFFFF", bold=True, size=12), fill=_fill("1E3C72"),
+                   border=_border, alignment=Alignment(horizontal='center', vertical='center')),
+        NamedStyle(name='att_cell', border=_border),
+        NamedStyle(name='att_good', font=Font(color="006100", bold=True), fill=_fill("C6EFCE"),
+                   border=_border, alignment=Alignment(horizontal='center')),
+        NamedStyle(name='att_warn', font=Font(color="9C6500"), fill=_fill("FFEB9C"),
+                   border=_border, alignment=Alignment(horizontal='center')),
+        NamedStyle(name='att_poor', font=Font(color="9C0006", bold=True), fill=_fill("FFC7CE"),
+                   border=_border, alignment=Alignment(horizontal='center')),
+    ]
+    for style in styles:
+        wb.add_named_style(style)
+
+
+def styled(ws, value, style):
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = style
+    return cell
+
+
+def percentage_style(percentage):
+    if percentage >= 75:
+        return 'att_good'
+    if percentage >= 50:
+        return 'att_warn'
+    return 'att_poor'
+
+
+def write_attendance_workbook(teacher, subject, out, chunk_size=2000):
+    """
+    Write the per-student attendance report of a subject to the file object `out`,
+    streaming the rows straight from the database cursor
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    register_styles(wb)
+    ws = wb.create_sheet("Attendance Report")
+
+    for column, width in zip('ABCDEFGH', (8, 15, 25, 30, 12, 14, 14, 15)):
+        ws.column_dimensions[column].width = width
+
+    total_sessions, open_sessions = session_totals(teacher, subject)
+
+    ws.append([styled(ws, f"Attendance Report - {subject.name}", 'att_title')])
+    ws.append([f"Subject Code: {subject.code}"])
+    ws.append([f"Faculty: {teacher.get_full_name() or teacher.username}"])
+    ws.append([f"Total Sessions: {total_sessions}"])
+    ws.append([f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"])
+    ws.append([])
+
+    headers = ['S.No', 'Roll Number', 'Student Name', 'Email', 'Total Days', 'Present Days', 'Absent Days', 'Percentage (%)']
+    ws.append([styled(ws, header, 'att_header') for header in headers])
+
+    count = above_75 = 0
+    percentage_sum = 0.0
+    rows = iter_subject_summaries(teacher, subject, chunk_size=chunk_size)
+    for idx, (roll_number, first_name, last_name, username, email, present, closed) in enumerate(rows, 1):
+        held = closed + open_sessions
+        percentage = round((present / held) * 100, 2) if held > 0 else 0
+        name = f"{first_name} {last_name}".strip() or username
+
+        ws.append([
+            styled(ws, idx, 'att_cell'),
+            styled(ws, roll_number or 'N/A', 'att_cell'),
+            styled(ws, name, 'att_cell'),
+            styled(ws, email, 'att_cell'),
+            styled(ws, held, 'att_cell'),
+            styled(ws, present, 'att_cell'),
+            styled(ws, held - present, 'att_cell'),
+            styled(ws, percentage, percentage_style(percentage)),
+        ])
+
+        count += 1
+        percentage_sum += percentage
+        above_75 += percentage >= 75
+
+    # Summary statistics
+    ws.append([])
+    ws.append([styled(ws, "Summary Statistics", 'att_bold')])
+    ws.append(["Total Students:", count])
+    ws.append(["Students Above 75%:", above_75])
+    ws.append(["Students Below 75%:", count - above_75])
+    if count:
+        ws.append(["Average Attendance:", f"{percentage_sum / count:.2f}%"])
+
+    wb.save(out)
+
+
+def attendance_workbook_file(teacher, subject):
+    """Report written to an anonymous temporary file, rewound for streaming"""
+    out = tempfile.TemporaryFile()
+    write_attendance_workbook(teacher, subject, out)
+    out.seek(0)
+    return out
+
+
+# --- REGISTER EXPORTS ---
+def register_header(register):
+    dates = [timezone.localtime(start_time).strftime('%d-%m %H:%M') for _, start_time in register.sessions]
+    return ['Roll Number', 'Student Name', *dates, 'Present', 'Percentage (%)']
+
+
+class Echo:
+    """File-like object whose write() just returns the line, for streaming CSV"""
+
+    def write(self, value):
+        return value
+
+
+def iter_register_csv(register):
+    """Register as CSV lines, generated row by row for StreamingHttpResponse"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(register_header(register))
+    for roll_number, name, marks, present, percentage in register.rows():
+        yield writer.writerow([roll_number, name, *marks, present, percentage])
+
+
+def register_workbook_file(register, subject):
+    """Register as a write-only workbook in a rewound temporary file"""
+    wb = openpyxl.Workbook(write_only=True)
+    register_styles(wb)
+    ws = wb.create_sheet("Register")
+
+    ws.column_dimensions['A'].width = 15
+    ws.column_dimensions['B'].width = 25
+
+    ws.append([styled(ws, f"Attendance Register - {subject.name} ({subject.code})", 'att_title')])
+    ws.append([])
+    ws.append([styled(ws, header, 'att_header') for header in register_header(register)])
+
+    mark_styles = {'P': 'att_good', 'A': 'att_poor', '?': 'att_warn'}
+    for roll_number, name, marks, present, percentage in register.rows():
+        ws.append([
+            styled(ws, roll_number, 'att_cell'),
+            styled(ws, name, 'att_cell'),
+            *(styled(ws, mark, mark_styles[mark]) for mark in marks),
+            styled(ws, present, 'att_cell'),
+            styled(ws, percentage, percentage_style(percentage)),
+        ])
+
+    out = tempfile.TemporaryFile()
+    wb.save(out)
+    out.seek(0)
+    return out
@@ -0,0 +1,239 @@
+# apps/attendance/face_index.py - 1:N FACE IDENTIFICATION INDEX
+#
+# Keeps every stored reference encoding (User.face_encoding) in memory as one
+# contiguous float32 matrix per partition (the student's department), so a
+# probe face is compared against a whole class with a single vectorized
+# distance computation instead of one face_distance() call per student.
+
+import threading
+import time
+
+from django.conf import settings
+
+from apps.accounts.models import User
+from .lazy import lazy_import
+from .utils import (
+    FACE_ENCODING_BYTES, FACE_ENCODING_DTYPE, FACE_ENCODING_SIZE, FACE_ENCODING_VERSION,
+    face_encoding_is_current,
+)
+
+np = lazy_import('numpy')
+
+ALL_PARTITIONS = object()
+
+
+def partition_key(department):
+    """Normalize a department name into a partition key ('' for students without one)"""
+    return (department or '').strip().upper()
+
+
+class _Partition:
+    """Student IDs, their encodings (n x 128 float32) and squared row norms"""
+
+    def __init__(self, ids, matrix):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32).reshape(-1, FACE_ENCODING_SIZE)
+        self.sq_norms = np.einsum('ij,ij->i', self.matrix, self.matrix)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def distances(self, queries):
+        """Euclidean distances, shape (len(queries), len(self)), via |a|² - 2ab + |b|²"""
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, FACE_ENCODING_SIZE)
+        q_norms = np.einsum('ij,ij->i', queries, queries)
+        squared = self.sq_norms[None, :] - 2.0 * (queries @ self.matrix.T) + q_norms[:, None]
+        return np.sqrt(np.maximum(squared, 0.0))
+
+
+class FaceIndex:
+    """
+    In-memory identification index, built lazily from the database and
+    updated in place whenever an encoding changes in this process.
+    Other processes pick up changes by rebuilding after `max_age` seconds.
+    """
+
+    def __init__(self, max_age=None):
+        self.max_age = max_age if max_age is not None else getattr(settings, 'FACE_INDEX_MAX_AGE', 300)
+        self._lock = threading.RLock()
+        self._partitions = {}
+        self._student_partition = {}
+        self._built_at = None
+
+    # ----- building -----
+    def build(self):
+        """(Re)load every current student encoding from the database"""
+        grouped = {}
+        rows = User.objects.filter(
+            user_type='student',
+            face_encoding_version=FACE_ENCODING_VERSION,
+        ).exclude(face_encoding=None).values_list('id', 'department', 'face_encoding')
+
+        for user_id, department, blob in rows.iterator(chunk_size=2000):
+            blob = bytes(blob)
+            if len(blob) != FACE_ENCODING_BYTES:
+                continue
+            ids, blobs = grouped.setdefault(partition_key(department), ([], []))
+            ids.append(user_id)
+            blobs.append(blob)
+
+        partitions, student_partition = {}, {}
+        for key, (ids, blobs) in grouped.items():
+            matrix = np.frombuffer(b''.join(blobs), dtype=FACE_ENCODING_DTYPE)
+            partitions[key] = _Partition(ids, matrix)
+            student_partition.update((user_id, key) for user_id in ids)
+
+        with self._lock:
+            self._partitions = partitions
+            self._student_partition = student_partition
+            self._built_at = time.monotonic()
+
+    def _ensure_built(self):
+        with self._lock:
+            stale = self._built_at is None or (
+                self.max_age and time.monotonic() - self._built_at > self.max_age
+            )
+        if stale:
+            self.build()
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(partition) for partition in self._partitions.values())
+
+    # ----- incremental updates -----
+    def remove(self, user_id):
+        with self._lock:
+            key = self._student_partition.pop(user_id, None)
+            if key is None:
+                return
+            partition = self._partitions[key]
+            keep = partition.ids != user_id
+            if keep.all():
+                return
+            if keep.any():
+                self._partitions[key] = _Partition(partition.ids[keep], partition.matrix[keep])
+            else:
+                del self._partitions[key]
+
+    def upsert(self, user_id, department, encoding):
+        key = partition_key(department)
+        vector = np.asarray(encoding, dtype=np.float32).reshape(1, FACE_ENCODING_SIZE)
+        with self._lock:
+            self.remove(user_id)
+            partition = self._partitions.get(key)
+            if partition is None:
+                self._partitions[key] = _Partition([user_id], vector)
+            else:
+                self._partitions[key] = _Partition(
+                    np.append(partition.ids, user_id),
+                    np.vstack([partition.matrix, vector]),
+                )
+            self._student_partition[user_id] = key
+
+    def update_user(self, user):
+        """Apply a user's current stored encoding (no-op until the index is first used)"""
+        with self._lock:
+            if self._built_at is None:
+                return
+        if user.user_type == 'student' and face_encoding_is_current(user):
+            self.upsert(user.pk, user.department, np.frombuffer(bytes(user.face_encoding), dtype=FACE_ENCODING_DTYPE))
+        else:
+            self.remove(user.pk)
+
+    # ----- queries -----
+    def _selected(self, partition):
+        if partition is ALL_PARTITIONS:
+            return list(self._partitions.values())
+        found = self._partitions.get(partition_key(partition))
+        return [found] if found is not None else []
+
+    def candidates(self, partition=ALL_PARTITIONS):
+        """(ids, matrix) of a partition, or of all partitions stacked"""
+        self._ensure_built()
+        with self._lock:
+            selected = self._selected(partition)
+        if not selected:
+            return np.empty(0, dtype=np.int64), np.empty((0, FACE_ENCODING_SIZE), dtype=np.float32)
+        if len(selected) == 1:
+            return selected[0].ids, selected[0].matrix
+        return (
+            np.concatenate([p.ids for p in selected]),
+            np.vstack([p.matrix for p in selected]),
+        )
+
+    def search(self, encoding, partition=ALL_PARTITIONS, k=5, threshold=None):
+        """
+        Top-k nearest students for one probe encoding.
+        Returns [(student_id, distance), ...] sorted by distance, only those below threshold.
+        """
+        if threshold is None:
+            threshold = getattr(settings, 'FACE_IDENTIFY_THRESHOLD', 0.5)
+
+        self._ensure_built()
+        with self._lock:
+            selected = self._selected(partition)
+
+        ids, dists = [], []
+        for part in selected:
+            distances = part.distances(encoding)[0]
+            top = min(k, len(distances))
+            best = np.argpartition(distances, top - 1)[:top]
+            ids.append(part.ids[best])
+            dists.append(distances[best])
+
+        if not ids:
+            return []
+        ids, dists = np.concatenate(ids), np.concatenate(dists)
+        order = np.argsort(dists)[:k]
+        return [
+            (int(ids[i]), float(dists[i]))
+            for i in order if dists[i] < threshold
+        ]
+
+
+    def assign(self, encodings, partition=ALL_PARTITIONS, threshold=None):
+        """
+        One-to-one assignment of several probe faces (e.g. a group photo) to students.
+        Distances for all faces are computed as one matrix; pairs are then accepted
+        greedily from the closest, so no face and no student is used twice.
+        Returns [(face_index, student_id, distance), ...]
+        """
+        if threshold is None:
+            threshold = getattr(settings, 'FACE_IDENTIFY_THRESHOLD', 0.5)
+
+        ids, matrix = self.candidates(partition)
+        if len(encodings) == 0 or len(ids) == 0:
+            return []
+
+        distances = _Partition(ids, matrix).distances(encodings)
+        faces, students = np.nonzero(distances < threshold)
+        order = np.argsort(distances[faces, students], kind='stable')
+
+        used_faces, used_students, assigned = set(), set(), []
+        for i in order:
+            face, student = int(faces[i]), int(students[i])
+            if face in used_faces or student in used_students:
+                continue
+            used_faces.add(face)
+            used_students.add(student)
+            assigned.append((face, int(ids[student]), float(distances[face, student])))
+        return assigned
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_face_index():
+    """Process-wide face index"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = FaceIndex()
+        return _index
+
+
+def notify_encoding_changed(user):
+    """Keep this process' index in sync after a user's stored encoding changed"""
+    if _index is not None:
+        _index.update_user(user)
@@ -0,0 +1,438 @@
+# apps/attendance/face_service.py - OUT-OF-PROCESS FACE VERIFICATION SERVICE
+#
+# The face pipeline can run in a standalone process (manage.py run_face_verifier)
+# listening on a Unix socket or localhost TCP, so CV workers are sized to the
+# cores independently of the web tier. Web workers talk to it with a small
+# pooled client and fall back to the in-process VerificationPool when
+# settings.FACE_VERIFIER_ADDRESS is unset or the service is unreachable.
+#
+# Wire format: every message is a 4-byte big-endian length followed by the body.
+#   PING   -> op                                   <- status, workers, queue depth, served, uptime
+#   VERIFY -> op, threshold, len(ref path), len(encoding), len(image), ref path, encoding, image
+#          <- status, match, distance, confidence, len(message), message, timings
+#   ENCODE -> op, len(image), image                <- status, encoding (512 bytes float32)
+# Errors answer status + u16 + UTF-8 message; for STATUS_BUSY the u16 is the
+# retry-after in seconds. The reference encoding uses the stored blob format
+# (pack_face_encoding), and the image is the raw uploaded JPEG/PNG.
+
+import asyncio
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .utils import (
+    check_face_match, encode_single_face, pack_face_encoding, unpack_face_encoding,
+    get_reference_image, store_face_encoding, FACE_ENCODING_BYTES,
+)
+from .verification import get_verification_pool, VerificationBusy, VerificationTimeout
+
+logger = logging.getLogger(__name__)
+
+OP_PING, OP_VERIFY, OP_ENCODE = 0, 1, 2
+STATUS_OK, STATUS_ERROR, STATUS_BUSY, STATUS_TIMEOUT = 0, 1, 2, 3
+
+MAX_FRAME = 32 * 1024 * 1024
+
+_LENGTH = struct.Struct('!I')
+_STATUS = struct.Struct('!BH')  # status, u16 (message length or retry-after)
+_VERIFY_REQUEST = struct.Struct('!BfHHI')
+_VERIFY_RESULT = struct.Struct('!BBffH')
+_ENCODE_REQUEST = struct.Struct('!BI')
+_PING_RESULT = struct.Struct('!BHHIf')
+_TIMING = struct.Struct('!f')
+
+
+class FaceServiceUnavailable(Exception):
+    """The verification service could not be reached (caller falls back in-process)"""
+
+
+class FaceServiceError(Exception):
+    """The service answered with an error"""
+
+
+def parse_address(address):
+    """'unix:/path/to.sock' or 'host:port' -> (socket family, connect/bind target)"""
+    if address.startswith('unix:'):
+        return socket.AF_UNIX, address[len('unix:'):]
+    host, _, port = address.rpartition(':')
+    return socket.AF_INET, (host or '127.0.0.1', int(port))
+
+
+# --- PROTOCOL ---
+
+def _frame(body):
+    return _LENGTH.pack(len(body)) + body
+
+
+def _error(status, message='', code=None):
+    data = message.encode('utf-8')[:1024]
+    return _STATUS.pack(status, len(data) if code is None else code) + data
+
+
+def encode_verify_request(reference_path, image_bytes, threshold, known_encoding):
+    reference = (reference_path or '').encode('utf-8')
+    encoding = pack_face_encoding(known_encoding) if known_encoding is not None else b''
+    return b''.join((
+        _VERIFY_REQUEST.pack(OP_VERIFY, threshold, len(reference), len(encoding), len(image_bytes)),
+        reference, encoding, bytes(image_bytes),
+    ))
+
+
+def decode_verify_request(body):
+    _, threshold, ref_len, enc_len, image_len = _VERIFY_REQUEST.unpack_from(body)
+    offset = _VERIFY_REQUEST.size
+    reference = body[offset:offset + ref_len].decode('utf-8') or None
+    offset += ref_len
+    encoding = unpack_face_encoding(body[offset:offset + enc_len]) if enc_len else None
+    offset += enc_len
+    return reference, body[offset:offset + image_len], threshold, encoding
+
+
+def encode_verify_result(result):
+    message = result['message'].encode('utf-8')[:4096]
+    timings = result.get('timings') or {}
+    parts = [
+        _VERIFY_RESULT.pack(STATUS_OK, bool(result['match']), result['distance'], result['confidence'], len(message)),
+        message,
+        bytes([len(timings)]),
+    ]
+    for name, seconds in timings.items():
+        key = name.encode('utf-8')[:255]
+        parts.extend((bytes([len(key)]), key, _TIMING.pack(seconds)))
+    return b''.join(parts)
+
+
+def decode_verify_result(body):
+    _, match, distance, confidence, message_len = _VERIFY_RESULT.unpack_from(body)
+    offset = _VERIFY_RESULT.size
+    message = body[offset:offset + message_len].decode('utf-8')
+    offset += message_len
+    timings = {}
+    count, offset = body[offset], offset + 1
+    for _ in range(count):
+        key_len = body[offset]
+        key = body[offset + 1:offset + 1 + key_len].decode('utf-8')
+        offset += 1 + key_len
+        (timings[key],) = _TIMING.unpack_from(body, offset)
+        offset += _TIMING.size
+    return {
+        'match': bool(match),
+        'distance': round(distance, 6),
+        'confidence': round(confidence, 2),
+        'message': message,
+        'timings': timings,
+    }
+
+
+def _raise_for_status(body):
+    """Turn an error answer into the matching exception; returns the body otherwise"""
+    status = body[0]
+    if status == STATUS_OK:
+        return body
+    _, value = _STATUS.unpack_from(body)
+    if status == STATUS_BUSY:
+        raise VerificationBusy(value)
+    message = body[_STATUS.size:_STATUS.size + value].decode('utf-8', 'replace')
+    if status == STATUS_TIMEOUT:
+        raise VerificationTimeout(message)
+    raise FaceServiceError(message)
+
+
+# --- SERVER ---
+
+class FaceVerificationServer:
+    """
+    asyncio front end over a VerificationPool: connections are cheap and
+    long-lived (clients pool them), the dlib work runs in the pool's processes
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.served = 0
+        self.started = time.monotonic()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                (length,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+                if not 0 < length <= MAX_FRAME:
+                    logger.warning("Dropping connection: bad frame length %d", length)
+                    break
+                body = await reader.readexactly(length)
+                writer.write(_frame(await self.dispatch(body)))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, body):
+        op = body[0]
+        if op == OP_PING:
+            return _PING_RESULT.pack(
+                STATUS_OK, self.pool.workers, self.pool.queue_depth,
+                self.served, time.monotonic() - self.started,
+            )
+        try:
+            if op == OP_VERIFY:
+                reference, image, threshold, encoding = decode_verify_request(body)
+                result = await self._run(check_face_match, reference, image, threshold=threshold, known_encoding=encoding)
+                return encode_verify_result(result)
+            if op == OP_ENCODE:
+                _, image_len = _ENCODE_REQUEST.unpack_from(body)
+                image = body[_ENCODE_REQUEST.size:_ENCODE_REQUEST.size + image_len]
+                encoding, error = await self._run(encode_single_face, image)
+                if encoding is None:
+                    return _error(STATUS_ERROR, error)
+                return bytes([STATUS_OK]) + pack_face_encoding(encoding)
+            return _error(STATUS_ERROR, f'Unknown op {op}')
+        except VerificationBusy as e:
+            return _error(STATUS_BUSY, code=e.retry_after)
+        except asyncio.TimeoutError:
+            return _error(STATUS_TIMEOUT, f'Verification took longer than {self.pool.timeout}s')
+        except Exception as e:
+            logger.exception("Face service request failed")
+            return _error(STATUS_ERROR, f'{type(e).__name__}: {e}')
+        finally:
+            self.served += 1
+
+    async def _run(self, fn, *args, **kwargs):
+        future = self.pool.submit(fn, *args, **kwargs)
+        return await asyncio.wait_for(asyncio.wrap_future(future), self.pool.timeout)
+
+    async def serve(self, address):
+        family, target = parse_address(address)
+        if family == socket.AF_UNIX:
+            if os.path.exists(target):
+                os.unlink(target)
+            server = await asyncio.start_unix_server(self.handle_connection, path=target)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host=target[0], port=target[1])
+        logger.info("Face verification service listening on %s (%d workers)", address, self.pool.workers)
+        async with server:
+            await server.serve_forever()
+
+
+# --- CLIENT ---
+
+class FaceServiceClient:
+    """
+    Blocking client with a pool of persistent connections (one request in
+    flight per connection). Thread-safe; used from the web workers' threads.
+    """
+
+    def __init__(self, address, timeout, connect_timeout=1.0, pool_size=8):
+        self.address = address
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.pool_size = pool_size
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        family, target = parse_address(self.address)
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.connect_timeout)
+            sock.connect(target)
+        except OSError as e:
+            sock.close()
+            raise FaceServiceUnavailable(f'{self.address}: {e}') from e
+        if family == socket.AF_INET:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def _acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self._connect(), False
+
+    def _release(self, sock):
+        with self._lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(sock)
+                return
+        sock.close()
+
+    @staticmethod
+    def _recv_exactly(sock, size):
+        chunks, remaining = [], size
+        while remaining:
+            chunk = sock.recv(min(remaining, 1 << 20))
+            if not chunk:
+                raise ConnectionError('Connection closed by the face service')
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b''.join(chunks)
+
+    def call(self, body, timeout=None):
+        """Send one request and return the raw answer body"""
+        for attempt in range(2):
+            sock, reused = self._acquire()
+            try:
+                sock.settimeout(timeout or self.timeout)
+                sock.sendall(_frame(body))
+                (length,) = _LENGTH.unpack(self._recv_exactly(sock, _LENGTH.size))
+                answer = self._recv_exactly(sock, length)
+            except socket.timeout:
+                sock.close()
+                raise VerificationTimeout(f'Face service did not answer within {timeout or self.timeout}s')
+            except OSError as e:
+                sock.close()
+                # An idle connection may have been closed by the service; the
+                # requests are side-effect free, so retry once on a fresh one
+                if reused and attempt == 0:
+                    continue
+                raise FaceServiceUnavailable(f'{self.address}: {e}') from e
+            self._release(sock)
+            return answer
+
+    def ping(self):
+        body = _raise_for_status(self.call(bytes([OP_PING]), timeout=self.connect_timeout))
+        _, workers, queue_depth, served, uptime = _PING_RESULT.unpack(body)
+        return {'workers': workers, 'queue_depth': queue_depth, 'served': served, 'uptime': round(uptime, 1)}
+
+    def verify(self, reference_path, image_bytes, threshold, known_encoding=None):
+        """check_face_match's result dict; an error answer is a failed verification"""
+        body = encode_verify_request(reference_path, image_bytes, threshold, known_encoding)
+        try:
+            return decode_verify_result(_raise_for_status(self.call(body)))
+        except FaceServiceError as e:
+            logger.warning("Face service could not verify %s: %s", reference_path, e)
+            return {'match': False, 'confidence': 0.0, 'distance': 1.0, 'message': f'Technical error: {e}'}
+
+    def encode(self, image_bytes):
+        """(encoding, None) or (None, error message), like encode_single_face"""
+        try:
+            body = _raise_for_status(self.call(_ENCODE_REQUEST.pack(OP_ENCODE, len(image_bytes)) + bytes(image_bytes)))
+        except FaceServiceError as e:
+            return None, str(e)
+        return unpack_face_encoding(body[1:1 + FACE_ENCODING_BYTES]), None
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for sock in idle:
+            sock.close()
+
+
+# --- ROUTING (service when available, in-process pool otherwise) ---
+
+_client = None
+_client_lock = threading.Lock()
+_down_until = 0.0
+_async_executor = None
+_async_slots = None
+
+
+def get_face_service_client():
+    """Process-wide client for settings.FACE_VERIFIER_ADDRESS, or None when not configured"""
+    global _client, _async_executor, _async_slots
+    address = getattr(settings, 'FACE_VERIFIER_ADDRESS', '')
+    if not address:
+        return None
+    with _client_lock:
+        if _client is None:
+            pool_size = getattr(settings, 'FACE_VERIFIER_POOL_SIZE', 8)
+            _client = FaceServiceClient(
+                address,
+                # A little longer than the service's own per-job timeout
+                timeout=getattr(settings, 'FACE_VERIFY_TIMEOUT', 20) + 2,
+                connect_timeout=getattr(settings, 'FACE_VERIFIER_CONNECT_TIMEOUT', 1.0),
+                pool_size=pool_size,
+            )
+            _async_executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='face-service')
+            _async_slots = threading.BoundedSemaphore(pool_size + getattr(settings, 'FACE_VERIFY_QUEUE_DEPTH', 8))
+        return _client
+
+
+def reset_face_service_client():
+    """Forget the client (e.g. after fork; sockets are not shared between processes)"""
+    global _client, _async_executor, _async_slots, _down_until
+    with _client_lock:
+        _client, _async_executor, _async_slots, _down_until = None, None, None, 0.0
+
+
+def _service():
+    """The client if the service should be tried for this request"""
+    client = get_face_service_client()
+    if client is None or time.monotonic() < _down_until:
+        return None
+    return client
+
+
+def _mark_down(error):
+    global _down_until
+    backoff = getattr(settings, 'FACE_VERIFIER_RETRY_DOWN', 30)
+    _down_until = time.monotonic() + backoff
+    logger.warning("Face service unavailable (%s); verifying in-process for %ss", error, backoff)
+
+
+def run_face_check(reference_path, image_bytes, threshold, known_encoding=None):
+    """check_face_match on the service, or on the in-process pool as a fallback"""
+    client = _service()
+    if client is not None:
+        try:
+            return client.verify(reference_path, image_bytes, threshold, known_encoding)
+        except FaceServiceUnavailable as e:
+            _mark_down(e)
+    return get_verification_pool().run(
+        check_face_match, reference_path, image_bytes,
+        threshold=threshold, known_encoding=known_encoding
+    )
+
+
+def submit_face_check(reference_path, image_bytes, threshold, known_encoding=None):
+    """
+    Background variant of run_face_check for async marking; returns a Future.
+    Raises VerificationBusy when the local queue (service or pool) is full.
+    """
+    if _service() is None:
+        return get_verification_pool().submit(
+            check_face_match, reference_path, image_bytes,
+            threshold=threshold, known_encoding=known_encoding
+        )
+
+    slots = _async_slots
+    if not slots.acquire(blocking=False):
+        raise VerificationBusy(getattr(settings, 'FACE_VERIFY_RETRY_AFTER', 5))
+    try:
+        future = _async_executor.submit(run_face_check, reference_path, image_bytes, threshold, known_encoding)
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    return future
+
+
+def run_face_encode(image_bytes):
+    """encode_single_face on the service, or on the in-process pool as a fallback"""
+    client = _service()
+    if client is not None:
+        try:
+            return client.encode(image_bytes)
+        except FaceServiceUnavailable as e:
+            _mark_down(e)
+    return get_verification_pool().run(encode_single_face, image_bytes)
+
+
+def refresh_reference_encoding(user):
+    """
+    refresh_face_encoding for request handlers: the reference photo is
+    encoded on the service or the pool (run_face_encode), not in this thread
+    """
+    reference = get_reference_image(user)
+    encoding = None
+    if reference:
+        with reference.open('rb') as image:
+            encoding, error = run_face_encode(image.read())
+        if error:
+            logger.info("Reference photo of %s not encoded: %s", user.username, error)
+    return store_face_encoding(user, encoding)
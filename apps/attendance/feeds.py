@@ -0,0 +1,240 @@
+# apps/attendance/feeds.py - LIVE MONITOR FEED (Server-Sent Events)
+#
+# monitor_session.html renders the records once, then listens here for
+# deltas instead of reloading the page. The stream pushes:
+#   event: records  - new records (id > cursor), pending records that turned
+#                     present ('records'), rejected ones that were deleted
+#                     ('removed'), and the present/pending counters
+#   event: end      - the session was ended; the page stops listening
+# The event id is the cursor (highest record id sent). Streams close after
+# ATTENDANCE_FEED_MAX_SECONDS and EventSource reconnects with Last-Event-ID,
+# so no connection (or WSGI thread) is held forever.
+#
+# Under ASGI (smart_attendance/asgi.py, e.g. uvicorn) the stream is an async
+# iterator, so an open feed waits on the event loop, not in a thread. Under
+# WSGI (gunicorn gthread, the default deployment) the stream works too, but
+# pins a worker thread, so monitor_session.html polls session_records there
+# instead (feed_is_streamed).
+#
+# session_records is the polling endpoint (the WSGI monitor page, mobile
+# clients): JSON, ?since=<record id> for new rows only, and an ETag so
+# unchanged polls get a 304 after two small queries.
+
+import asyncio
+import hashlib
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.handlers.asgi import ASGIRequest
+from django.core.files.storage import default_storage
+from django.db.models import Count, Max, Q
+from django.http import Http404, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from .models import AttendanceSession, AttendanceRecord
+from .counters import session_counters
+
+RECORD_FIELDS = (
+    'id', 'status', 'timestamp', 'student__username',
+    'student__first_name', 'student__last_name', 'student__student_id', 'student__profile_image',
+)
+
+
+def _parse_ids(value):
+    return {int(part) for part in (value or '').split(',') if part.strip().isdigit()}
+
+
+def serialize_record(row):
+    image = row['student__profile_image']
+    return {
+        'id': row['id'],
+        'status': row['status'],
+        'time': timezone.localtime(row['timestamp']).strftime('%H:%M:%S'),
+        'student_id': row['student__student_id'] or '',
+        'name': f"{row['student__first_name']} {row['student__last_name']}".strip() or row['student__username'],
+        'image': default_storage.url(image) if image else None,
+    }
+
+
+def sse_event(event, data, event_id=None):
+    lines = [f'event: {event}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'data: {json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def _feed_steps(session_id, cursor, pending):
+    """
+    The stream as a plain generator: yields SSE chunks, and None wherever
+    the stream should wait one poll interval before going on
+    """
+    deadline = time.monotonic() + settings.ATTENDANCE_FEED_MAX_SECONDS
+    records = AttendanceRecord.objects.filter(session_id=session_id)
+
+    # Tell the browser how soon to come back after the deadline
+    yield f'retry: {int(settings.ATTENDANCE_FEED_POLL_INTERVAL * 1000)}\n\n'
+
+    # Also track what turned pending before this (re)connect
+    pending = set(pending)
+    pending.update(records.filter(id__lte=cursor, status='PENDING').values_list('id', flat=True))
+    last_sent = time.monotonic()
+
+    while time.monotonic() < deadline:
+        changed = list(records.filter(id__gt=cursor).order_by('id').values(*RECORD_FIELDS))
+        removed = []
+        if pending:
+            settled = {
+                row['id']: row for row in
+                records.filter(id__in=pending).exclude(status='PENDING').values(*RECORD_FIELDS)
+            }
+            still_pending = set(records.filter(id__in=pending, status='PENDING').values_list('id', flat=True))
+            changed.extend(settled.values())
+            # Neither settled nor pending any more: the verification rejected it
+            removed = sorted(pending - still_pending - settled.keys())
+            pending = still_pending
+
+        if changed or removed:
+            for row in changed:
+                cursor = max(cursor, row['id'])
+                if row['status'] == 'PENDING':
+                    pending.add(row['id'])
+            payload = {'records': [serialize_record(row) for row in changed], 'removed': removed}
+            payload.update(session_counters(session_id))
+            yield sse_event('records', payload, event_id=cursor)
+            last_sent = time.monotonic()
+        elif time.monotonic() - last_sent >= settings.ATTENDANCE_FEED_HEARTBEAT:
+            # Keeps proxies from timing out an idle stream
+            yield ': keepalive\n\n'
+            last_sent = time.monotonic()
+
+        if not AttendanceSession.objects.filter(id=session_id, is_active=True).exists():
+            yield sse_event('end', {}, event_id=cursor)
+            return
+
+        yield None
+
+
+def session_events(session_id, cursor, pending):
+    """WSGI: a sync iterator, streamed chunk by chunk"""
+    for chunk in _feed_steps(session_id, cursor, pending):
+        if chunk is None:
+            time.sleep(settings.ATTENDANCE_FEED_POLL_INTERVAL)
+        else:
+            yield chunk
+
+
+async def asession_events(session_id, cursor, pending):
+    """ASGI: the same steps, with the waits on the event loop instead of a thread"""
+    steps = _feed_steps(session_id, cursor, pending)
+    done = object()
+    while True:
+        chunk = await sync_to_async(next)(steps, done)
+        if chunk is done:
+            return
+        if chunk is None:
+            await asyncio.sleep(settings.ATTENDANCE_FEED_POLL_INTERVAL)
+        else:
+            yield chunk
+
+
+def feed_is_streamed(request):
+    """
+    Whether the monitor page should use the SSE stream. Under WSGI every open
+    stream pins a worker thread, so the page polls session_records instead.
+    """
+    return isinstance(request, ASGIRequest)
+
+
+@login_required
+def session_feed(request, session_id):
+    """SSE stream of a session's attendance changes (teacher only)"""
+    session = AttendanceSession.objects.filter(id=session_id).values('teacher_id').first()
+    if session is None:
+        raise Http404('Session not found')
+    if session['teacher_id'] != request.user.id:
+        return HttpResponseForbidden()
+
+    # Reconnects resume from the last event id; the first connect from the rendered page
+    cursor = request.headers.get('Last-Event-ID') or request.GET.get('cursor') or '0'
+    cursor = int(cursor) if cursor.isdigit() else 0
+    pending = _parse_ids(request.GET.get('pending'))
+
+    # Django buffers an async iterator completely under WSGI (and a sync one
+    # under ASGI), so hand each server the kind it streams
+    events = asession_events if isinstance(request, ASGIRequest) else session_events
+    response = StreamingHttpResponse(events(session_id, cursor, pending), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: don't buffer the stream
+    return response
+
+
+def records_state(session_id):
+    """Highest id and counts of a session's records: changes with every insert/verify/reject"""
+    return AttendanceRecord.objects.filter(session_id=session_id).aggregate(
+        max_id=Max('id'),
+        total=Count('id'),
+        present=Count('id', filter=Q(status='present')),
+        pending=Count('id', filter=Q(status='PENDING')),
+    )
+
+
+def records_etag(request, session_id):
+    is_active = AttendanceSession.objects.filter(
+        id=session_id, teacher_id=request.user.id
+    ).values_list('is_active', flat=True).first()
+    if is_active is None:
+        return None  # the view answers 404/403
+    state = records_state(session_id)
+    key = ':'.join(map(str, (session_id, is_active, *state.values(), request.GET.urlencode())))
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+@login_required
+@condition(etag_func=records_etag)
+def session_records(request, session_id):
+    """
+    JSON records of a session (teacher only), oldest first.
+    ?since=<record id>: only records with a higher id.
+    ?pending=<id,id,...>: also return those records if they are no longer
+    pending, and list the ones that were rejected (deleted) in 'removed'.
+    """
+    session = AttendanceSession.objects.filter(id=session_id).values('teacher_id', 'is_active').first()
+    if session is None:
+        return JsonResponse({'error': 'Session not found'}, status=404)
+    if session['teacher_id'] != request.user.id:
+        return JsonResponse({'error': 'Not your session'}, status=403)
+
+    since = request.GET.get('since', '0')
+    if not since.isdigit():
+        return JsonResponse({'error': 'since must be a record id'}, status=400)
+    since = int(since)
+
+    records = AttendanceRecord.objects.filter(session_id=session_id)
+    rows = list(records.filter(id__gt=since).order_by('id').values(*RECORD_FIELDS))
+
+    removed = []
+    pending = _parse_ids(request.GET.get('pending'))
+    if pending:
+        remaining = {row['id']: row for row in records.filter(id__in=pending).values(*RECORD_FIELDS)}
+        removed = sorted(pending - remaining.keys())
+        seen = {row['id'] for row in rows}
+        rows.extend(
+            row for record_id, row in sorted(remaining.items())
+            if row['status'] != 'PENDING' and record_id not in seen
+        )
+
+    state = records_state(session_id)
+    return JsonResponse({
+        'session': {'id': session_id, 'is_active': session['is_active']},
+        'cursor': max([since] + [row['id'] for row in rows]),
+        'records': [serialize_record(row) for row in rows],
+        'removed': removed,
+        'total': state['total'],
+        'present': state['present'],
+        'pending': state['pending'],
+    })
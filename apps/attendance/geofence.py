@@ -0,0 +1,88 @@
+# apps/attendance/geofence.py - FAST GEOFENCE CHECKS
+#
+# For class radii of 20 m - 20 km a spherical (haversine) distance is well
+# within GPS error, and much cheaper than geopy's iterative geodesic.
+# Each fence precomputes a lat/lng bounding box so most far-away points are
+# rejected with four comparisons before any trigonometry.
+
+import math
+from functools import lru_cache
+
+from .lazy import lazy_import
+
+np = lazy_import('numpy')  # only the vectorized helpers need it
+
+EARTH_RADIUS_M = 6371008.8  # mean Earth radius
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    """Great-circle distance in meters between two points given in degrees"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+class Geofence:
+    """Circle of `radius_meters` around a class location, with a precomputed bounding box"""
+
+    def __init__(self, latitude, longitude, radius_meters):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.radius_meters = radius_meters
+
+        dlat = math.degrees(radius_meters / EARTH_RADIUS_M)
+        cos_lat = math.cos(math.radians(latitude))
+        # Near the poles the longitude span covers everything
+        dlng = 180.0 if cos_lat < 1e-6 else min(180.0, dlat / cos_lat)
+
+        self.min_lat, self.max_lat = latitude - dlat, latitude + dlat
+        self.min_lng, self.max_lng = longitude - dlng, longitude + dlng
+
+    @classmethod
+    def for_session(cls, session):
+        return get_geofence(session.latitude, session.longitude, session.radius_meters)
+
+    def in_bounding_box(self, lat, lng):
+        if not (self.min_lat <= lat <= self.max_lat):
+            return False
+        # Longitude box may wrap around the antimeridian
+        if self.min_lng < -180.0 or self.max_lng > 180.0:
+            return True
+        return self.min_lng <= lng <= self.max_lng
+
+    def distance_m(self, lat, lng):
+        return haversine_m(lat, lng, self.latitude, self.longitude)
+
+    def contains(self, lat, lng):
+        """Cheap bounding-box reject first, exact haversine check second"""
+        return self.in_bounding_box(lat, lng) and self.distance_m(lat, lng) <= self.radius_meters
+
+    def __repr__(self):
+        return f"Geofence({self.latitude}, {self.longitude}, {self.radius_meters}m)"
+
+
+@lru_cache(maxsize=1024)
+def get_geofence(latitude, longitude, radius_meters):
+    """Shared, precomputed fence for a location (sessions reuse the same few locations)"""
+    return Geofence(latitude, longitude, radius_meters)
+
+
+def haversine_many(lats, lngs, center_lats, center_lngs):
+    """Vectorized haversine distance in meters (all arguments broadcast as NumPy arrays)"""
+    phi1 = np.radians(np.asarray(lats, dtype=np.float64))
+    phi2 = np.radians(np.asarray(center_lats, dtype=np.float64))
+    dphi = phi2 - phi1
+    dlmb = np.radians(np.asarray(center_lngs, dtype=np.float64) - np.asarray(lngs, dtype=np.float64))
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+
+def within_radius_many(lats, lngs, center_lats, center_lngs, radii):
+    """
+    Re-validate many stored points at once, e.g. every (gps_lat, gps_long) of a
+    term against the location of its session. Returns (inside, distances).
+    """
+    distances = haversine_many(lats, lngs, center_lats, center_lngs)
+    return distances <= np.asarray(radii, dtype=np.float64), distances
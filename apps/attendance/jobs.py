@@ -0,0 +1,170 @@
+# apps/attendance/jobs.py - ASYNC ATTENDANCE MARKING
+#
+# In async mode verify_my_face stores the AttendanceRecord as PENDING and
+# returns straight away; watch_pending_verification() then settles it when
+# the face check is done, or rejects it once ATTENDANCE_PENDING_TIMEOUT has
+# passed. The job ID handed to the client is simply the record ID.
+#
+# A PENDING record whose job was lost (worker restarted, callback never ran)
+# is expired by the next read that finds it too old: the student's next mark
+# attempt or status poll (expire_stale_pending).
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.utils import timezone
+
+from .models import AttendanceRecord
+from .summary import record_marked_present
+from .counters import adjust_session_counters
+from .dashboard import invalidate_student_dashboards
+from .metrics import observe_timings
+
+logger = logging.getLogger(__name__)
+
+JOB_RESULT_TTL = 15 * 60  # seconds a rejection message stays available for polling
+TIMED_OUT_MESSAGE = 'Verification timed out. Please try again.'
+
+# Settling runs on this thread, never on the one that happens to call the
+# done-callback (the request thread itself when the future is already done),
+# so closing its DB connections afterwards cannot touch a request's
+_settle_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='attendance-jobs')
+
+
+def _cache():
+    # Shared by all workers, so whichever one answers the poll sees the result
+    return caches['attendance']
+
+
+def job_result_key(job_id):
+    return f'attendance:job:{job_id}'
+
+
+def _reject(record, message, confidence=0.0):
+    """Delete a PENDING record and its selfie, keep the reason for polling; False if it was already settled"""
+    deleted, _ = AttendanceRecord.objects.filter(pk=record.pk, status='PENDING').delete()
+    if not deleted:
+        return False
+    if record.captured_image:
+        record.captured_image.delete(save=False)
+    _cache().set(job_result_key(record.pk), {
+        'student_id': record.student_id,
+        'message': message,
+        'confidence': confidence,
+    }, JOB_RESULT_TTL)
+    adjust_session_counters(record.session_id, pending=-1)
+    invalidate_student_dashboards([record.student_id])
+    return True
+
+
+def _job_result(future):
+    if not future.done():
+        # Past the deadline: drop it if still queued, ignore it if running
+        future.cancel()
+        return {'match': False, 'confidence': 0.0, 'distance': 1.0, 'message': TIMED_OUT_MESSAGE}
+    try:
+        return future.result()
+    except Exception as error:
+        return {
+            'match': False,
+            'confidence': 0.0,
+            'distance': 1.0,
+            'message': f'Technical error: {error}'
+        }
+
+
+def finish_pending_verification(record_id, future):
+    """
+    Promote the PENDING record to present, or delete it and keep the
+    rejection reason for polling (on the settling thread)
+    """
+    try:
+        result = _job_result(future)
+        # The request has long returned; record the worker's stages on their own
+        observe_timings('mark_attendance_async', result.get('timings'))
+
+        record = AttendanceRecord.objects.filter(pk=record_id, status='PENDING').select_related('session').first()
+        if record is None:
+            # Already settled: expired before the verification finished
+            return
+
+        if result['match']:
+            if not AttendanceRecord.objects.filter(pk=record_id, status='PENDING').update(status='present'):
+                return
+            record_marked_present(record.student_id, record.session, record.timestamp)
+            adjust_session_counters(record.session_id, present=1, pending=-1)
+            invalidate_student_dashboards([record.student_id])
+            logger.info("Async job %s: attendance marked (confidence=%s)", record_id, result['confidence'])
+        elif _reject(record, result['message'], result['confidence']):
+            logger.info("Async job %s: verification failed (%s)", record_id, result['message'])
+
+    except Exception:
+        logger.exception("Async job %s failed", record_id)
+
+    finally:
+        connections.close_all()
+
+
+def watch_pending_verification(record_id, future):
+    """Settle the record when `future` is done, or fail it after ATTENDANCE_PENDING_TIMEOUT"""
+    deadline = threading.Timer(
+        settings.ATTENDANCE_PENDING_TIMEOUT,
+        _settle_executor.submit, (finish_pending_verification, record_id, future),
+    )
+    deadline.daemon = True
+
+    def settle(done_future):
+        deadline.cancel()
+        _settle_executor.submit(finish_pending_verification, record_id, done_future)
+
+    deadline.start()
+    future.add_done_callback(settle)
+
+
+def expire_stale_pending(records):
+    """
+    Reject the PENDING records in `records` (a queryset) older than
+    ATTENDANCE_PENDING_TIMEOUT; returns the ids that were expired
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.ATTENDANCE_PENDING_TIMEOUT)
+    expired = [
+        record.pk for record in records.filter(status='PENDING', timestamp__lt=cutoff)
+        if _reject(record, TIMED_OUT_MESSAGE)
+    ]
+    if expired:
+        logger.warning("Expired stale pending attendance jobs %s", expired)
+    return expired
+
+
+def get_job_status(job_id, student):
+    """Status payload for a marking job owned by `student`, or None if unknown"""
+    expire_stale_pending(AttendanceRecord.objects.filter(pk=job_id, student=student))
+    record = AttendanceRecord.objects.filter(
+        pk=job_id, student=student
+    ).select_related('session__subject').first()
+
+    if record is not None:
+        if record.status == 'PENDING':
+            return {'job_id': job_id, 'status': 'pending'}
+        return {
+            'job_id': job_id,
+            'status': record.status,
+            'class_name': record.session.subject.name,
+            'timestamp': record.timestamp.strftime('%I:%M %p'),
+        }
+
+    # Rejected (the record is gone), expired from the cache, or never existed
+    rejected = _cache().get(job_result_key(job_id))
+    if rejected is None or rejected['student_id'] != student.pk:
+        return None
+    return {
+        'job_id': job_id,
+        'status': 'rejected',
+        'error': rejected['message'],
+        'confidence': rejected['confidence'],
+    }
@@ -0,0 +1,30 @@
+# apps/attendance/lazy.py
+"""
+Deferred imports for the heavy CV/numeric stack
+
+    face_recognition = lazy_import('face_recognition')
+
+returns a module object right away; the module itself (dlib, OpenCV, ...)
+is only executed on first attribute access. Web-only processes (admin,
+reports, migrate, collectstatic) import the views without ever paying for it.
+See the benchmark_import_time command.
+"""
+import importlib.util
+import sys
+
+
+def lazy_import(name):
+    """Module `name`, loaded on first attribute access (ImportError right away if missing)"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
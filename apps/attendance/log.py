@@ -0,0 +1,58 @@
+# apps/attendance/log.py
+"""
+Queue-based logging handler (used by settings.LOGGING)
+
+Request threads only put the LogRecord on a queue; a background listener
+thread formats it and writes it to the stream. Under gunicorn stdout is an
+unbuffered pipe, so this keeps both the formatting and the write off the
+request path. Stays importable without Django (dictConfig runs before apps load).
+"""
+import atexit
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+class QueueLogHandler(QueueHandler):
+    def __init__(self, stream=None, maxsize=10000):
+        self.maxsize = maxsize
+        self.target = logging.StreamHandler(stream)
+        self.dropped = 0
+        super().__init__(queue.Queue(maxsize))
+        self._start()
+        atexit.register(self.flush_and_stop)
+        # The listener thread does not survive fork() (gunicorn workers,
+        # the verification pool): give each child its own queue and thread
+        os.register_at_fork(after_in_child=self._restart)
+
+    def _start(self):
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=False)
+        self.listener.start()
+
+    def _restart(self):
+        self.queue = queue.Queue(self.maxsize)
+        self._start()
+
+    def setFormatter(self, fmt):
+        # Formatting is done by the target, on the listener thread
+        super().setFormatter(fmt)
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # QueueHandler.prepare() would format the message here, on the caller's
+        # thread; the record is handed over as-is instead (msg % args is done later)
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Never block a request on logging
+            self.dropped += 1
+
+    def flush_and_stop(self):
+        try:
+            self.listener.stop()
+        except Exception:
+            pass
@@ -0,0 +1,58 @@
+# apps/attendance/management/commands/audit_attendance_gps.py
+from datetime import timedelta
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.attendance.geofence import within_radius_many
+from apps.attendance.models import AttendanceRecord
+
+AUDIT_FIELDS = (
+    'id', 'gps_lat', 'gps_long',
+    'session__latitude', 'session__longitude', 'session__radius_meters',
+)
+
+
+class Command(BaseCommand):
+    help = "Re-validate stored attendance GPS points against their session's geofence"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--session', type=int, help='Only audit this session ID')
+        parser.add_argument('--days', type=int, help='Only audit records from the last N days')
+        parser.add_argument('--batch-size', type=int, default=50000,
+                            help='Points validated per vectorized call')
+        parser.add_argument('--show', type=int, default=20,
+                            help='List up to this many records outside their fence')
+
+    def handle(self, *args, **options):
+        records = AttendanceRecord.objects.filter(gps_lat__isnull=False, gps_long__isnull=False)
+        if options['session']:
+            records = records.filter(session_id=options['session'])
+        if options['days']:
+            records = records.filter(timestamp__gte=timezone.now() - timedelta(days=options['days']))
+
+        rows = records.order_by('id').values_list(*AUDIT_FIELDS).iterator(chunk_size=options['batch_size'])
+
+        checked, outside = 0, []
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= options['batch_size']:
+                checked += self.check_batch(batch, outside)
+                batch = []
+        if batch:
+            checked += self.check_batch(batch, outside)
+
+        for record_id, distance, radius in outside[:options['show']]:
+            self.stdout.write(f"  Record {record_id}: {distance:.0f} m from class (allowed {radius} m)")
+
+        style = self.style.WARNING if outside else self.style.SUCCESS
+        self.stdout.write(style(f"{checked} GPS points checked, {len(outside)} outside their geofence"))
+
+    def check_batch(self, batch, outside):
+        data = np.array(batch, dtype=np.float64)
+        inside, distances = within_radius_many(data[:, 1], data[:, 2], data[:, 3], data[:, 4], data[:, 5])
+        for i in np.flatnonzero(~inside):
+            outside.append((int(data[i, 0]), float(distances[i]), int(data[i, 5])))
+        return len(batch)
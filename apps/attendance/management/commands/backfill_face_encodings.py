@@ -0,0 +1,101 @@
+# apps/attendance/management/commands/backfill_face_encodings.py
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from apps.accounts.models import User
+from apps.attendance.utils import (
+    FACE_ENCODING_VERSION, NO_FACE_ENCODING, face_encoding_checked, get_face_encoding_from_image,
+    get_reference_image, pack_face_encoding,
+)
+
+ENCODING_FIELDS = ['face_encoding', 'face_encoding_version', 'face_encoding_source']
+
+
+def encode_reference(image_path):
+    """Unit of work for the pool: image path in, packed encoding (or None) out"""
+    encoding = get_face_encoding_from_image(image_path)
+    return None if encoding is None else pack_face_encoding(encoding)
+
+
+class Command(BaseCommand):
+    help = 'Precompute stored face encodings for every student with a reference or profile image'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Encoder processes (default: number of CPU cores)')
+        parser.add_argument('--chunk-size', type=int, default=200,
+                            help='Students encoded and written back per bulk_update')
+        parser.add_argument('--force', action='store_true',
+                            help='Recompute even encodings that are already current (or known faceless)')
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Stop after this many students (for trial runs)')
+
+    def handle(self, *args, **options):
+        chunk_size = max(1, options['chunk_size'])
+        workers = max(1, options['workers'])
+
+        students = User.objects.filter(user_type='student').exclude(
+            Q(reference_image='') | Q(reference_image__isnull=True),
+            Q(profile_image='') | Q(profile_image__isnull=True),
+        ).only('id', 'username', 'profile_image', 'reference_image', *ENCODING_FIELDS).order_by('id')
+
+        self.stdout.write(f"Backfilling face encodings ({FACE_ENCODING_VERSION}) with {workers} workers")
+
+        encoded = failed = skipped = 0
+        started = time.perf_counter()
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunk = []
+            for user in students.iterator(chunk_size=chunk_size):
+                if not options['force'] and face_encoding_checked(user):
+                    skipped += 1
+                    continue
+                chunk.append(user)
+                if options['limit'] and encoded + failed + len(chunk) >= options['limit']:
+                    break
+                if len(chunk) >= chunk_size:
+                    ok, bad = self.process_chunk(pool, chunk, workers)
+                    encoded, failed = encoded + ok, failed + bad
+                    self.report_progress(encoded, failed, started)
+                    chunk = []
+
+            if chunk:
+                ok, bad = self.process_chunk(pool, chunk, workers)
+                encoded, failed = encoded + ok, failed + bad
+
+        elapsed = time.perf_counter() - started
+        rate = (encoded + failed) / elapsed if elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {encoded} encoded, {failed} failed, {skipped} already checked "
+            f"in {elapsed:.1f}s ({rate:.2f} images/sec)"
+        ))
+
+    def process_chunk(self, pool, users, workers):
+        """Encode one chunk in parallel and write it back with a single bulk_update"""
+        paths = [get_reference_image(user).path for user in users]
+        results = pool.map(encode_reference, paths, chunksize=max(1, len(paths) // (workers * 4)))
+
+        encoded = failed = 0
+        for user, blob in zip(users, results):
+            if blob is None:
+                failed += 1
+                self.stderr.write(f"  No usable face for {user.username} ({get_reference_image(user).name})")
+            else:
+                encoded += 1
+            # A failure is stored too, so the image is not retried until it changes
+            user.face_encoding = NO_FACE_ENCODING if blob is None else blob
+            user.face_encoding_version = FACE_ENCODING_VERSION
+            user.face_encoding_source = get_reference_image(user).name
+
+        # Each chunk is committed on its own, so an interrupted run resumes where it stopped
+        User.objects.bulk_update(users, ENCODING_FIELDS)
+        return encoded, failed
+
+    def report_progress(self, encoded, failed, started):
+        elapsed = time.perf_counter() - started
+        rate = (encoded + failed) / elapsed if elapsed else 0.0
+        self.stdout.write(f"  {encoded + failed} processed ({failed} failed), {rate:.2f} images/sec")
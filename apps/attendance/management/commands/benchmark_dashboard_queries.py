@@ -0,0 +1,218 @@
+# apps/attendance/management/commands/benchmark_dashboard_queries.py
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from apps.accounts.models import Subject
+from apps.attendance.models import AttendanceRecord, AttendanceSession
+
+User = get_user_model()
+
+BENCH_PREFIX = 'bench_'
+
+
+def dashboard_queries(ctx):
+    """(name, queryset, runner) for each hot query, mirroring the views that issue it"""
+    since = timezone.now() - timedelta(days=30)
+    records = AttendanceRecord.objects.filter(session_id=ctx['session'])
+    return [
+        # accounts.views.dashboard (student)
+        ('active sessions',
+         AttendanceSession.objects.filter(is_active=True).order_by('-start_time'), list),
+        ('student history',
+         AttendanceRecord.objects.filter(student_id=ctx['student'], timestamp__gte=since)
+         .order_by('-timestamp')[:20], list),
+        # create_session / accounts.views.dashboard (staff)
+        ('teacher active session',
+         AttendanceSession.objects.filter(teacher_id=ctx['teacher'], is_active=True), list),
+        ('teacher recent sessions',
+         AttendanceSession.objects.filter(teacher_id=ctx['teacher']).order_by('-start_time')[:10], list),
+        # monitor_session / session_details (timed as COUNT(*))
+        ('session present count', records.filter(status='present'), lambda qs: qs.count()),
+        ('session pending count', records.filter(status='PENDING'), lambda qs: qs.count()),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed realistic attendance volumes and compare EXPLAIN plans and timings of the '
+        'dashboard queries with and without the attendance indexes (everything is rolled back)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--teachers', type=int, default=40)
+        parser.add_argument('--subjects-per-teacher', type=int, default=3)
+        parser.add_argument('--students', type=int, default=3000)
+        parser.add_argument('--class-size', type=int, default=60)
+        parser.add_argument('--sessions-per-subject', type=int, default=120)
+        parser.add_argument('--days', type=int, default=180,
+                            help='Spread seeded sessions over the last N days')
+        parser.add_argument('--active', type=int, default=15,
+                            help='Seeded sessions left open')
+        parser.add_argument('--present-rate', type=float, default=0.8)
+        parser.add_argument('--repeat', type=int, default=30,
+                            help='Timed executions per query and phase')
+        parser.add_argument('--no-explain', action='store_true', help='Only report timings')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        indexes = [
+            (model, index)
+            for model in (AttendanceSession, AttendanceRecord)
+            for index in model._meta.indexes
+        ]
+        self.check_indexes_exist(indexes)
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            ctx = self.seed(options)
+            self.analyze()
+            self.stdout.write(
+                f"Seeded {ctx['sessions']} sessions / {ctx['records']} records "
+                f"in {time.perf_counter() - started:.1f}s ({connection.vendor})\n"
+            )
+
+            schema_editor = connection.schema_editor()
+            with connection.cursor() as cursor:
+                for model, index in indexes:
+                    cursor.execute(schema_editor.sql_delete_index % {
+                        'table': schema_editor.quote_name(model._meta.db_table),
+                        'name': schema_editor.quote_name(index.name),
+                    })
+            self.analyze()
+            before = self.measure(ctx, options)
+
+            with connection.cursor() as cursor:
+                for model, index in indexes:
+                    cursor.execute(str(index.create_sql(model, schema_editor)))
+            self.analyze()
+            after = self.measure(ctx, options)
+
+            transaction.set_rollback(True)
+
+        self.report(before, after, options)
+
+    def check_indexes_exist(self, indexes):
+        missing = []
+        with connection.cursor() as cursor:
+            for model, index in indexes:
+                constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+                if index.name not in constraints:
+                    missing.append(index.name)
+        if missing:
+            raise CommandError(f"Missing indexes {', '.join(missing)}; run migrate first")
+
+    def seed(self, options):
+        now = timezone.now()
+        teachers = User.objects.bulk_create([
+            User(username=f'{BENCH_PREFIX}staff{i}', user_type='staff', password='!')
+            for i in range(options['teachers'])
+        ])
+        students = User.objects.bulk_create([
+            User(username=f'{BENCH_PREFIX}student{i}', user_type='student', password='!')
+            for i in range(options['students'])
+        ], batch_size=2000)
+        subjects = Subject.objects.bulk_create([
+            Subject(name=f'Bench subject {t}-{i}', code=f'BENCH{t}-{i}', staff=teacher)
+            for t, teacher in enumerate(teachers)
+            for i in range(options['subjects_per_teacher'])
+        ])
+
+        # Session codes are normally uuid hex; the Z prefix can't collide with them
+        sessions = []
+        span = options['days'] * 86400
+        for subject in subjects:
+            for _ in range(options['sessions_per_subject']):
+                start = now - timedelta(seconds=random.randint(3600, span))
+                sessions.append(AttendanceSession(
+                    teacher_id=subject.staff_id, subject=subject, start_time=start,
+                    end_time=start + timedelta(hours=1), is_active=False,
+                    session_code=f'Z{len(sessions):08d}',
+                ))
+        for session in random.sample(sessions, min(options['active'], len(sessions))):
+            session.is_active, session.end_time = True, None
+            session.start_time = now - timedelta(minutes=random.randint(1, 50))
+        sessions = AttendanceSession.objects.bulk_create(sessions, batch_size=5000)
+
+        # Each subject has a fixed class; every session gets records for part of it
+        classes = {
+            subject.id: random.sample(students, min(options['class_size'], len(students)))
+            for subject in subjects
+        }
+        records, total = [], 0
+        for session in sessions:
+            for student in classes[session.subject_id]:
+                if random.random() > options['present_rate'] + 0.05:
+                    continue
+                status = 'present' if random.random() < 0.95 else 'PENDING'
+                records.append(AttendanceRecord(session=session, student=student, status=status))
+            if len(records) >= 20000:
+                AttendanceRecord.objects.bulk_create(records)
+                total += len(records)
+                records = []
+        AttendanceRecord.objects.bulk_create(records)
+        total += len(records)
+
+        # timestamp is auto_now_add; move each record to its session's start
+        AttendanceRecord.objects.filter(session__session_code__startswith='Z').update(
+            timestamp=Subquery(
+                AttendanceSession.objects.filter(id=OuterRef('session_id')).values('start_time')[:1]
+            )
+        )
+
+        active = [s for s in sessions if s.is_active]
+        busiest_class = classes[active[0].subject_id] if active else students
+        return {
+            'teacher': active[0].teacher_id if active else teachers[0].id,
+            'student': busiest_class[0].id,
+            'session': active[0].id if active else sessions[0].id,
+            'sessions': len(sessions),
+            'records': total,
+        }
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                for model in (User, Subject, AttendanceSession, AttendanceRecord):
+                    cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+            elif connection.vendor == 'sqlite':
+                cursor.execute('ANALYZE')
+
+    def measure(self, ctx, options):
+        explain = {}
+        if connection.vendor == 'postgresql':
+            explain = {'analyze': True, 'buffers': True}
+        results = {}
+        for name, queryset, runner in dashboard_queries(ctx):
+            runner(queryset.all())  # warm the cache and the plan
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                runner(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            plan = '' if options['no_explain'] else queryset.explain(**explain)
+            results[name] = (statistics.median(timings), plan)
+        return results
+
+    def report(self, before, after, options):
+        if not options['no_explain']:
+            for name in before:
+                self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {name} =="))
+                for label, plan in (('without indexes', before[name][1]), ('with indexes', after[name][1])):
+                    self.stdout.write(f"-- {label}")
+                    for line in plan.splitlines():
+                        self.stdout.write(f"   {line}")
+
+        self.stdout.write(f"\n{'query':<26} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+        for name in before:
+            old, new = before[name][0], after[name][0]
+            speedup = old / new if new else float('inf')
+            self.stdout.write(f"{name:<26} {old:>10.3f} {new:>10.3f} {speedup:>7.1f}x")
@@ -0,0 +1,90 @@
+# apps/attendance/management/commands/benchmark_face_detection.py
+import os
+import time
+
+import face_recognition
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.attendance.utils import detect_faces, load_image_opencv
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the accuracy/latency trade-off of downscale-before-detect on a folder '
+        'of selfies (e.g. media/attendance_captures)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('images', help='Directory containing face images')
+        parser.add_argument('--sizes', default='320,480,640,800,1024',
+                            help='Comma separated detection sizes (longest side in px)')
+        parser.add_argument('--upsample', type=int, default=0,
+                            help='Upsample passes used on the downscaled copy')
+        parser.add_argument('--threshold', type=float, default=0.5,
+                            help='Match threshold used by verify_my_face')
+
+    def handle(self, *args, **options):
+        paths = sorted(
+            os.path.join(options['images'], name)
+            for name in os.listdir(options['images'])
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        if not paths:
+            raise CommandError(f"No images found in {options['images']}")
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+
+        # Baseline: the old pipeline (full resolution, upsample 1)
+        images, baseline, baseline_times = [], [], []
+        for path in paths:
+            image = load_image_opencv(path)
+            started = time.perf_counter()
+            locations = face_recognition.face_locations(image, number_of_times_to_upsample=1, model='hog')
+            baseline_times.append(time.perf_counter() - started)
+            if len(locations) != 1:
+                continue
+            images.append(image)
+            baseline.append(face_recognition.face_encodings(image, locations)[0])
+
+        if not images:
+            raise CommandError('No image had exactly one face at full resolution')
+
+        self.stdout.write(
+            f"{len(images)} usable images of {len(paths)}; "
+            f"baseline detect {np.mean(baseline_times) * 1000:.1f} ms/image\n"
+        )
+        self.stdout.write(
+            f"{'size':>6} {'detect ms':>10} {'encode ms':>10} {'found %':>8} "
+            f"{'Δdist mean':>11} {'Δdist max':>10} {'flips':>6}"
+        )
+
+        for size in sizes:
+            detect_ms, encode_ms, drifts = [], [], []
+            found = flips = 0
+            for image, reference in zip(images, baseline):
+                started = time.perf_counter()
+                locations = detect_faces(image, max_dim=size, upsample=options['upsample'])
+                detect_ms.append((time.perf_counter() - started) * 1000)
+                if len(locations) != 1:
+                    continue
+                found += 1
+
+                started = time.perf_counter()
+                encoding = face_recognition.face_encodings(image, locations)[0]
+                encode_ms.append((time.perf_counter() - started) * 1000)
+
+                drift = float(np.linalg.norm(encoding - reference))
+                drifts.append(drift)
+                # A verdict flip is possible when the drift alone crosses the threshold
+                if drift >= options['threshold']:
+                    flips += 1
+
+            self.stdout.write(
+                f"{size:>6} {np.mean(detect_ms):>10.1f} "
+                f"{(np.mean(encode_ms) if encode_ms else 0):>10.1f} "
+                f"{found * 100 / len(images):>8.1f} "
+                f"{(np.mean(drifts) if drifts else 0):>11.4f} "
+                f"{(np.max(drifts) if drifts else 0):>10.4f} {flips:>6}"
+            )
@@ -0,0 +1,78 @@
+# apps/attendance/management/commands/benchmark_import_time.py
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+HEAVY_MODULES = ('face_recognition', 'dlib', 'cv2', 'numpy', 'PIL.Image', 'openpyxl')
+
+# Run in a fresh interpreter per measurement; {setup} and {work} are filled per scenario
+CHILD = '''
+import json, resource, sys, time
+started = time.perf_counter()
+{setup}
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns  # imports every view module, like the first request
+{work}
+elapsed = time.perf_counter() - started
+loaded = [
+    name for name in {heavy!r}
+    if name in sys.modules and type(sys.modules[name]).__name__ != '_LazyModule'
+]
+print(json.dumps({{
+    'seconds': elapsed,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'loaded': loaded,
+}}))
+'''
+
+SCENARIOS = (
+    # What migrate / collectstatic / admin / login requests pay
+    ('web startup', '', ''),
+    # The same with the CV stack imported up front, as before lazy imports
+    ('web startup, eager CV imports',
+     'import face_recognition, cv2, numpy, PIL.Image, openpyxl', ''),
+    # First face verification in the process (import + model warm-up)
+    ('face verification ready', '',
+     'from apps.attendance.utils import warm_up_face_models; warm_up_face_models()'),
+)
+
+
+class Command(BaseCommand):
+    help = 'Measure process startup time and memory with and without the face/CV stack loaded'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per scenario')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get(
+            'DJANGO_SETTINGS_MODULE', 'smart_attendance.settings'
+        ))
+        env['FACE_PRELOAD_MODELS'] = '0'
+
+        self.stdout.write(f"{'scenario':<32} {'median s':>9} {'min s':>7} {'max RSS MB':>11}  heavy modules loaded")
+        for name, setup, work in SCENARIOS:
+            code = CHILD.format(setup=setup, work=work, heavy=HEAVY_MODULES)
+            runs = []
+            for _ in range(options['runs']):
+                proc = subprocess.run(
+                    [sys.executable, '-c', code], cwd=settings.BASE_DIR, env=env,
+                    capture_output=True, text=True,
+                )
+                if proc.returncode != 0:
+                    error = (proc.stderr.strip().splitlines() or ['unknown error'])[-1]
+                    self.stdout.write(self.style.WARNING(f"{name:<32} failed: {error}"))
+                    break
+                runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+            else:
+                seconds = [run['seconds'] for run in runs]
+                self.stdout.write(
+                    f"{name:<32} {statistics.median(seconds):>9.3f} {min(seconds):>7.3f} "
+                    f"{max(run['max_rss_mb'] for run in runs):>11.1f}  {', '.join(runs[-1]['loaded']) or '-'}"
+                )
@@ -0,0 +1,234 @@
+# apps/attendance/management/commands/benchmark_mark_attendance.py
+import json
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import cv2
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from apps.accounts.models import Subject
+from apps.attendance.models import AttendanceSession
+from apps.attendance.timing import collect_timings
+from apps.attendance.verification import reset_verification_pool
+
+User = get_user_model()
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+# Worker-side stages first, then the request-side ones
+STAGES = ('decode', 'detect', 'encode', 'compare', 'verify', 'reference', 'db')
+# Besides 2xx: a failed verification (face-less synthetic images always fail)
+EXPECTED_ERROR_STATUSES = {400}
+
+
+def percentiles(values):
+    if not values:
+        return {'p50': None, 'p95': None, 'p99': None}
+    p50, p95, p99 = np.percentile(np.asarray(values) * 1000, [50, 95, 99])
+    return {'p50': round(p50, 2), 'p95': round(p95, 2), 'p99': round(p99, 2)}
+
+
+def synthetic_image(index, size):
+    """Deterministic JPEG with no face in it: exercises decode/detect but never matches"""
+    rng = np.random.default_rng(index)
+    height = int(size * 0.75)
+    gradient = np.linspace(0, 255, size, dtype=np.float32)[None, :, None]
+    image = np.clip(gradient + rng.normal(0, 30, (height, size, 3)), 0, 255).astype(np.uint8)
+    ok, data = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return data.tobytes()
+
+
+class Command(BaseCommand):
+    help = (
+        'Offline load test of /api/mark-attendance/: seeds students and active sessions in a '
+        'throwaway test database and fires concurrent selfie uploads through the test client'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=40)
+        parser.add_argument('--sessions', type=int, default=1,
+                            help='Active sessions; every student marks each of them once')
+        parser.add_argument('--concurrency', type=int, default=8, help='Client threads')
+        parser.add_argument('--images', help=(
+            'Directory of face photos (one person each), used as both reference and selfie. '
+            'Without it synthetic face-less images are used'
+        ))
+        parser.add_argument('--image-size', type=int, default=960,
+                            help='Longest side of the synthetic images')
+        parser.add_argument('--workers', type=int,
+                            help='Override FACE_VERIFY_WORKERS (0 = verify in the request thread)')
+        parser.add_argument('--queue-depth', type=int, help='Override FACE_VERIFY_QUEUE_DEPTH')
+        parser.add_argument('--json', dest='json_path', help='Also write the summary to this file')
+        parser.add_argument('--max-p95', type=float, help=(
+            'Exit with an error if the p95 latency (ms) exceeds this (CI gate). '
+            'Requires --images, so that every stage up to the record write is measured'
+        ))
+
+    def handle(self, *args, **options):
+        if options['max_p95'] and not options['images']:
+            # Face-less synthetic images stop at detection and would pass the gate cheaply
+            raise CommandError('--max-p95 needs --images: a directory of real face photos')
+        images = self.load_images(options)
+
+        overrides = {'MEDIA_ROOT': tempfile.mkdtemp(prefix='attendance-bench-')}
+        if options['workers'] is not None:
+            overrides['FACE_VERIFY_WORKERS'] = options['workers']
+        if options['queue_depth'] is not None:
+            overrides['FACE_VERIFY_QUEUE_DEPTH'] = options['queue_depth']
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(**overrides):
+                reset_verification_pool()
+                jobs = self.seed(images, options)
+                self.stdout.write(
+                    f"Seeded {options['students']} students / {options['sessions']} sessions; "
+                    f"firing {len(jobs)} requests with {options['concurrency']} threads\n"
+                )
+                results, wall = self.fire(jobs, options['concurrency'])
+        finally:
+            reset_verification_pool()
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(overrides['MEDIA_ROOT'], ignore_errors=True)
+
+        summary = self.summarize(results, wall)
+        self.report(summary)
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump(summary, fh, indent=2)
+        unexpected = {
+            status: count for status, count in summary['status'].items()
+            if not status.startswith('2') and int(status) not in EXPECTED_ERROR_STATUSES
+        }
+        if unexpected:
+            raise CommandError(f'Unexpected status codes {unexpected}; the timings are not comparable')
+        if options['max_p95'] and 'encode' not in summary['stages_ms']:
+            raise CommandError('No face was encoded; --images must contain one face per photo')
+        if options['max_p95'] and summary['latency_ms']['p95'] > options['max_p95']:
+            raise CommandError(
+                f"p95 latency {summary['latency_ms']['p95']} ms exceeds {options['max_p95']} ms"
+            )
+
+    def load_images(self, options):
+        if not options['images']:
+            return [synthetic_image(i, options['image_size']) for i in range(options['students'])]
+        paths = sorted(
+            os.path.join(options['images'], name)
+            for name in os.listdir(options['images'])
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        if not paths:
+            raise CommandError(f"No images found in {options['images']}")
+        images = []
+        for path in paths:
+            with open(path, 'rb') as fh:
+                images.append(fh.read())
+        return images
+
+    def seed(self, images, options):
+        teacher = User.objects.create(username='bench_teacher', user_type='staff')
+        subject = Subject.objects.create(name='Benchmark', code='BENCH', staff=teacher)
+        sessions = [
+            AttendanceSession.objects.create(teacher=teacher, subject=subject, is_active=True)
+            for _ in range(options['sessions'])
+        ]
+
+        jobs = []
+        for i in range(options['students']):
+            image = images[i % len(images)]
+            student = User(username=f'bench_student{i}', user_type='student')
+            # Saving the reference also stores its encoding (accounts.signals)
+            student.reference_image.save(f'bench_{i}.jpg', ContentFile(image), save=False)
+            student.save()
+
+            client = Client()
+            client.force_login(student)
+            cookie = client.cookies[settings.SESSION_COOKIE_NAME].value
+            for session in sessions:
+                jobs.append((cookie, session, image))
+        return jobs
+
+    def fire(self, jobs, concurrency):
+        url = reverse('mark_attendance_api')
+        pending = queue.SimpleQueue()
+        for job in jobs:
+            pending.put(job)
+        results, lock = [], threading.Lock()
+
+        def worker():
+            try:
+                while True:
+                    try:
+                        cookie, session, image = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    client = Client()
+                    client.cookies[settings.SESSION_COOKIE_NAME] = cookie
+                    data = {
+                        'session': session.id,
+                        'gps_lat': session.latitude,
+                        'gps_long': session.longitude,
+                        'captured_image': SimpleUploadedFile('selfie.jpg', image, content_type='image/jpeg'),
+                    }
+                    with collect_timings() as timings:
+                        started = time.perf_counter()
+                        response = client.post(url, data)
+                        elapsed = time.perf_counter() - started
+                    with lock:
+                        results.append((elapsed, response.status_code, dict(timings)))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, time.perf_counter() - started
+
+    def summarize(self, results, wall):
+        latencies = [elapsed for elapsed, _, _ in results]
+        stages = {}
+        for name in STAGES:
+            values = [timings[name] for _, _, timings in results if name in timings]
+            if values:
+                stages[name] = {'mean': round(float(np.mean(values)) * 1000, 2), **percentiles(values)}
+        return {
+            'requests': len(results),
+            'seconds': round(wall, 3),
+            'throughput_rps': round(len(results) / wall, 2) if wall else None,
+            'status': dict(Counter(str(status) for _, status, _ in results)),
+            'latency_ms': percentiles(latencies),
+            'stages_ms': stages,
+        }
+
+    def report(self, summary):
+        latency = summary['latency_ms']
+        self.stdout.write(
+            f"{summary['requests']} requests in {summary['seconds']}s "
+            f"→ {summary['throughput_rps']} req/s"
+        )
+        self.stdout.write(f"Status codes: {summary['status']}")
+        self.stdout.write(f"Latency p50 {latency['p50']} ms | p95 {latency['p95']} ms | p99 {latency['p99']} ms\n")
+        self.stdout.write(f"{'stage':<10} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+        for name, row in summary['stages_ms'].items():
+            self.stdout.write(
+                f"{name:<10} {row['mean']:>9} {row['p50']:>9} {row['p95']:>9} {row['p99']:>9}"
+            )
@@ -0,0 +1,16 @@
+# apps/attendance/management/commands/rebuild_attendance_summary.py
+from django.core.management.base import BaseCommand
+
+from apps.attendance.summary import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = 'Recompute the AttendanceSummary table from the raw attendance records'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subject', type=int, action='append', dest='subjects',
+                            help='Only rebuild this subject ID (repeatable)')
+
+    def handle(self, *args, **options):
+        rows = rebuild_summaries(options['subjects'])
+        self.stdout.write(self.style.SUCCESS(f"Attendance summary rebuilt: {rows} rows"))
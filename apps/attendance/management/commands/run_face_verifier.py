@@ -0,0 +1,60 @@
+# apps/attendance/management/commands/run_face_verifier.py
+import asyncio
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.attendance.face_service import FaceServiceClient, FaceVerificationServer, FaceServiceUnavailable
+from apps.attendance.utils import warm_up_face_models
+from apps.attendance.verification import VerificationPool, VerificationTimeout
+
+
+class Command(BaseCommand):
+    help = 'Run the standalone face verification service (see apps/attendance/face_service.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bind', default=settings.FACE_VERIFIER_ADDRESS or '127.0.0.1:8765',
+            help="'unix:/path/to.sock' or 'host:port' (default: FACE_VERIFIER_ADDRESS)",
+        )
+        parser.add_argument('--workers', type=int, default=settings.FACE_VERIFY_WORKERS,
+                            help='Verification processes')
+        parser.add_argument('--queue-depth', type=int, default=settings.FACE_VERIFY_QUEUE_DEPTH,
+                            help='Jobs queued beyond the busy workers before answering busy')
+        parser.add_argument('--check', action='store_true',
+                            help='Probe a running service at --bind and exit (non-zero if down)')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            client = FaceServiceClient(
+                options['bind'], timeout=settings.FACE_VERIFIER_CONNECT_TIMEOUT,
+                connect_timeout=settings.FACE_VERIFIER_CONNECT_TIMEOUT,
+            )
+            try:
+                self.stdout.write(json.dumps(client.ping()))
+            except (FaceServiceUnavailable, VerificationTimeout) as e:
+                raise CommandError(f'Face service is down: {e}')
+            finally:
+                client.close()
+            return
+
+        if options['workers'] < 1:
+            raise CommandError('The service needs at least one worker process')
+
+        # Warm the models here so the worker processes are forked with them loaded
+        warm_up_face_models()
+        pool = VerificationPool(
+            workers=options['workers'],
+            queue_depth=options['queue_depth'],
+            timeout=settings.FACE_VERIFY_TIMEOUT,
+            retry_after=settings.FACE_VERIFY_RETRY_AFTER,
+        )
+        pool.start()
+
+        try:
+            asyncio.run(FaceVerificationServer(pool).serve(options['bind']))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            pool.shutdown()
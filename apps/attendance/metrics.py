@@ -0,0 +1,152 @@
+# apps/attendance/metrics.py
+"""
+In-process Prometheus-style metrics for the attendance pipeline
+
+Histograms and counters are rendered in the Prometheus text exposition format by
+render_metrics() (served by views.metrics at /metrics). Each web worker
+process keeps its own registry, so with several gunicorn workers a scrape
+only sees the worker that answered it.
+"""
+import json
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.http import JsonResponse
+
+from .timing import collect_timings, merge_timings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} histogram',
+        ]
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            labels = list(zip(self.labelnames, key))
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{_format_labels(labels + [("le", repr(bound))])} {count}')
+            lines.append(f'{self.name}_bucket{_format_labels(labels + [("le", "+Inf")])} {series[-1]}')
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {series[-2]}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {series[-1]}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}  # label values -> count
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} counter',
+        ]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f'{self.name}{_format_labels(list(zip(self.labelnames, key)))} {value}')
+        return lines
+
+
+def render_metrics():
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+STAGE_SECONDS = Histogram(
+    'attendance_stage_seconds',
+    'Time spent in each stage of an attendance request (decode/detect/encode/compare/db/...)',
+    ('endpoint', 'stage'),
+)
+REQUEST_SECONDS = Histogram(
+    'attendance_request_seconds',
+    'End-to-end latency of attendance endpoints',
+    ('endpoint', 'status'),
+)
+DASHBOARD_CACHE_LOOKUPS = Counter(
+    'attendance_dashboard_cache_total',
+    'Student dashboard fragment cache lookups',
+    ('fragment', 'result'),
+)
+
+
+def observe_timings(endpoint, timings):
+    for stage_name, seconds in (timings or {}).items():
+        STAGE_SECONDS.observe(seconds, endpoint=endpoint, stage=stage_name)
+
+
+def instrumented(endpoint):
+    """
+    View decorator: collects the view's stage() timings, records them (and the
+    total latency) in the histograms, and in DEBUG adds them to JSON responses
+    as 'timings' (milliseconds)
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            started = time.perf_counter()
+            with collect_timings() as timings:
+                response = view(request, *args, **kwargs)
+            merge_timings(timings)  # e.g. benchmark_mark_attendance's collector
+            REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, status=response.status_code)
+            observe_timings(endpoint, timings)
+
+            if settings.DEBUG and isinstance(response, JsonResponse):
+                payload = json.loads(response.content)
+                if isinstance(payload, dict):
+                    payload['timings'] = timings.as_ms()
+                    response.content = json.dumps(payload)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.9 on 2026-10-17 04:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Q
+
+
+def populate_summaries(apps, schema_editor):
+    AttendanceRecord = apps.get_model('attendance', 'AttendanceRecord')
+    AttendanceSession = apps.get_model('attendance', 'AttendanceSession')
+    AttendanceSummary = apps.get_model('attendance', 'AttendanceSummary')
+
+    closed = dict(
+        AttendanceSession.objects.filter(is_active=False)
+        .values_list('subject_id').annotate(n=Count('id'))
+    )
+    rows = AttendanceRecord.objects.values('student_id', 'session__subject_id').annotate(
+        present=Count('id', filter=Q(status='present')),
+        last=Max('timestamp', filter=Q(status='present')),
+    )
+    AttendanceSummary.objects.bulk_create([
+        AttendanceSummary(
+            student_id=row['student_id'],
+            subject_id=row['session__subject_id'],
+            present_count=row['present'],
+            total_sessions=closed.get(row['session__subject_id'], 0),
+            last_marked=row['last'],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_face_encoding_version'),
+        ('attendance', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('present_count', models.PositiveIntegerField(default=0)),
+                ('total_sessions', models.PositiveIntegerField(default=0)),
+                ('last_marked', models.DateTimeField(blank=True, null=True)),
+                ('student', models.ForeignKey(limit_choices_to={'user_type': 'student'}, on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summaries', to=settings.AUTH_USER_MODEL)),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summaries', to='accounts.subject')),
+            ],
+            options={
+                'unique_together': {('student', 'subject')},
+            },
+        ),
+        migrations.RunPython(populate_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.9 on 2026-10-17 04:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_face_encoding_version'),
+        ('attendance', '0002_attendancesummary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendancerecord',
+            index=models.Index(fields=['student', '-timestamp'], name='att_record_student_time'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancerecord',
+            index=models.Index(fields=['session', 'status'], name='att_record_session_status'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancesession',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-start_time'], name='att_session_active_start'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancesession',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['teacher'], name='att_session_teacher_active'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancesession',
+            index=models.Index(fields=['teacher', '-start_time'], name='att_session_teacher_start'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.9 on 2026-10-17 10:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Q
+
+
+def clear_summaries(apps, schema_editor):
+    # Re-keyed per teacher below; the rows are recomputed from the records
+    apps.get_model('attendance', 'AttendanceSummary').objects.all().delete()
+
+
+def populate_summaries(apps, schema_editor):
+    AttendanceRecord = apps.get_model('attendance', 'AttendanceRecord')
+    AttendanceSession = apps.get_model('attendance', 'AttendanceSession')
+    AttendanceSummary = apps.get_model('attendance', 'AttendanceSummary')
+
+    closed = {
+        (subject_id, teacher_id): n
+        for subject_id, teacher_id, n in AttendanceSession.objects.filter(is_active=False)
+        .values_list('subject_id', 'teacher_id').annotate(n=Count('id'))
+    }
+    rows = AttendanceRecord.objects.values('student_id', 'session__subject_id', 'session__teacher_id').annotate(
+        present=Count('id', filter=Q(status='present')),
+        last=Max('timestamp', filter=Q(status='present')),
+    )
+    AttendanceSummary.objects.bulk_create([
+        AttendanceSummary(
+            student_id=row['student_id'],
+            subject_id=row['session__subject_id'],
+            teacher_id=row['session__teacher_id'],
+            present_count=row['present'],
+            total_sessions=closed.get((row['session__subject_id'], row['session__teacher_id']), 0),
+            last_marked=row['last'],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_face_encoding_version'),
+        ('attendance', '0003_attendance_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_summaries, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='attendancesummary',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='attendancesummary',
+            name='teacher',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='taught_attendance_summaries', to=settings.AUTH_USER_MODEL),
+            preserve_default=False,
+        ),
+        migrations.AlterUniqueTogether(
+            name='attendancesummary',
+            unique_together={('student', 'subject', 'teacher')},
+        ),
+        migrations.RunPython(populate_summaries, migrations.RunPython.noop),
+    ]
@@ -19,6 +19,22 @@ class AttendanceSession(models.Model):
     longitude = models.FloatField(default=78.4468, help_text="Class Location Longitude")
     radius_meters = models.IntegerField(default=200, help_text="Allowed radius in meters")
 
+    class Meta:
+        indexes = [
+            # Student dashboard: every open session, newest first
+            models.Index(
+                fields=['-start_time'], name='att_session_active_start',
+                condition=models.Q(is_active=True),
+            ),
+            # create_session / staff dashboard: the teacher's open session
+            models.Index(
+                fields=['teacher'], name='att_session_teacher_active',
+                condition=models.Q(is_active=True),
+            ),
+            # Staff dashboard / view_reports: the teacher's sessions, newest first
+            models.Index(fields=['teacher', '-start_time'], name='att_session_teacher_start'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.session_code:
             import uuid
@@ -46,6 +62,32 @@ class AttendanceRecord(models.Model):
 
     class Meta:
         unique_together = ['session', 'student']
+        indexes = [
+            # Student history: their records since a date, newest first
+            models.Index(fields=['student', '-timestamp'], name='att_record_student_time'),
+            # Monitor / session details: present and pending counts per session
+            models.Index(fields=['session', 'status'], name='att_record_session_status'),
+        ]
+
+    def __str__(self):
+        return f"{self.student.username} - {self.status}"
+
+class AttendanceSummary(models.Model):
+    """
+    Per-student attendance totals of a subject as taught by one teacher,
+    maintained incrementally (see attendance/summary.py) so reports don't
+    rescan every AttendanceRecord
+    """
+    student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, limit_choices_to={'user_type': 'student'}, related_name='attendance_summaries')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='attendance_summaries')
+    teacher = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='taught_attendance_summaries')
+    present_count = models.PositiveIntegerField(default=0)
+    # Sessions of the teacher in the subject that have been closed (end_session)
+    total_sessions = models.PositiveIntegerField(default=0)
+    last_marked = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ['student', 'subject', 'teacher']
 
     def __str__(self):
-        return f"{self.student.username} - {self.status}"
\ No newline at end of file
+        return f"{self.student.username} - {self.subject.code}: {self.present_count}/{self.total_sessions}"
@@ -0,0 +1,181 @@
+# apps/attendance/reports.py - ATTENDANCE REPORTING SERVICE
+#
+# Shared by the attendance calculator, the Excel export and any API that needs
+# per-student totals for a subject. Totals are read from the materialized
+# AttendanceSummary rows instead of two COUNT queries per student.
+
+from django.db.models import Count, Q
+
+from apps.accounts.models import User
+from .lazy import lazy_import
+from .models import AttendanceRecord, AttendanceSession, AttendanceSummary
+
+np = lazy_import('numpy')
+
+
+def subject_sessions(teacher, subject):
+    """All sessions of a subject held by this teacher, oldest first"""
+    return AttendanceSession.objects.filter(
+        teacher=teacher,
+        subject=subject
+    ).order_by('start_time')
+
+
+def session_totals(teacher, subject):
+    """(all sessions, sessions still open) of a subject, in one query"""
+    totals = subject_sessions(teacher, subject).aggregate(
+        total=Count('id'),
+        open=Count('id', filter=Q(is_active=True)),
+    )
+    return totals['total'], totals['open']
+
+
+def subject_summaries(teacher, subject):
+    """
+    Materialized per-student totals of the teacher's sessions of a subject
+    (see summary.py); reading them costs one row per student instead of a
+    scan of the subject's records
+    """
+    return AttendanceSummary.objects.filter(
+        subject=subject,
+        teacher=teacher,
+        student__user_type='student',
+    ).select_related('student').only(
+        'present_count', 'total_sessions', 'student__id', 'student__username', 'student__user_type',
+        'student__first_name', 'student__last_name', 'student__email', 'student__student_id',
+    ).order_by('student__student_id')
+
+
+def attendance_row(student, total_sessions, present_count):
+    """Report row shared by the calculator page and the exports"""
+    percentage = (present_count / total_sessions) * 100 if total_sessions > 0 else 0
+    return {
+        'student': student,
+        'roll_number': student.student_id or 'N/A',
+        'name': student.get_full_name() or student.username,
+        'email': student.email,
+        'total_days': total_sessions,
+        'present_days': present_count,
+        'absent_days': total_sessions - present_count,
+        'percentage': round(percentage, 2)
+    }
+
+
+def summarize(attendance_data, total_sessions):
+    """Overall statistics for a list of report rows"""
+    total_students = len(attendance_data)
+    if total_students:
+        avg_attendance = sum(d['percentage'] for d in attendance_data) / total_students
+        students_above_75 = sum(1 for d in attendance_data if d['percentage'] >= 75)
+    else:
+        avg_attendance = 0
+        students_above_75 = 0
+
+    return {
+        'total_students': total_students,
+        'total_sessions': total_sessions,
+        'avg_attendance': round(avg_attendance, 2),
+        'students_above_75': students_above_75,
+        'students_below_75': total_students - students_above_75
+    }
+
+
+def subject_attendance_report(teacher, subject):
+    """
+    Per-student attendance for one subject
+    Returns (total_sessions, attendance_data sorted by roll number, stats)
+    """
+    total_sessions, open_sessions = session_totals(teacher, subject)
+
+    # Summary rows count closed sessions; sessions still running count as held too
+    attendance_data = [
+        attendance_row(summary.student, summary.total_sessions + open_sessions, summary.present_count)
+        for summary in subject_summaries(teacher, subject)
+    ]
+    attendance_data.sort(key=lambda x: x['roll_number'])
+
+    return total_sessions, attendance_data, summarize(attendance_data, total_sessions)
+
+
+def iter_subject_summaries(teacher, subject, chunk_size=2000):
+    """
+    Summary rows of the teacher's subject as plain tuples
+    (roll_number, first_name, last_name, username, email, present_count, total_sessions)
+    streamed through a server-side cursor, for exports of any size
+    """
+    return subject_summaries(teacher, subject).values_list(
+        'student__student_id', 'student__first_name', 'student__last_name',
+        'student__username', 'student__email', 'present_count', 'total_sessions'
+    ).iterator(chunk_size=chunk_size)
+
+
+# --- REGISTER (students x sessions matrix) ---
+MARK_ABSENT, MARK_PRESENT, MARK_PENDING = 0, 1, 2
+MARK_CODES = {'present': MARK_PRESENT, 'PENDING': MARK_PENDING}
+MARK_SYMBOLS = ('A', 'P', '?')  # indexed by MARK_* code
+
+
+class AttendanceRegister:
+    """
+    Classic attendance register of one subject
+    sessions: [(session_id, start_time)] oldest first
+    students: [(student_id, roll_number, name)] by roll number
+    marks: uint8 matrix (students x sessions) of MARK_* codes
+    """
+
+    def __init__(self, sessions, students, marks):
+        self.sessions = sessions
+        self.students = students
+        self.marks = marks
+
+    @property
+    def present_counts(self):
+        return (self.marks == MARK_PRESENT).sum(axis=1)
+
+    def rows(self):
+        """(roll_number, name, [P/A/? per session], present, percentage) per student"""
+        total = len(self.sessions)
+        symbols = np.array(MARK_SYMBOLS)[self.marks]
+        for (_, roll_number, name), marks, present in zip(self.students, symbols, self.present_counts):
+            percentage = round(int(present) * 100 / total, 2) if total else 0
+            yield roll_number, name, marks.tolist(), int(present), percentage
+
+
+def build_register(teacher, subject):
+    """
+    Register of a subject from one (student, session, status) query,
+    pivoted into a dense matrix without a lookup per cell
+    """
+    sessions = list(subject_sessions(teacher, subject).values_list('id', 'start_time'))
+
+    triples = list(AttendanceRecord.objects.filter(
+        session__teacher=teacher,
+        session__subject=subject,
+    ).values_list('student_id', 'session_id', 'status'))
+
+    student_ids = sorted({student_id for student_id, _, _ in triples})
+    students = sorted(
+        (
+            (user_id, roll_number or 'N/A', f"{first_name} {last_name}".strip() or username)
+            for user_id, roll_number, first_name, last_name, username in User.objects.filter(
+                id__in=student_ids
+            ).values_list('id', 'student_id', 'first_name', 'last_name', 'username')
+        ),
+        key=lambda student: student[1]
+    )
+
+    marks = np.zeros((len(students), len(sessions)), dtype=np.uint8)
+    if triples and sessions:
+        row_ids = np.array([student[0] for student in students], dtype=np.int64)
+        col_ids = np.array([session[0] for session in sessions], dtype=np.int64)
+        row_order, col_order = np.argsort(row_ids), np.argsort(col_ids)
+
+        record_students = np.array([t[0] for t in triples], dtype=np.int64)
+        record_sessions = np.array([t[1] for t in triples], dtype=np.int64)
+        codes = np.array([MARK_CODES.get(t[2], MARK_ABSENT) for t in triples], dtype=np.uint8)
+
+        rows = row_order[np.searchsorted(row_ids, record_students, sorter=row_order)]
+        cols = col_order[np.searchsorted(col_ids, record_sessions, sorter=col_order)]
+        marks[rows, cols] = codes
+
+    return AttendanceRegister(sessions, students, marks)
@@ -0,0 +1,156 @@
+# apps/attendance/summary.py - MATERIALIZED ATTENDANCE SUMMARY
+#
+# AttendanceSummary holds (student, subject, teacher) -> present_count,
+# total_sessions, last_marked, the same scope as the teacher's reports.
+# present_count moves when a record turns 'present'; total_sessions moves
+# when end_session closes a session of the teacher in the subject.
+# rebuild_summaries() reconciles everything from the raw records.
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Q
+from django.utils import timezone
+
+from .models import AttendanceRecord, AttendanceSession, AttendanceSummary
+
+
+def closed_session_count(subject_id, teacher_id):
+    return AttendanceSession.objects.filter(subject_id=subject_id, teacher_id=teacher_id, is_active=False).count()
+
+
+def record_marked_present(student_id, session, when=None):
+    """One record of this student in `session` has just turned 'present'"""
+    records_marked_present(session, [student_id], when)
+
+
+def records_marked_present(session, student_ids, when=None):
+    """Bulk version of record_marked_present"""
+    if not student_ids:
+        return
+    when = when or timezone.now()
+    scope = {'subject_id': session.subject_id, 'teacher_id': session.teacher_id}
+
+    summaries = AttendanceSummary.objects.filter(student_id__in=student_ids, **scope)
+    existing = set(summaries.values_list('student_id', flat=True))
+    summaries.update(present_count=F('present_count') + 1, last_marked=when)
+
+    missing = [student_id for student_id in student_ids if student_id not in existing]
+    if not missing:
+        return
+
+    total_sessions = closed_session_count(**scope)
+    for student_id in missing:
+        try:
+            with transaction.atomic():
+                AttendanceSummary.objects.create(
+                    student_id=student_id,
+                    present_count=1,
+                    total_sessions=total_sessions,
+                    last_marked=when,
+                    **scope
+                )
+        except IntegrityError:
+            # Created concurrently by another request: just count this mark
+            AttendanceSummary.objects.filter(student_id=student_id, **scope).update(
+                present_count=F('present_count') + 1, last_marked=when
+            )
+
+
+def recount_student_summaries(session, student_ids):
+    """
+    Recompute present_count and last_marked of these students in the
+    session's subject and teacher from their records, for writes that
+    cannot tell which rows they inserted (bulk_create with ignore_conflicts)
+    """
+    if not student_ids:
+        return
+    scope = {'subject_id': session.subject_id, 'teacher_id': session.teacher_id}
+    rows = AttendanceRecord.objects.filter(
+        student_id__in=student_ids,
+        session__subject_id=session.subject_id,
+        session__teacher_id=session.teacher_id,
+    ).values('student_id').annotate(
+        present=Count('id', filter=Q(status='present')),
+        last=Max('timestamp', filter=Q(status='present')),
+    )
+
+    total_sessions = closed_session_count(**scope)
+    AttendanceSummary.objects.bulk_create(
+        [
+            AttendanceSummary(
+                student_id=row['student_id'],
+                present_count=row['present'],
+                total_sessions=total_sessions,
+                last_marked=row['last'],
+                **scope
+            )
+            for row in rows
+        ],
+        # total_sessions of existing rows is session_closed's to move
+        update_conflicts=True,
+        unique_fields=['student', 'subject', 'teacher'],
+        update_fields=['present_count', 'last_marked'],
+    )
+
+
+def session_closed(session):
+    """
+    A session has ended: it now counts for every student of the teacher's
+    subject. Students first seen in this session get their row here.
+    """
+    scope = {'subject_id': session.subject_id, 'teacher_id': session.teacher_id}
+    AttendanceSummary.objects.filter(**scope).update(
+        total_sessions=F('total_sessions') + 1
+    )
+
+    total_sessions = closed_session_count(**scope)
+    student_ids = AttendanceRecord.objects.filter(session=session).values_list('student_id', flat=True)
+    AttendanceSummary.objects.bulk_create(
+        [
+            AttendanceSummary(student_id=student_id, total_sessions=total_sessions, **scope)
+            for student_id in student_ids
+        ],
+        ignore_conflicts=True
+    )
+
+
+def rebuild_summaries(subject_ids=None):
+    """
+    Recompute the summary table from scratch (optionally for some subjects only)
+    Returns the number of rows written
+    """
+    records = AttendanceRecord.objects.all()
+    sessions = AttendanceSession.objects.filter(is_active=False)
+    if subject_ids is not None:
+        records = records.filter(session__subject_id__in=subject_ids)
+        sessions = sessions.filter(subject_id__in=subject_ids)
+
+    closed = {
+        (subject_id, teacher_id): n
+        for subject_id, teacher_id, n in sessions.values_list('subject_id', 'teacher_id').annotate(n=Count('id'))
+    }
+
+    rows = records.values('student_id', 'session__subject_id', 'session__teacher_id').annotate(
+        present=Count('id', filter=Q(status='present')),
+        last=Max('timestamp', filter=Q(status='present')),
+    )
+
+    summaries = [
+        AttendanceSummary(
+            student_id=row['student_id'],
+            subject_id=row['session__subject_id'],
+            teacher_id=row['session__teacher_id'],
+            present_count=row['present'],
+            total_sessions=closed.get((row['session__subject_id'], row['session__teacher_id']), 0),
+            last_marked=row['last'],
+        )
+        for row in rows.iterator(chunk_size=5000)
+    ]
+
+    with transaction.atomic():
+        existing = AttendanceSummary.objects.all()
+        if subject_ids is not None:
+            existing = existing.filter(subject_id__in=subject_ids)
+        existing.delete()
+        AttendanceSummary.objects.bulk_create(summaries, batch_size=1000)
+
+    return len(summaries)
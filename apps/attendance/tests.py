@@ -1,3 +1,753 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.accounts.models import User, Subject
+from . import counters, jobs
+from .face_index import FaceIndex
+from .face_service import (
+    STATUS_BUSY, STATUS_ERROR, FaceServiceClient, _error, _raise_for_status,
+    decode_verify_request, decode_verify_result, encode_verify_request, encode_verify_result,
+)
+from .geofence import Geofence, haversine_m
+from .models import AttendanceSession, AttendanceRecord, AttendanceSummary
+from .reports import MARK_ABSENT, MARK_PENDING, MARK_PRESENT, build_register
+from .summary import record_marked_present, rebuild_summaries, session_closed
+from .utils import FACE_ENCODING_VERSION, NO_FACE_ENCODING, pack_face_encoding
+from .verification import VerificationBusy
+
+# Process-local caches, so no test sees the counters or fragments of another
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'},
+    'attendance': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-attendance'},
+}
+
+MATCH = {'match': True, 'confidence': 91.0, 'distance': 0.09, 'message': 'Face verified'}
+NO_MATCH = {'match': False, 'confidence': 20.0, 'distance': 0.8, 'message': 'Face does not match'}
+
+
+def unit_vector(axis, scale=1.0):
+    vector = np.zeros(128, dtype=np.float32)
+    vector[axis] = scale
+    return vector
+
+
+class AttendanceFixtures:
+    """A teacher, an active session and a temporary MEDIA_ROOT; the face pipeline is patched per test"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp(prefix='attendance-tests-')
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.teacher = User.objects.create_user('teacher', password='x', user_type='staff')
+        self.subject = Subject.objects.create(name='Physics', code='PHY1', staff=self.teacher)
+        self.session = AttendanceSession.objects.create(
+            subject=self.subject, teacher=self.teacher,
+            latitude=17.4468, longitude=78.4468, radius_meters=100,
+        )
+
+    def make_student(self, username, encoding=None, department='CSE'):
+        """A student with a reference photo and, if given, its current stored encoding"""
+        student = User(username=username, user_type='student', department=department, student_id=username.upper())
+        # The post_save encoding is not what these tests are about
+        with mock.patch('apps.attendance.utils.get_face_encoding_from_image', return_value=None):
+            student.reference_image.save(f'{username}.jpg', ContentFile(b'reference photo'), save=False)
+            student.save()
+        User.objects.filter(pk=student.pk).update(
+            face_encoding=None if encoding is None else pack_face_encoding(encoding),
+            face_encoding_version='' if encoding is None else FACE_ENCODING_VERSION,
+            face_encoding_source='' if encoding is None else student.reference_image.name,
+        )
+        student.refresh_from_db()
+        return student
+
+    def selfie(self, content=b'selfie'):
+        return SimpleUploadedFile('selfie.jpg', content, content_type='image/jpeg')
+
+    def mark(self, student, **data):
+        self.client.force_login(student)
+        return self.client.post(reverse('mark_attendance_api'), {
+            'session': self.session.id, 'captured_image': self.selfie(), **data,
+        })
+
+
+@override_settings(CACHES=TEST_CACHES, FACE_VERIFIER_ADDRESS='')
+class AttendanceViewTestCase(AttendanceFixtures, TestCase):
+    pass
+
+
+@override_settings(CACHES=TEST_CACHES, FACE_VERIFIER_ADDRESS='')
+class AttendanceTransactionTestCase(AttendanceFixtures, TransactionTestCase):
+    """For work settled on another thread, which only sees committed rows"""
+
+    def settle(self):
+        # Runs after whatever the request queued on the single settling thread
+        jobs._settle_executor.submit(int).result(timeout=5)
+
+
+class ReferenceEncodingViewTests(AttendanceViewTestCase):
+    @mock.patch('apps.attendance.views.run_face_check', return_value=MATCH)
+    @mock.patch('apps.attendance.face_service.run_face_encode', return_value=(unit_vector(0), None))
+    def test_missing_encoding_is_computed_and_stored(self, run_face_encode, run_face_check):
+        student = self.make_student('alice')
+
+        response = self.mark(student)
+
+        self.assertEqual(response.status_code, 200, response.content)
+        run_face_encode.assert_called_once_with(b'reference photo')
+        np.testing.assert_allclose(run_face_check.call_args.kwargs['known_encoding'], unit_vector(0))
+        student.refresh_from_db()
+        self.assertEqual(student.face_encoding, pack_face_encoding(unit_vector(0)))
+        self.assertEqual(student.face_encoding_source, student.reference_image.name)
+
+    @mock.patch('apps.attendance.views.run_face_check', return_value=MATCH)
+    @mock.patch('apps.attendance.face_service.run_face_encode')
+    def test_current_encoding_is_reused(self, run_face_encode, run_face_check):
+        response = self.mark(self.make_student('alice', encoding=unit_vector(1)))
+
+        self.assertEqual(response.status_code, 200, response.content)
+        run_face_encode.assert_not_called()
+        np.testing.assert_allclose(run_face_check.call_args.kwargs['known_encoding'], unit_vector(1))
+
+    @mock.patch('apps.attendance.views.run_face_check')
+    @mock.patch('apps.attendance.face_service.run_face_encode', return_value=(None, 'No face detected.'))
+    def test_reference_without_a_face_is_only_tried_once(self, run_face_encode, run_face_check):
+        student = self.make_student('alice')
+
+        for _ in range(2):
+            response = self.mark(student)
+            self.assertEqual(response.status_code, 400, response.content)
+            self.assertIn('profile photo', response.json()['error'])
+
+        run_face_encode.assert_called_once()
+        run_face_check.assert_not_called()
+        self.assertFalse(AttendanceRecord.objects.exists())
+        student.refresh_from_db()
+        self.assertEqual(bytes(student.face_encoding), NO_FACE_ENCODING)
+
+    @mock.patch('apps.attendance.utils.get_face_encoding_from_image', return_value=None)
+    def test_saving_a_faceless_reference_encodes_it_once(self, get_face_encoding_from_image):
+        student = self.make_student('alice')
+        student.reference_image.save('new.jpg', ContentFile(b'new photo'))
+        student.first_name = 'Alice'
+        student.save()
+
+        get_face_encoding_from_image.assert_called_once()
+        student.refresh_from_db()
+        self.assertEqual(bytes(student.face_encoding), NO_FACE_ENCODING)
+        self.assertEqual(student.face_encoding_source, student.reference_image.name)
+
+
+def done_future(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+class AsyncMarkingViewTests(AttendanceTransactionTestCase):
+    def mark_async(self, student, result):
+        with mock.patch('apps.attendance.views.submit_face_check', return_value=result) as submit:
+            response = self.mark(student, **{'async': '1'})
+        self.assertEqual(response.status_code, 202, response.content)
+        submit.assert_called_once()
+        return response.json()
+
+    def job_status(self, job_id):
+        return self.client.get(reverse('attendance_job_status', args=[job_id]))
+
+    def test_match_marks_the_pending_record_present(self):
+        student = self.make_student('alice', encoding=unit_vector(0))
+
+        job = self.mark_async(student, done_future(MATCH))
+        self.settle()
+
+        self.assertEqual(AttendanceRecord.objects.get(pk=job['job_id']).status, 'present')
+        response = self.job_status(job['job_id'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'present')
+
+    def test_rejection_deletes_the_record_and_the_selfie(self):
+        student = self.make_student('alice', encoding=unit_vector(0))
+
+        job = self.mark_async(student, done_future(NO_MATCH))
+        selfie_path = os.path.join(settings.MEDIA_ROOT, 'attendance_captures')
+        self.settle()
+
+        self.assertFalse(AttendanceRecord.objects.exists())
+        self.assertEqual(os.listdir(selfie_path) if os.path.isdir(selfie_path) else [], [])
+        response = self.job_status(job['job_id'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'job_id': job['job_id'], 'status': 'rejected',
+            'error': NO_MATCH['message'], 'confidence': NO_MATCH['confidence'],
+        })
+
+    def test_unknown_and_foreign_jobs_are_not_found(self):
+        alice = self.make_student('alice', encoding=unit_vector(0))
+        job = self.mark_async(alice, done_future(NO_MATCH))
+        self.settle()
+
+        self.client.force_login(self.make_student('bob', encoding=unit_vector(1)))
+        self.assertEqual(self.job_status(job['job_id']).status_code, 404)
+        self.assertEqual(self.job_status(job['job_id'] + 1000).status_code, 404)
+
+    @override_settings(ATTENDANCE_PENDING_TIMEOUT=0)
+    def test_unfinished_check_is_rejected_at_the_deadline(self):
+        student = self.make_student('alice', encoding=unit_vector(0))
+        never_done = Future()
+
+        job = self.mark_async(student, never_done)
+        for _ in range(50):
+            if not AttendanceRecord.objects.exists():
+                break
+            time.sleep(0.1)
+        self.settle()
+
+        self.assertFalse(AttendanceRecord.objects.exists())
+        self.assertTrue(never_done.cancelled())
+        self.assertEqual(self.job_status(job['job_id']).json()['error'], jobs.TIMED_OUT_MESSAGE)
+
+    @mock.patch('apps.attendance.views.run_face_check', return_value=MATCH)
+    def test_stale_pending_record_does_not_block_a_new_attempt(self, run_face_check):
+        student = self.make_student('alice', encoding=unit_vector(0))
+        stale = AttendanceRecord.objects.create(session=self.session, student=student, status='PENDING')
+        AttendanceRecord.objects.filter(pk=stale.pk).update(
+            timestamp=timezone.now() - timedelta(seconds=settings.ATTENDANCE_PENDING_TIMEOUT + 1)
+        )
+
+        response = self.mark(student)
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(list(AttendanceRecord.objects.values_list('status', flat=True)), ['present'])
+
+
+class AttendanceDataTestCase(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user('teacher', password='x', user_type='staff')
+        self.subject = Subject.objects.create(name='Physics', code='PHY1', staff=self.teacher)
+        self.students = [
+            User.objects.create_user(f'student{i}', password='x', user_type='student', student_id=f'R{i}')
+            for i in range(3)
+        ]
+
+    def start_session(self, teacher=None):
+        return AttendanceSession.objects.create(
+            subject=self.subject, teacher=teacher or self.teacher, latitude=0, longitude=0,
+        )
+
+    def end_session(self, session):
+        session.is_active = False
+        session.save()
+        session_closed(session)
+
+    def mark(self, session, student, status='present'):
+        record = AttendanceRecord.objects.create(session=session, student=student, status=status)
+        if status == 'present':
+            record_marked_present(student.id, session, record.timestamp)
+        return record
+
+
+class SummaryTests(AttendanceDataTestCase):
+    def summaries(self):
+        return sorted(AttendanceSummary.objects.values_list(
+            'student__username', 'teacher__username', 'present_count', 'total_sessions'
+        ))
+
+    def test_marks_and_closed_sessions_are_counted(self):
+        first = self.start_session()
+        self.mark(first, self.students[0])
+        self.mark(first, self.students[1], status='absent')
+        self.end_session(first)
+        second = self.start_session()
+        self.mark(second, self.students[0])
+        self.mark(second, self.students[2])
+
+        # The running session is not counted as held yet
+        self.assertEqual(self.summaries(), [
+            ('student0', 'teacher', 2, 1),
+            ('student1', 'teacher', 0, 1),
+            ('student2', 'teacher', 1, 1),
+        ])
+        self.end_session(second)
+        self.assertEqual([row[3] for row in self.summaries()], [2, 2, 2])
+
+    def test_summaries_are_kept_per_teacher(self):
+        other = User.objects.create_user('other', password='x', user_type='staff')
+        mine, theirs = self.start_session(), self.start_session(other)
+        self.mark(mine, self.students[0])
+        self.mark(theirs, self.students[0])
+        self.end_session(theirs)
+        self.assertEqual(self.summaries(), [
+            ('student0', 'other', 1, 1),
+            ('student0', 'teacher', 1, 0),
+        ])
+
+    def test_rebuild_matches_the_increments(self):
+        first = self.start_session()
+        self.mark(first, self.students[0])
+        self.mark(first, self.students[1], status='absent')
+        self.end_session(first)
+        self.mark(self.start_session(), self.students[1])
+
+        incremental = self.summaries()
+        rebuild_summaries()
+        self.assertEqual(self.summaries(), incremental)
+
+
+class GroupPhotoViewTests(AttendanceViewTestCase):
+    def post_group_photo(self, *students):
+        pool = mock.Mock()
+        pool.run.return_value = ([(0, 1, 1, 0)] * len(students), [unit_vector(i) for i in range(len(students))])
+        index = mock.Mock()
+        index.assign.return_value = [(face, student.id, 0.1) for face, student in enumerate(students)]
+        self.client.force_login(self.teacher)
+        with mock.patch('apps.attendance.views.get_verification_pool', return_value=pool), \
+                mock.patch('apps.attendance.views.get_face_index', return_value=index):
+            return self.client.post(reverse('group_photo_attendance', args=[self.session.id]), {
+                'group_photo': self.selfie(b'classroom'),
+            })
+
+    def present_counts(self):
+        return dict(AttendanceSummary.objects.values_list('student__username', 'present_count'))
+
+    def test_identified_students_are_marked_once(self):
+        alice, bob = self.make_student('alice'), self.make_student('bob')
+        AttendanceRecord.objects.create(session=self.session, student=bob, status='present')
+        record_marked_present(bob.id, self.session)
+
+        response = self.post_group_photo(alice, bob)
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['marked'], 1)
+        self.assertEqual(response.json()['already_marked'], 1)
+        self.assertEqual(self.present_counts(), {'alice': 1, 'bob': 1})
+
+    def test_student_marked_concurrently_is_not_counted_twice(self):
+        alice, bob = self.make_student('alice'), self.make_student('bob')
+        bulk_create = AttendanceRecord.objects.bulk_create
+
+        def kiosk_marks_bob_first(records, **kwargs):
+            # bob's kiosk mark lands between the read of already marked students and the insert
+            AttendanceRecord.objects.create(session=self.session, student=bob, status='present')
+            record_marked_present(bob.id, self.session)
+            return bulk_create(records, **kwargs)
+
+        with mock.patch.object(AttendanceRecord.objects, 'bulk_create', side_effect=kiosk_marks_bob_first):
+            response = self.post_group_photo(alice, bob)
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(AttendanceRecord.objects.filter(session=self.session).count(), 2)
+        self.assertEqual(self.present_counts(), {'alice': 1, 'bob': 1})
+
+
+class FileCacheCounterTests(AttendanceViewTestCase):
+    """The session counters on the default file cache backend"""
+
+    def setUp(self):
+        super().setUp()
+        cache_dir = tempfile.mkdtemp(prefix='attendance-cache-')
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        file_cache = override_settings(CACHES={**TEST_CACHES, 'attendance': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir,
+        }})
+        file_cache.enable()
+        self.addCleanup(file_cache.disable)
+
+    def monitor_totals(self):
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse('monitor_session', args=[self.session.id]))
+        return response.context['total_present'], response.context['total_pending']
+
+    @mock.patch('apps.attendance.views.run_face_check', return_value=MATCH)
+    def test_marks_are_counted_in_the_cache(self, run_face_check):
+        self.assertTrue(counters.counters_cached())
+        self.assertEqual(self.monitor_totals(), (0, 0))
+
+        self.assertEqual(self.mark(self.make_student('alice', encoding=unit_vector(0))).status_code, 200)
+
+        with mock.patch('apps.attendance.counters.count_session_records') as count_session_records:
+            self.assertEqual(self.monitor_totals(), (1, 0))
+        count_session_records.assert_not_called()
+
+    def test_concurrent_increments_are_not_lost(self):
+        counters.reconcile_session_counters(self.session.id)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for _ in range(40):
+                executor.submit(counters.adjust_session_counters, self.session.id, present=1, pending=-1)
+
+        self.assertEqual(counters.session_counters(self.session.id), {'present': 40, 'pending': -40})
+
+
+class FaceServiceProtocolTests(SimpleTestCase):
+    def test_verify_request_round_trip(self):
+        encoding = np.linspace(-1, 1, 128)
+        body = encode_verify_request('profile_images/a.jpg', b'\xff\xd8jpeg', 0.45, encoding)
+        reference, image, threshold, decoded = decode_verify_request(body)
+        self.assertEqual(reference, 'profile_images/a.jpg')
+        self.assertEqual(image, b'\xff\xd8jpeg')
+        self.assertAlmostEqual(threshold, 0.45, places=6)
+        np.testing.assert_allclose(decoded, encoding, atol=1e-6)
+
+    def test_verify_request_without_reference_or_encoding(self):
+        reference, image, _, decoded = decode_verify_request(encode_verify_request(None, b'img', 0.5, None))
+        self.assertIsNone(reference)
+        self.assertIsNone(decoded)
+        self.assertEqual(image, b'img')
+
+    def test_verify_result_round_trip(self):
+        result = {
+            'match': True, 'distance': 0.312, 'confidence': 68.8, 'message': 'Verified ✓',
+            'timings': {'decode': 0.01, 'detect': 0.125},
+        }
+        decoded = decode_verify_result(encode_verify_result(result))
+        self.assertTrue(decoded['match'])
+        self.assertAlmostEqual(decoded['distance'], 0.312, places=5)
+        self.assertAlmostEqual(decoded['confidence'], 68.8, places=2)
+        self.assertEqual(decoded['message'], 'Verified ✓')
+        self.assertEqual(list(decoded['timings']), ['decode', 'detect'])
+        self.assertAlmostEqual(decoded['timings']['detect'], 0.125, places=6)
+
+    def test_busy_answer_carries_retry_after(self):
+        with self.assertRaises(VerificationBusy) as caught:
+            _raise_for_status(_error(STATUS_BUSY, code=7))
+        self.assertEqual(caught.exception.retry_after, 7)
+
+    def test_error_answer_is_a_failed_verification(self):
+        client = FaceServiceClient('127.0.0.1:9', timeout=1)
+        with mock.patch.object(client, 'call', return_value=_error(STATUS_ERROR, 'ValueError: truncated image')):
+            result = client.verify('profile_images/a.jpg', b'img', 0.5)
+        self.assertFalse(result['match'])
+        self.assertIn('truncated image', result['message'])
+
+
+class FaceIndexTests(TestCase):
+    def setUp(self):
+        self.index = FaceIndex(max_age=0)
+        self.index.build()  # empty database: only the upserts below are indexed
+        self.index.upsert(1, 'cse', unit_vector(0))
+        self.index.upsert(2, 'cse', unit_vector(1))
+        self.index.upsert(3, 'ece', unit_vector(2))
+
+    def test_search_orders_by_distance_and_applies_threshold(self):
+        probe = unit_vector(0, 0.9)
+        self.assertEqual([student for student, _ in self.index.search(probe, threshold=0.5)], [1])
+        results = self.index.search(probe, threshold=2.0)
+        self.assertEqual([student for student, _ in results], [1, 2, 3])
+        self.assertAlmostEqual(results[0][1], 0.1, places=5)
+
+    def test_search_is_limited_to_a_partition(self):
+        results = self.index.search(unit_vector(2), partition=' ECE ', threshold=2.0)
+        self.assertEqual([student for student, _ in results], [3])
+
+    def test_upsert_moves_and_remove_drops_a_student(self):
+        self.index.upsert(1, 'ece', unit_vector(3))
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.index.search(unit_vector(3), partition='cse', threshold=0.5), [])
+        self.index.remove(1)
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual(self.index.search(unit_vector(3), threshold=0.5), [])
+
+    def test_assign_uses_every_face_and_student_once(self):
+        # Both faces are closest to student 1; the closer one wins, the other gets student 2
+        faces = [unit_vector(0, 0.95), unit_vector(0, 0.8) + unit_vector(1, 0.3)]
+        assigned = self.index.assign(faces, threshold=1.2)
+        self.assertEqual([(face, student) for face, student, _ in assigned], [(0, 1), (1, 2)])
+
+    def test_assign_skips_faces_above_threshold(self):
+        self.assertEqual(self.index.assign([unit_vector(5)], threshold=0.5), [])
+        self.assertEqual(self.index.assign([], threshold=0.5), [])
+
+
+class KioskIdentifyViewTests(AttendanceViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = self.make_student('alice', encoding=unit_vector(0), department='CSE')
+        self.bob = self.make_student('bob', encoding=unit_vector(1), department='ECE')
+        self.index = FaceIndex(max_age=0)
+        self.index.build()
+
+    def identify(self, probe, **data):
+        self.client.force_login(self.teacher)
+        with mock.patch('apps.attendance.views.run_face_encode', return_value=(probe, None)), \
+                mock.patch('apps.attendance.views.get_face_index', return_value=self.index):
+            return self.client.post(reverse('kiosk_identify', args=[self.session.id]), {
+                'captured_image': self.selfie(), **data,
+            })
+
+    def test_identified_student_is_marked_once(self):
+        first = self.identify(unit_vector(0, 0.95))
+        self.assertEqual(first.status_code, 200, first.content)
+        self.assertEqual(first.json()['student']['id'], self.alice.id)
+        self.assertFalse(first.json()['already_marked'])
+
+        second = self.identify(unit_vector(0, 0.95))
+        self.assertTrue(second.json()['already_marked'])
+        self.assertEqual(AttendanceRecord.objects.get().student, self.alice)
+
+    def test_unknown_face_and_other_department_are_not_recognised(self):
+        self.assertEqual(self.identify(unit_vector(5)).status_code, 404)
+        self.assertEqual(self.identify(unit_vector(1), department='CSE').status_code, 404)
+        self.assertFalse(AttendanceRecord.objects.exists())
+
+    def test_only_the_session_teacher_can_identify(self):
+        self.client.force_login(self.alice)
+        response = self.client.post(reverse('kiosk_identify', args=[self.session.id]), {
+            'captured_image': self.selfie(),
+        })
+        self.assertEqual(response.status_code, 404)
+
+
+class GeofenceTests(SimpleTestCase):
+    def test_haversine_distance(self):
+        # One degree of latitude is ~111.2 km on the mean sphere
+        self.assertAlmostEqual(haversine_m(17.0, 78.0, 18.0, 78.0), 111195, delta=5)
+        self.assertEqual(haversine_m(17.4468, 78.4468, 17.4468, 78.4468), 0)
+
+    def test_contains_uses_the_radius(self):
+        fence = Geofence(17.4468, 78.4468, 100)
+        self.assertTrue(fence.contains(17.4475, 78.4468))   # ~78 m north
+        self.assertFalse(fence.contains(17.4480, 78.4468))  # ~133 m north
+
+    def test_bounding_box_covers_the_circle(self):
+        fence = Geofence(60.0, 10.0, 1000)
+        self.assertTrue(fence.in_bounding_box(60.0, 10.017))   # ~945 m east
+        self.assertFalse(fence.in_bounding_box(60.0, 10.02))   # ~1.1 km east
+        self.assertFalse(fence.in_bounding_box(60.01, 10.0))   # ~1.1 km north
+
+    def test_bounding_box_across_the_antimeridian(self):
+        fence = Geofence(0.0, 179.9999, 1000)
+        self.assertTrue(fence.in_bounding_box(0.0, -179.9999))
+        self.assertTrue(fence.contains(0.0, -179.9999))
+
+
+class GeofenceViewTests(AttendanceViewTestCase):
+    @mock.patch('apps.attendance.views.run_face_check', return_value=MATCH)
+    def test_marks_outside_the_radius_are_rejected(self, run_face_check):
+        student = self.make_student('alice', encoding=unit_vector(0))
+
+        response = self.mark(student, gps_lat=17.4480, gps_long=78.4468)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('too far', response.json()['error'])
+        run_face_check.assert_not_called()
+
+        self.assertEqual(self.mark(student, gps_lat=17.4475, gps_long=78.4468).status_code, 200)
+
+
+class BuildRegisterTests(AttendanceDataTestCase):
+    def test_marks_matrix(self):
+        first, second = self.start_session(), self.start_session()
+        self.mark(first, self.students[0])
+        self.mark(first, self.students[1], status='PENDING')
+        self.mark(second, self.students[1])
+        self.mark(second, self.students[2], status='absent')
+
+        register = build_register(self.teacher, self.subject)
+
+        self.assertEqual([session_id for session_id, _ in register.sessions], [first.id, second.id])
+        self.assertEqual([roll for _, roll, _ in register.students], ['R0', 'R1', 'R2'])
+        self.assertEqual(register.marks.tolist(), [
+            [MARK_PRESENT, MARK_ABSENT],
+            [MARK_PENDING, MARK_PRESENT],
+            [MARK_ABSENT, MARK_ABSENT],
+        ])
+        rows = list(register.rows())
+        self.assertEqual(rows[1], ('R1', 'student1', ['?', 'P'], 1, 50.0))
+
+    def test_other_teachers_sessions_are_left_out(self):
+        other = User.objects.create_user('other', password='x', user_type='staff')
+        self.mark(self.start_session(other), self.students[0])
+        register = build_register(self.teacher, self.subject)
+        self.assertEqual(register.sessions, [])
+        self.assertEqual(register.students, [])
+        self.assertEqual(register.marks.shape, (0, 0))
+
+    def test_csv_download(self):
+        session = self.start_session()
+        self.mark(session, self.students[0])
+        self.client.force_login(self.teacher)
+
+        response = self.client.get(reverse('download_attendance_register'), {'subject': self.subject.id})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        # Header, then the students with a record in the teacher's sessions
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith('R0,student0,P,1,'))
+
+
+class SessionRecordsViewTests(AttendanceViewTestCase):
+    def get_records(self, etag=None, **params):
+        self.client.force_login(self.teacher)
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(reverse('session_records_api', args=[self.session.id]), params, **headers)
+
+    def test_unchanged_records_answer_304(self):
+        alice = self.make_student('alice')
+        record = AttendanceRecord.objects.create(session=self.session, student=alice, status='PENDING')
+
+        first = self.get_records()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual([row['name'] for row in first.json()['records']], ['alice'])
+        self.assertEqual(self.get_records(first['ETag']).status_code, 304)
+
+        AttendanceRecord.objects.filter(pk=record.pk).update(status='present')
+        changed = self.get_records(first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()['present'], 1)
+
+    def test_since_and_pending_cursor(self):
+        alice, bob = self.make_student('alice'), self.make_student('bob')
+        pending = AttendanceRecord.objects.create(session=self.session, student=alice, status='PENDING')
+        cursor = self.get_records().json()['cursor']
+        AttendanceRecord.objects.create(session=self.session, student=bob, status='present')
+        pending_id = pending.pk
+        pending.delete()
+
+        response = self.get_records(since=cursor, pending=str(pending_id)).json()
+
+        self.assertEqual([row['name'] for row in response['records']], ['bob'])
+        self.assertEqual(response['removed'], [pending_id])
+
+    def test_other_teachers_session_is_forbidden(self):
+        other = User.objects.create_user('other', password='x', user_type='staff')
+        self.client.force_login(other)
+        response = self.client.get(reverse('session_records_api', args=[self.session.id]))
+        self.assertEqual(response.status_code, 403)
+
+
+class AttendanceCalendarViewTests(AttendanceViewTestCase):
+    def record(self, student, when, status, session=None):
+        session = session or AttendanceSession.objects.create(
+            subject=self.subject, teacher=self.teacher, latitude=0, longitude=0,
+        )
+        record = AttendanceRecord.objects.create(session=session, student=student, status=status)
+        AttendanceRecord.objects.filter(pk=record.pk).update(timestamp=timezone.make_aware(when))
+
+    def calendar(self, student, month=None):
+        self.client.force_login(student)
+        return self.client.get(reverse('attendance_calendar_api'), {'month': month} if month else {})
+
+    def test_days_of_the_requested_month(self):
+        alice = self.make_student('alice')
+        self.record(alice, datetime(2026, 3, 5, 9), 'absent')
+        self.record(alice, datetime(2026, 3, 5, 11), 'present')
+        self.record(alice, datetime(2026, 3, 6, 9), 'absent')
+        self.record(alice, datetime(2026, 3, 31, 9), 'PENDING')
+        self.record(alice, datetime(2026, 4, 1, 9), 'present')
+
+        response = self.calendar(alice, '2026-03')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'month': '2026-03', 'days': {
+            '2026-03-05': 'present', '2026-03-06': 'absent', '2026-03-31': 'PENDING',
+        }})
+        self.assertIn('max-age=3600', response['Cache-Control'])
+
+    def test_invalid_month_is_rejected(self):
+        alice = self.make_student('alice')
+        for month in ('2026-13', 'march', '2026'):
+            self.assertEqual(self.calendar(alice, month).status_code, 400, month)
+
+    @mock.patch('apps.attendance.views.run_face_check', return_value=MATCH)
+    def test_current_month_shows_a_new_mark(self, run_face_check):
+        alice = self.make_student('alice', encoding=unit_vector(0))
+        self.assertEqual(self.calendar(alice).json()['days'], {})
+
+        self.assertEqual(self.mark(alice).status_code, 200)
+
+        response = self.calendar(alice)
+        self.assertEqual(list(response.json()['days'].values()), ['present'])
+        self.assertIn('no-cache', response['Cache-Control'])
+
+
+class StudentDashboardCacheTests(AttendanceViewTestCase):
+    def dashboard(self, student):
+        self.client.force_login(student)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return response.context
+
+    @mock.patch('apps.attendance.views.run_face_check', return_value=MATCH)
+    def test_marking_refreshes_the_cached_fragments(self, run_face_check):
+        alice = self.make_student('alice', encoding=unit_vector(0))
+        before = self.dashboard(alice)
+        self.assertEqual([session.id for session in before['active_sessions']], [self.session.id])
+        self.assertEqual(list(before['marked_session_ids']), [])
+        self.assertEqual(list(before['attendance_history']), [])
+
+        self.assertEqual(self.mark(alice).status_code, 200)
+
+        after = self.dashboard(alice)
+        self.assertEqual(list(after['marked_session_ids']), [self.session.id])
+        self.assertEqual([record.status for record in after['attendance_history']], ['present'])
+
+    def test_starting_and_ending_sessions_refreshes_the_active_list(self):
+        alice = self.make_student('alice')
+        self.assertEqual(len(self.dashboard(alice)['active_sessions']), 1)
+
+        self.client.force_login(self.teacher)
+        self.client.get(reverse('end_session', args=[self.session.id]))
+        self.assertEqual(list(self.dashboard(alice)['active_sessions']), [])
+
+        self.client.force_login(self.teacher)
+        self.client.get(reverse('create_session', args=[self.subject.id]))
+        self.assertEqual(
+            [session.id for session in self.dashboard(alice)['active_sessions']],
+            list(AttendanceSession.objects.filter(is_active=True).values_list('id', flat=True)),
+        )
+        self.assertEqual(len(self.dashboard(alice)['active_sessions']), 1)
+
+
+class SyncMarkingViewTests(AttendanceViewTestCase):
+    def stored_selfies(self):
+        directory = os.path.join(settings.MEDIA_ROOT, 'attendance_captures')
+        return os.listdir(directory) if os.path.isdir(directory) else []
+
+    @mock.patch('apps.attendance.views.run_face_check', return_value=MATCH)
+    def test_match_stores_the_record_and_the_selfie(self, run_face_check):
+        response = self.mark(self.make_student('alice', encoding=unit_vector(0)))
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(run_face_check.call_args.args[1], b'selfie')
+        record = AttendanceRecord.objects.get()
+        self.assertEqual(record.status, 'present')
+        with record.captured_image.open('rb') as image:
+            self.assertEqual(image.read(), b'selfie')
+
+    @mock.patch('apps.attendance.views.run_face_check', return_value=NO_MATCH)
+    def test_failed_match_writes_nothing(self, run_face_check):
+        response = self.mark(self.make_student('alice', encoding=unit_vector(0)))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], NO_MATCH['message'])
+        self.assertFalse(AttendanceRecord.objects.exists())
+        self.assertEqual(self.stored_selfies(), [])
+
+    @mock.patch('apps.attendance.views.run_face_check', return_value=MATCH)
+    def test_second_attempt_is_already_marked(self, run_face_check):
+        student = self.make_student('alice', encoding=unit_vector(0))
+        self.assertEqual(self.mark(student).status_code, 200)
+
+        response = self.mark(student)
+
+        self.assertEqual(run_face_check.call_count, 1)
+        self.assertEqual(AttendanceRecord.objects.count(), 1)
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.json()['already_marked'])
@@ -0,0 +1,65 @@
+# apps/attendance/timing.py
+"""
+Per-request stage timings for the attendance pipeline
+
+    with collect_timings() as timings:      # benchmark / view
+        ...
+        with stage('detect'):              # anywhere below it
+            ...
+    timings -> {'detect': 0.041, ...}      # seconds
+
+stage() is a no-op when nothing is collecting. Timings are kept in a
+ContextVar, so they do not cross into the verification pool's processes;
+check_face_match returns its own timings in the result and the caller
+merges them back with merge_timings().
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current = ContextVar('attendance_timings', default=None)
+
+
+class Timings(dict):
+    """Stage name -> seconds spent (summed if a stage runs more than once)"""
+
+    def add(self, name, seconds):
+        self[name] = self.get(name, 0.0) + seconds
+
+    def merge(self, other):
+        for name, seconds in (other or {}).items():
+            self.add(name, seconds)
+
+    def as_ms(self):
+        return {name: round(seconds * 1000, 2) for name, seconds in self.items()}
+
+
+@contextmanager
+def collect_timings(timings=None):
+    """Collect every stage() run inside the block into one Timings"""
+    timings = Timings() if timings is None else timings
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def stage(name):
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def merge_timings(other):
+    """Fold timings measured elsewhere (e.g. a pool worker) into the current collector"""
+    timings = _current.get()
+    if timings is not None:
+        timings.merge(other)
@@ -1,19 +1,31 @@
 # apps/attendance/utils.py - STRICT FACE RECOGNITION
 
-import face_recognition
-import numpy as np
-from PIL import Image
-from geopy.distance import geodesic
-import cv2
+import io
+import logging
+import time
+
+from django.conf import settings
+
+from .geofence import get_geofence
+from .lazy import lazy_import
+from .timing import collect_timings, stage
+
+logger = logging.getLogger(__name__)
+
+# dlib / OpenCV / PIL are only loaded once a face is actually processed,
+# so importing the views (urls.py, migrate, admin...) stays cheap
+face_recognition = lazy_import('face_recognition')
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+Image = lazy_import('PIL.Image')
 
 def is_within_radius(student_loc, college_loc, radius_meters):
     """Check if student is within allowed radius of class location"""
     try:
-        distance = geodesic(student_loc, college_loc).meters
-        print(f"📍 GPS Distance: {distance:.2f} meters (Allowed: {radius_meters}m)")
-        return distance <= radius_meters
+        fence = get_geofence(float(college_loc[0]), float(college_loc[1]), radius_meters)
+        return fence.contains(float(student_loc[0]), float(student_loc[1]))
     except Exception as e:
-        print(f"❌ Location Error: {e}")
+        logger.warning("Location error: %s", e)
         return False
 
 
@@ -23,8 +35,6 @@ def load_image_opencv(image_path):
     Converts BGR to RGB and ensures C-contiguous array
     """
     try:
-        print(f"  📂 Loading with OpenCV: {image_path}")
-        
         # Load with OpenCV (loads as BGR)
         img_bgr = cv2.imread(image_path)
         
@@ -43,43 +53,149 @@ def load_image_opencv(image_path):
         assert len(img_rgb.shape) == 3, f"Wrong shape: {img_rgb.shape}"
         assert img_rgb.shape[2] == 3, f"Wrong channels: {img_rgb.shape[2]}"
         
-        print(f"  ✅ Image loaded: {img_rgb.shape}, dtype: {img_rgb.dtype}")
+        logger.debug("Loaded %s: %s", image_path, img_rgb.shape)
         return img_rgb
         
     except Exception as e:
-        print(f"  ❌ OpenCV failed: {e}")
+        logger.warning("OpenCV failed to load %s: %s", image_path, e)
         raise
 
 
-def check_face_match(reference_path, captured_path, threshold=0.45):
+def load_image_bytes(data, max_dim=None):
+    """
+    Decode an uploaded image straight from memory with cv2.imdecode (no disk round-trip).
+
+    Images whose longest side is at least `max_dim` (settings.FACE_DECODE_REDUCED_MIN_DIM)
+    are decoded at half resolution with IMREAD_REDUCED_COLOR_2, which is much
+    cheaper for JPEGs. Returns a C-contiguous RGB uint8 array.
+    """
+    if max_dim is None:
+        max_dim = getattr(settings, 'FACE_DECODE_REDUCED_MIN_DIM', 1600)
+
+    buffer = np.frombuffer(data, dtype=np.uint8)
+
+    flags = cv2.IMREAD_COLOR
+    if max_dim:
+        try:
+            # PIL only parses the header here, the pixels are not decoded
+            width, height = Image.open(io.BytesIO(data)).size
+            if max(width, height) >= max_dim:
+                flags = cv2.IMREAD_REDUCED_COLOR_2
+        except Exception:
+            pass
+
+    img_bgr = cv2.imdecode(buffer, flags)
+    if img_bgr is None:
+        raise Exception("OpenCV failed to decode image")
+
+    img_rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
+    if not img_rgb.flags['C_CONTIGUOUS']:
+        img_rgb = np.ascontiguousarray(img_rgb)
+
+    logger.debug("Decoded upload from memory: %s", img_rgb.shape)
+    return img_rgb
+
+
+def load_image(source, reduce_large=True):
+    """
+    Load an image from a file path or from raw encoded bytes
+    (reduce_large=False keeps full resolution, e.g. for group photos)
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return load_image_bytes(source, max_dim=None if reduce_large else 0)
+    return load_image_opencv(source)
+
+
+def detect_faces(image, max_dim=None, upsample=None):
+    """
+    HOG face detection on a downscaled copy of the image.
+
+    The image is resized so its longest side is at most `max_dim`
+    (settings.FACE_DETECT_MAX_DIM) and searched with `upsample` (settings.FACE_DETECT_UPSAMPLE,
+    default 0) passes; only if no face is found is it upsampled once more.
+    Returned boxes are mapped back to the coordinates of the original image,
+    so face_encodings() can still run on the full-resolution crop.
+    """
+    if max_dim is None:
+        max_dim = getattr(settings, 'FACE_DETECT_MAX_DIM', 640)
+    if upsample is None:
+        upsample = getattr(settings, 'FACE_DETECT_UPSAMPLE', 0)
+
+    height, width = image.shape[:2]
+    scale = min(1.0, max_dim / max(height, width)) if max_dim else 1.0
+
+    if scale < 1.0:
+        small = cv2.resize(
+            image,
+            (max(1, round(width * scale)), max(1, round(height * scale))),
+            interpolation=cv2.INTER_AREA
+        )
+    else:
+        small = image
+
+    locations = face_recognition.face_locations(small, number_of_times_to_upsample=upsample, model='hog')
+    if not locations and upsample < 1:
+        # Face smaller than the HOG window at this size: try once more, upsampled
+        locations = face_recognition.face_locations(small, number_of_times_to_upsample=1, model='hog')
+
+    if scale < 1.0:
+        locations = [
+            (
+                max(0, int(top / scale)),
+                min(width, int(round(right / scale))),
+                min(height, int(round(bottom / scale))),
+                max(0, int(left / scale)),
+            )
+            for top, right, bottom, left in locations
+        ]
+    return locations
+
+
+def check_face_match(reference_path, captured_path, threshold=0.45, known_encoding=None):
+    """
+    STRICT face verification with multiple validation checks
+    (see _check_face_match); the result also carries 'timings', the seconds
+    spent per stage (decode/detect/encode/compare), since this usually runs in
+    a pool worker where the caller's stage() collector isn't visible.
+    """
+    with collect_timings() as timings:
+        result = _check_face_match(reference_path, captured_path, threshold, known_encoding)
+    result['timings'] = dict(timings)
+    return result
+
+
+def _check_face_match(reference_path, captured_path, threshold=0.45, known_encoding=None):
     """
     STRICT face verification with multiple validation checks
     
     Args:
         reference_path: Path to stored reference image
-        captured_path: Path to captured selfie
+        captured_path: Path to captured selfie, or its raw JPEG/PNG bytes
         threshold: Distance threshold (LOWER = STRICTER)
                   Default 0.45 = ~85% match required
+        known_encoding: Precomputed reference encoding (see get_reference_encoding).
+                  When given, the reference image is not loaded or re-detected.
                   
     Returns:
         dict with 'match', 'confidence', 'distance', 'message'
     """
     try:
-        print(f"\n{'='*60}")
-        print(f"🔍 STRICT FACE VERIFICATION")
-        print(f"{'='*60}")
-        print(f"📁 Reference: {reference_path}")
-        print(f"📁 Captured: {captured_path}")
-        print(f"⚙️ Threshold: {threshold} (Strictness: HIGH)")
+        if logger.isEnabledFor(logging.DEBUG):
+            in_memory = isinstance(captured_path, (bytes, bytearray, memoryview))
+            logger.debug(
+                "Face verification: reference=%s captured=%s threshold=%s stored_encoding=%s",
+                reference_path, '<in-memory upload>' if in_memory else captured_path,
+                threshold, known_encoding is not None
+            )
         
         # ===== STEP 1: Load Images =====
-        print("\n1️⃣ Loading images...")
-        
         try:
-            known_image = load_image_opencv(reference_path)
-            unknown_image = load_image_opencv(captured_path)
+            with stage('decode'):
+                if known_encoding is None:
+                    known_image = load_image_opencv(reference_path)
+                unknown_image = load_image(captured_path)
         except Exception as e:
-            print(f"❌ Image loading failed: {e}")
+            logger.warning("Image loading failed: %s", e)
             return {
                 'match': False,
                 'confidence': 0.0,
@@ -87,74 +203,66 @@ def check_face_match(reference_path, captured_path, threshold=0.45):
                 'message': 'Failed to load images. Please try again.'
             }
         
-        print(f"✅ Both images loaded successfully")
-        
         # ===== STEP 2: Detect Face in Reference =====
-        print("\n2️⃣ Detecting face in REFERENCE image...")
-        
-        try:
-            known_face_locations = face_recognition.face_locations(
-                known_image, 
-                number_of_times_to_upsample=1,
-                model='hog'
-            )
-        except Exception as e:
-            print(f"  ⚠️ HOG detection failed: {e}")
-            return {
-                'match': False,
-                'confidence': 0.0,
-                'distance': 1.0,
-                'message': 'Face detection failed in reference image.'
-            }
-        
-        if not known_face_locations:
-            print("❌ NO FACE in reference image")
-            return {
-                'match': False,
-                'confidence': 0.0,
-                'distance': 1.0,
-                'message': 'No face found in your profile photo. Please update it.'
-            }
-        
-        if len(known_face_locations) > 1:
-            print(f"❌ MULTIPLE FACES in reference ({len(known_face_locations)} faces)")
-            return {
-                'match': False,
-                'confidence': 0.0,
-                'distance': 1.0,
-                'message': 'Multiple faces in profile photo. Please use a photo with only you.'
-            }
-        
-        print(f"✅ 1 face detected in reference")
-        print(f"  📍 Location: {known_face_locations[0]}")
-        
-        # Extract encoding
-        print("  🔄 Extracting face encoding...")
-        known_encodings = face_recognition.face_encodings(known_image, known_face_locations)
-        
-        if not known_encodings:
-            print("❌ Failed to encode reference face")
-            return {
-                'match': False,
-                'confidence': 0.0,
-                'distance': 1.0,
-                'message': 'Could not process profile photo.'
-            }
-        
-        known_encoding = known_encodings[0]
-        print(f"✅ Reference face encoded (128 dimensions)")
+        if known_encoding is None:
+            try:
+                with stage('detect'):
+                    known_face_locations = face_recognition.face_locations(
+                        known_image, 
+                        number_of_times_to_upsample=1,
+                        model='hog'
+                    )
+            except Exception as e:
+                logger.warning("HOG detection failed on reference %s: %s", reference_path, e)
+                return {
+                    'match': False,
+                    'confidence': 0.0,
+                    'distance': 1.0,
+                    'message': 'Face detection failed in reference image.'
+                }
+        
+            if not known_face_locations:
+                logger.info("No face in reference image %s", reference_path)
+                return {
+                    'match': False,
+                    'confidence': 0.0,
+                    'distance': 1.0,
+                    'message': 'No face found in your profile photo. Please update it.'
+                }
+        
+            if len(known_face_locations) > 1:
+                logger.info("%d faces in reference image %s", len(known_face_locations), reference_path)
+                return {
+                    'match': False,
+                    'confidence': 0.0,
+                    'distance': 1.0,
+                    'message': 'Multiple faces in profile photo. Please use a photo with only you.'
+                }
+        
+            logger.debug("Reference face at %s", known_face_locations[0])
+        
+            # Extract encoding
+            with stage('encode'):
+                known_encodings = face_recognition.face_encodings(known_image, known_face_locations)
+        
+            if not known_encodings:
+                logger.info("Failed to encode reference face in %s", reference_path)
+                return {
+                    'match': False,
+                    'confidence': 0.0,
+                    'distance': 1.0,
+                    'message': 'Could not process profile photo.'
+                }
+        
+            known_encoding = known_encodings[0]
         
         # ===== STEP 3: Detect Face in Captured =====
-        print("\n3️⃣ Detecting face in CAPTURED image...")
-        
         try:
-            unknown_face_locations = face_recognition.face_locations(
-                unknown_image,
-                number_of_times_to_upsample=1,
-                model='hog'
-            )
+            # Detect on a downscaled copy, encode on the full-resolution image
+            with stage('detect'):
+                unknown_face_locations = detect_faces(unknown_image)
         except Exception as e:
-            print(f"  ⚠️ HOG detection failed: {e}")
+            logger.warning("HOG detection failed on selfie: %s", e)
             return {
                 'match': False,
                 'confidence': 0.0,
@@ -163,7 +271,7 @@ def check_face_match(reference_path, captured_path, threshold=0.45):
             }
         
         if not unknown_face_locations:
-            print("❌ NO FACE in captured image")
+            logger.info("No face in captured image")
             return {
                 'match': False,
                 'confidence': 0.0,
@@ -172,7 +280,7 @@ def check_face_match(reference_path, captured_path, threshold=0.45):
             }
         
         if len(unknown_face_locations) > 1:
-            print(f"❌ MULTIPLE FACES in captured ({len(unknown_face_locations)} faces)")
+            logger.info("%d faces in captured image", len(unknown_face_locations))
             return {
                 'match': False,
                 'confidence': 0.0,
@@ -180,15 +288,14 @@ def check_face_match(reference_path, captured_path, threshold=0.45):
                 'message': 'Multiple faces detected. Only you should be in the frame.'
             }
         
-        print(f"✅ 1 face detected in captured image")
-        print(f"  📍 Location: {unknown_face_locations[0]}")
+        logger.debug("Captured face at %s", unknown_face_locations[0])
         
         # Extract encoding
-        print("  🔄 Extracting face encoding...")
-        unknown_encodings = face_recognition.face_encodings(unknown_image, unknown_face_locations)
+        with stage('encode'):
+            unknown_encodings = face_recognition.face_encodings(unknown_image, unknown_face_locations)
         
         if not unknown_encodings:
-            print("❌ Failed to encode captured face")
+            logger.info("Failed to encode captured face")
             return {
                 'match': False,
                 'confidence': 0.0,
@@ -197,45 +304,34 @@ def check_face_match(reference_path, captured_path, threshold=0.45):
             }
         
         unknown_encoding = unknown_encodings[0]
-        print(f"✅ Captured face encoded (128 dimensions)")
         
         # ===== STEP 4: STRICT COMPARISON =====
-        print(f"\n4️⃣ COMPARING FACES (STRICT MODE)...")
-        print(f"{'─'*60}")
-        
-        # Method 1: Face Distance (Primary)
-        face_distance = face_recognition.face_distance([known_encoding], unknown_encoding)[0]
-        
-        # Method 2: Boolean Match (Secondary validation)
-        matches = face_recognition.compare_faces(
-            [known_encoding], 
-            unknown_encoding, 
-            tolerance=threshold  # Strict tolerance
-        )
+        with stage('compare'):
+            # Method 1: Face Distance (Primary)
+            face_distance = face_recognition.face_distance([known_encoding], unknown_encoding)[0]
+            
+            # Method 2: Boolean Match (Secondary validation)
+            matches = face_recognition.compare_faces(
+                [known_encoding], 
+                unknown_encoding, 
+                tolerance=threshold  # Strict tolerance
+            )
         boolean_match = matches[0]
         
         # Convert distance to confidence percentage
         confidence_percentage = max(0, (1 - face_distance) * 100)
         
-        print(f"📊 VERIFICATION RESULTS:")
-        print(f"{'─'*60}")
-        print(f"  Distance Score:    {face_distance:.6f}")
-        print(f"  Confidence:        {confidence_percentage:.2f}%")
-        print(f"  Boolean Match:     {boolean_match}")
-        print(f"  Threshold:         {threshold}")
-        print(f"  Required Match:    {(1-threshold)*100:.1f}%+")
-        print(f"{'─'*60}")
-        
         # ===== DECISION LOGIC (STRICT) =====
         
         # STRICT: Both conditions must be true
         is_match = (face_distance < threshold) and boolean_match
         
+        logger.info(
+            "Face verification %s: distance=%.4f confidence=%.1f%% threshold=%s",
+            'MATCH' if is_match else 'NO MATCH', face_distance, confidence_percentage, threshold
+        )
+        
         if is_match:
-            print(f"✅ MATCH CONFIRMED!")
-            print(f"  ✓ Distance below threshold: {face_distance:.4f} < {threshold}")
-            print(f"  ✓ Boolean match: {boolean_match}")
-            
             # Determine quality level
             if confidence_percentage >= 90:
                 quality = "Excellent"
@@ -258,15 +354,11 @@ def check_face_match(reference_path, captured_path, threshold=0.45):
             }
         
         else:
-            print(f"❌ NO MATCH - VERIFICATION FAILED")
-            
             # Detailed failure reason
             if face_distance >= threshold:
-                print(f"  ✗ Distance too high: {face_distance:.4f} >= {threshold}")
                 failure_reason = f"Face does not match (Confidence: {confidence_percentage:.1f}%)"
             
             if not boolean_match:
-                print(f"  ✗ Boolean match failed")
                 failure_reason = f"Face verification failed (Confidence: {confidence_percentage:.1f}%)"
             
             # Additional guidance
@@ -285,10 +377,7 @@ def check_face_match(reference_path, captured_path, threshold=0.45):
             }
         
     except Exception as e:
-        print(f"\n❌ CRITICAL ERROR: {type(e).__name__}")
-        print(f"  Message: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Face verification crashed: %s", type(e).__name__)
         
         return {
             'match': False,
@@ -296,11 +385,6 @@ def check_face_match(reference_path, captured_path, threshold=0.45):
             'distance': 1.0,
             'message': f'Technical error: {str(e)}'
         }
-    
-    finally:
-        print(f"\n{'='*60}")
-        print(f"END OF FACE VERIFICATION")
-        print(f"{'='*60}\n")
 
 
 def test_face_match_detailed(reference_path, captured_path):
@@ -371,47 +455,274 @@ def test_face_match_detailed(reference_path, captured_path):
 def get_face_encoding_from_image(image_path):
     """
     Extract face encoding from image (for signup)
+    A reference photo must show exactly one face; with several it is
+    unknown which one is the student's, so None is returned.
     """
     try:
-        print(f"\n📸 Extracting face encoding from: {image_path}")
-        
         image = load_image_opencv(image_path)
         face_locations = face_recognition.face_locations(image, model='hog')
         
         if not face_locations:
-            print("❌ No face detected")
+            logger.info("No face detected in %s", image_path)
             return None
         
         if len(face_locations) > 1:
-            print(f"⚠️ Multiple faces ({len(face_locations)}). Using largest.")
-            face_locations = [max(face_locations, 
-                                 key=lambda loc: (loc[2]-loc[0]) * (loc[1]-loc[3]))]
+            logger.info("%d faces in reference photo %s, not encoding it", len(face_locations), image_path)
+            return None
         
         encodings = face_recognition.face_encodings(image, face_locations)
         
         if not encodings:
-            print("❌ Could not encode face")
+            logger.info("Could not encode face in %s", image_path)
             return None
         
-        print(f"✅ Face encoding extracted successfully")
+        logger.debug("Face encoding extracted from %s", image_path)
         return encodings[0]
         
     except Exception as e:
-        print(f"❌ Error: {e}")
+        logger.warning("Face encoding failed for %s: %s", image_path, e)
         return None
 
 
+_models_warm = False
+
+
+def warm_up_face_models():
+    """
+    Run one detection and one encoding so the HOG detector, shape predictor and
+    ResNet encoder are loaded and initialised before the first real request.
+
+    Uses settings.FACE_WARMUP_IMAGE when set (a real face runs every stage at a
+    realistic size), otherwise a synthetic frame with a fixed face box. Runs once
+    per process; children forked afterwards inherit the warm models.
+    """
+    global _models_warm
+    if _models_warm:
+        return
+
+    started = time.perf_counter()
+    frame, box = None, [(20, 140, 140, 20)]
+    warmup_path = getattr(settings, 'FACE_WARMUP_IMAGE', '')
+    if warmup_path:
+        try:
+            frame = load_image_opencv(warmup_path)
+        except Exception as e:
+            logger.warning("FACE_WARMUP_IMAGE %s unusable, using a synthetic frame: %s", warmup_path, e)
+    if frame is None:
+        frame = np.zeros((160, 160, 3), dtype=np.uint8)
+
+    locations = detect_faces(frame)
+    face_recognition.face_encodings(frame, locations[:1] or box)
+
+    _models_warm = True
+    logger.info("Face models warmed up in %.2fs", time.perf_counter() - started)
+
+
+def encode_single_face(image_source):
+    """
+    Detect exactly one face in an image (path or raw bytes) and encode it
+    Returns (encoding, None) or (None, error message)
+    """
+    image = load_image(image_source)
+    locations = detect_faces(image)
+
+    if not locations:
+        return None, 'No face detected. Please look at the camera.'
+    if len(locations) > 1:
+        return None, f'Multiple faces detected ({len(locations)}). One person at a time.'
+
+    encodings = face_recognition.face_encodings(image, locations)
+    if not encodings:
+        return None, 'Could not process face.'
+    return encodings[0], None
+
+
+def _box_overlap(a, b):
+    """Intersection over the smaller box of two (top, right, bottom, left) boxes"""
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    if bottom <= top or right <= left:
+        return 0.0
+    smaller = min((a[2] - a[0]) * (a[1] - a[3]), (b[2] - b[0]) * (b[1] - b[3]))
+    return (bottom - top) * (right - left) / smaller if smaller else 0.0
+
+
+def detect_faces_tiled(image, tile=None, overlap=None, upsample=1):
+    """
+    HOG face detection for large group photos.
+
+    The image is split into overlapping tiles of `tile` px (settings.FACE_GROUP_TILE),
+    each tile is searched separately (keeping HOG memory and time per call bounded),
+    and faces found twice in an overlap strip are merged.
+    Returns boxes in original image coordinates.
+    """
+    if tile is None:
+        tile = getattr(settings, 'FACE_GROUP_TILE', 1024)
+    if overlap is None:
+        overlap = getattr(settings, 'FACE_GROUP_TILE_OVERLAP', 160)
+
+    height, width = image.shape[:2]
+    if max(height, width) <= tile:
+        return face_recognition.face_locations(image, number_of_times_to_upsample=upsample, model='hog')
+
+    step = max(1, tile - overlap)
+    found = []
+    for y in range(0, max(1, height - overlap), step):
+        for x in range(0, max(1, width - overlap), step):
+            crop = np.ascontiguousarray(image[y:y + tile, x:x + tile])
+            for top, right, bottom, left in face_recognition.face_locations(
+                crop, number_of_times_to_upsample=upsample, model='hog'
+            ):
+                found.append((top + y, right + x, bottom + y, left + x))
+
+    # Merge duplicates from overlapping tiles, keeping the larger box
+    found.sort(key=lambda box: (box[2] - box[0]) * (box[1] - box[3]), reverse=True)
+    merged = []
+    for box in found:
+        if all(_box_overlap(box, kept) < 0.5 for kept in merged):
+            merged.append(box)
+    return merged
+
+
+def encode_group_photo(image_source):
+    """
+    Detect every face in a classroom photo and encode them in one face_encodings() call
+    Returns (locations, encodings as an (n, 128) array)
+    """
+    image = load_image(image_source, reduce_large=False)
+    locations = detect_faces_tiled(image)
+    if not locations:
+        return [], np.empty((0, FACE_ENCODING_SIZE))
+    encodings = face_recognition.face_encodings(image, locations)
+    return locations, np.asarray(encodings)
+
+
+# --- STORED REFERENCE ENCODINGS ---
+# Bump the version tag whenever the detector/encoder settings change,
+# so every stored blob is treated as stale and recomputed.
+FACE_ENCODING_VERSION = 'dlib-resnet-v1/hog'
+FACE_ENCODING_DTYPE = '<f4'  # little-endian float32
+FACE_ENCODING_SIZE = 128
+FACE_ENCODING_BYTES = FACE_ENCODING_SIZE * 4
+# Stored instead of a blob when the reference image has no usable face, so it
+# is not run through dlib again until the image (or the version) changes
+NO_FACE_ENCODING = b''
+
+
+def get_reference_image(user):
+    """
+    Return the image file used as the face reference for a user
+    (reference_image first, then profile_image), or None
+    """
+    for field_name in ('reference_image', 'profile_image'):
+        image = getattr(user, field_name, None)
+        if image:
+            return image
+    return None
+
+
+def pack_face_encoding(encoding):
+    """Serialize a 128-d encoding into a compact float32 blob (512 bytes)"""
+    return np.asarray(encoding, dtype=FACE_ENCODING_DTYPE).tobytes()
+
+
+def unpack_face_encoding(blob):
+    """Deserialize a blob written by pack_face_encoding back into a float64 vector"""
+    return np.frombuffer(bytes(blob), dtype=FACE_ENCODING_DTYPE).astype(np.float64)
+
+
+def face_encoding_is_current(user):
+    """
+    True when user.face_encoding was computed by the current model version
+    from the user's current reference image
+    """
+    reference = get_reference_image(user)
+    return bool(
+        reference
+        and user.face_encoding
+        and len(user.face_encoding) == FACE_ENCODING_BYTES
+        and user.face_encoding_version == FACE_ENCODING_VERSION
+        and user.face_encoding_source == reference.name
+    )
+
+
+def face_encoding_checked(user):
+    """
+    True when the user's current reference image has been through the
+    current model version, whether or not a usable face was found in it
+    """
+    reference = get_reference_image(user)
+    return bool(
+        reference
+        and user.face_encoding is not None
+        and user.face_encoding_version == FACE_ENCODING_VERSION
+        and user.face_encoding_source == reference.name
+    )
+
+
+def refresh_face_encoding(user, save=True):
+    """
+    Recompute the reference encoding of a user and store it on the instance.
+    With save=True the new values are written with a queryset update(),
+    so post_save handlers are not triggered again.
+
+    Returns the encoding, or None if no usable face was found.
+    """
+    reference = get_reference_image(user)
+    encoding = get_face_encoding_from_image(reference.path) if reference else None
+    return store_face_encoding(user, encoding, save=save)
+
+
+def store_face_encoding(user, encoding, save=True):
+    """
+    Store an encoding of the user's current reference image, as
+    refresh_face_encoding; None records that the image has no usable face
+    """
+    reference = get_reference_image(user)
+    if reference:
+        user.face_encoding = NO_FACE_ENCODING if encoding is None else pack_face_encoding(encoding)
+        user.face_encoding_version = FACE_ENCODING_VERSION
+        user.face_encoding_source = reference.name
+    else:
+        user.face_encoding = None
+        user.face_encoding_version = ''
+        user.face_encoding_source = ''
+
+    if save and user.pk:
+        # _meta.model rather than type(): request.user is a SimpleLazyObject
+        user._meta.model.objects.filter(pk=user.pk).update(
+            face_encoding=user.face_encoding,
+            face_encoding_version=user.face_encoding_version,
+            face_encoding_source=user.face_encoding_source,
+        )
+        from .face_index import notify_encoding_changed
+        notify_encoding_changed(user)
+    return encoding
+
+
+def get_reference_encoding(user, refresh=refresh_face_encoding):
+    """
+    Stored reference encoding of a user; recomputed (and saved) with
+    `refresh` only when the blob is missing or stale. Returns None if no
+    face could be encoded, now or the last time this image was tried.
+    """
+    if face_encoding_is_current(user):
+        return unpack_face_encoding(user.face_encoding)
+    if face_encoding_checked(user):
+        return None
+    logger.info("Reference encoding missing/stale for %s, recomputing", user.username)
+    return refresh(user)
+
+
 def validate_face_image(image_path):
     """
     Validate if image is suitable for face recognition
     """
     try:
-        print(f"\n🔍 Validating image: {image_path}")
-        
         image = load_image_opencv(image_path)
         height, width = image.shape[:2]
         
-        print(f"📐 Dimensions: {width}x{height}")
+        logger.debug("Validating %s: %dx%d", image_path, width, height)
         
         if width < 200 or height < 200:
             return False, "Image resolution too low. Minimum 200x200 required."
@@ -434,11 +745,10 @@ def validate_face_image(image_path):
         if face_height > (height * 0.9):
             return False, "Face too close. Please move back."
         
-        print(f"✅ Validation passed")
-        print(f"📊 Face size: {face_width}x{face_height}")
+        logger.debug("Validation passed for %s, face %dx%d", image_path, face_width, face_height)
         
         return True, "Image quality is good"
         
     except Exception as e:
-        print(f"❌ Validation error: {e}")
+        logger.warning("Validation error for %s: %s", image_path, e)
         return False, f"Validation failed: {str(e)}"
\ No newline at end of file
@@ -0,0 +1,140 @@
+# apps/attendance/verification.py - BOUNDED FACE VERIFICATION POOL
+#
+# dlib detection/encoding is CPU bound, so it runs in a small process pool
+# instead of inside the request worker. The pool accepts at most
+# `workers + queue_depth` jobs; anything beyond that is rejected right away
+# so the caller can answer 503 + Retry-After instead of piling up requests.
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+
+class VerificationBusy(Exception):
+    """The verification queue is full; retry after `retry_after` seconds"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Verification queue full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class VerificationTimeout(Exception):
+    """A verification job did not finish within the per-job timeout"""
+
+
+def init_verification_worker():
+    """
+    Process pool initializer: load and warm the dlib models once per worker
+    (a no-op when the pool was forked from an already warm process)
+    """
+    from .utils import warm_up_face_models
+    warm_up_face_models()
+
+
+class VerificationPool:
+    """
+    Process pool with preloaded face models, a bounded queue and per-job timeouts.
+    With workers=0, run() verifies inline in the calling thread and submit()
+    uses a single background thread (useful for development).
+    """
+
+    def __init__(self, workers, queue_depth, timeout, retry_after):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._slots = threading.BoundedSemaphore(max(1, workers + queue_depth))
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.workers <= 0:
+                    # Inline mode still needs somewhere to run background (async) jobs
+                    self._executor = ThreadPoolExecutor(max_workers=1)
+                else:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        initializer=init_verification_worker,
+                    )
+            return self._executor
+
+    def _reset_executor(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue a job; raises VerificationBusy when the queue is full"""
+        if not self._slots.acquire(blocking=False):
+            raise VerificationBusy(self.retry_after)
+
+        try:
+            try:
+                future = self._get_executor().submit(fn, *args, **kwargs)
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM in dlib); start a fresh pool once
+                self._reset_executor()
+                future = self._get_executor().submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, fn, *args, timeout=None, **kwargs):
+        """Submit a job and wait for its result (raises VerificationTimeout)"""
+        if self.workers <= 0:
+            return fn(*args, **kwargs)
+
+        future = self.submit(fn, *args, **kwargs)
+        try:
+            return future.result(timeout=timeout or self.timeout)
+        except FutureTimeoutError:
+            # Dropped if still queued; a job already running finishes in the
+            # background and keeps its slot until then
+            future.cancel()
+            raise VerificationTimeout(f"Verification took longer than {timeout or self.timeout}s")
+
+    def start(self):
+        """Start the executor's workers now rather than on the first job"""
+        self._get_executor().submit(int).result(timeout=self.timeout)
+
+    def shutdown(self):
+        self._reset_executor()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_verification_pool():
+    """Process-wide verification pool configured from settings"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = VerificationPool(
+                workers=getattr(settings, 'FACE_VERIFY_WORKERS', min(2, os.cpu_count() or 1)),
+                queue_depth=getattr(settings, 'FACE_VERIFY_QUEUE_DEPTH', 8),
+                timeout=getattr(settings, 'FACE_VERIFY_TIMEOUT', 20),
+                retry_after=getattr(settings, 'FACE_VERIFY_RETRY_AFTER', 5),
+            )
+        return _pool
+
+
+def reset_verification_pool(shutdown=True):
+    """
+    Drop the pool. After a fork pass shutdown=False: the child only
+    forgets the parent's executor and lazily starts its own.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None and shutdown:
+            _pool.shutdown()
+        _pool = None
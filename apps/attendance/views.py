@@ -1,15 +1,35 @@
 # apps/attendance/views.py - CORRECTED VERSION
 
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import IntegrityError
+from django.urls import reverse
 from django.utils import timezone
 from datetime import timedelta
+import logging
 
 from .models import AttendanceSession, AttendanceRecord
-from apps.accounts.models import Subject
-from .utils import is_within_radius, check_face_match
+from apps.accounts.models import Subject, User
+from .geofence import Geofence
+from .utils import (
+    get_reference_image, get_reference_encoding, face_encoding_checked, encode_group_photo,
+)
+from .verification import get_verification_pool, VerificationBusy, VerificationTimeout
+from .face_service import run_face_check, submit_face_check, run_face_encode, refresh_reference_encoding
+from .jobs import watch_pending_verification, expire_stale_pending, get_job_status
+from .face_index import get_face_index, ALL_PARTITIONS
+from .summary import record_marked_present, recount_student_summaries, session_closed
+from .counters import session_counters, adjust_session_counters, reconcile_session_counters
+from .dashboard import invalidate_student_dashboards, invalidate_active_sessions, dashboard_session_ended
+from .timing import stage, merge_timings
+from .metrics import instrumented, render_metrics
+from .feeds import feed_is_streamed
+
+logger = logging.getLogger(__name__)
 
 # --- BASIC VIEWS ---
 def home(request): 
@@ -43,6 +63,7 @@ def create_session(request, subject_id):
         longitude=78.4468,
         radius_meters=20000  # 20km radius
     )
+    invalidate_active_sessions()
     return redirect('monitor_session', session_id=session.id)
 
 @login_required
@@ -53,20 +74,23 @@ def monitor_session(request, session_id):
     if session.teacher != request.user:
         return redirect('dashboard')
     
-    # Get attendance records for this session
-    records = AttendanceRecord.objects.filter(
+    # Rendered once; feeds.session_feed then streams the changes
+    records = list(AttendanceRecord.objects.filter(
         session=session
-    ).select_related('student').order_by('-timestamp')
+    ).select_related('student').order_by('-timestamp'))
     
-    # Calculate statistics
-    total_present = records.filter(status='present').count()
-    total_pending = records.filter(status='PENDING').count()
+    counters = session_counters(session.id)
+    pending_ids = [record.id for record in records if record.status == 'PENDING']
     
     return render(request, 'monitor_session.html', {
         'session': session,
         'records': records,
-        'total_present': total_present,
-        'total_pending': total_pending,
+        'total_present': counters['present'],
+        'total_pending': counters['pending'],
+        'feed_cursor': max((record.id for record in records), default=0),
+        'pending_ids': ','.join(map(str, pending_ids)),
+        'feed_streamed': feed_is_streamed(request),
+        'feed_poll_ms': int(settings.ATTENDANCE_FEED_POLL_INTERVAL * 1000),
     })
 
 @login_required
@@ -77,9 +101,13 @@ def end_session(request, session_id):
     if session.teacher != request.user:
         return redirect('dashboard')
     
-    session.is_active = False
-    session.end_time = timezone.now()
-    session.save()
+    if session.is_active:
+        session.is_active = False
+        session.end_time = timezone.now()
+        session.save()
+        session_closed(session)
+        reconcile_session_counters(session.id)
+        dashboard_session_ended(session)
     
     return redirect('dashboard')
 
@@ -105,22 +133,42 @@ def session_details(request, session_id):
         session=session
     ).select_related('student').order_by('student__username')
     
-    total_present = records.filter(status='present').count()
-    total_pending = records.filter(status='PENDING').count()
+    counters = session_counters(session.id)
     
     return render(request, 'session_details.html', {
         'session': session, 
         'records': records,
-        'total_present': total_present,
-        'total_pending': total_pending,
+        'total_present': counters['present'],
+        'total_pending': counters['pending'],
     })
 
 
 # --- FACE VERIFICATION API ---
+def _verification_busy_response(retry_after):
+    response = JsonResponse({
+        'error': 'Face verification is busy. Please try again in a few seconds.',
+        'retry_after': retry_after
+    }, status=503)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def _already_marked_response(status=None):
+    return JsonResponse({
+        'error': f'Attendance already marked ({status})' if status else 'Attendance already marked',
+        'already_marked': True
+    }, status=400)
+
+
 @csrf_exempt
+@instrumented('mark_attendance')
 def verify_my_face(request):
     """
     API endpoint for student attendance marking with face verification
+
+    In async mode (POST async=1, or ATTENDANCE_ASYNC_MARKING in settings) the
+    record is stored as PENDING and the response (202) only carries a job ID;
+    the result is then polled from attendance_job_status.
     """
     if request.method != 'POST': 
         return JsonResponse({'error': 'Invalid Method'}, status=405)
@@ -128,9 +176,7 @@ def verify_my_face(request):
     if not request.user.is_authenticated: 
         return JsonResponse({'error': 'Session expired. Please login again.'}, status=401)
 
-    print(f"\n{'='*60}")
-    print(f"🎯 ATTENDANCE REQUEST from {request.user.username}")
-    print(f"{'='*60}")
+    username = request.user.username
 
     try:
         # ===== PARSE REQUEST =====
@@ -138,117 +184,188 @@ def verify_my_face(request):
         lat = float(request.POST.get('gps_lat', 0))
         lng = float(request.POST.get('gps_long', 0))
         captured_file = request.FILES.get('captured_image')
+        async_mode = (
+            request.POST.get('async') in ('1', 'true')
+            or getattr(settings, 'ATTENDANCE_ASYNC_MARKING', False)
+        )
 
-        print(f"\n📋 Request Data:")
-        print(f"  - Session ID: {session_id}")
-        print(f"  - GPS: ({lat}, {lng})")
-        print(f"  - Image: {captured_file is not None}")
+        logger.debug(
+            "Mark request user=%s session=%s gps=(%s, %s) image=%s async=%s",
+            username, session_id, lat, lng, captured_file is not None, async_mode
+        )
         
         # ===== VALIDATE SESSION =====
         try:
-            session = AttendanceSession.objects.get(id=session_id)
-            print(f"\n✅ Session: {session.subject.name}")
+            with stage('db'):
+                session = AttendanceSession.objects.select_related('subject', 'teacher').get(id=session_id)
         except AttendanceSession.DoesNotExist:
-            print("❌ Session not found")
+            logger.info("Mark rejected user=%s session=%s: session not found", username, session_id)
             return JsonResponse({'error': 'Session not found'}, status=404)
 
         # ===== CHECK SESSION ACTIVE =====
         if not session.is_active:
-            print("❌ Session ended")
+            logger.info("Mark rejected user=%s session=%s: session ended", username, session_id)
             return JsonResponse({
                 'error': 'This class session has ended.'
             }, status=400)
 
         # ===== CHECK DUPLICATE =====
-        existing = AttendanceRecord.objects.filter(
-            session=session,
-            student=request.user
-        ).first()
+        with stage('db'):
+            mine = AttendanceRecord.objects.filter(session=session, student=request.user)
+            # A PENDING record whose verification never finished does not count
+            expire_stale_pending(mine)
+            existing = mine.first()
         
         if existing:
-            print(f"⚠️ Already marked: {existing.status}")
-            return JsonResponse({
-                'error': f'Attendance already marked ({existing.status})',
-                'already_marked': True
-            }, status=400)
+            logger.info("Mark rejected user=%s session=%s: already %s", username, session_id, existing.status)
+            return _already_marked_response(existing.status)
 
         # ===== VALIDATE IMAGE =====
         if not captured_file:
-            print("❌ No image")
+            logger.info("Mark rejected user=%s session=%s: no image", username, session_id)
             return JsonResponse({
                 'error': 'Please capture your photo.'
             }, status=400)
         
-        print(f"\n📸 Image: {captured_file.name} ({captured_file.size / 1024:.2f} KB)")
+        logger.debug("Selfie %s (%d bytes)", captured_file.name, captured_file.size)
 
         # ===== VERIFY GPS (Optional) =====
         if lat != 0 and lng != 0:
-            print(f"\n📍 GPS Check:")
-            print(f"  - Student: ({lat}, {lng})")
-            print(f"  - Class: ({session.latitude}, {session.longitude})")
-            print(f"  - Radius: {session.radius_meters}m")
-            
-            if not is_within_radius(
-                (lat, lng), 
-                (session.latitude, session.longitude), 
-                session.radius_meters
-            ):
-                print("❌ Too far from class")
+            if not Geofence.for_session(session).contains(lat, lng):
+                logger.info(
+                    "Mark rejected user=%s session=%s: (%s, %s) outside %sm of (%s, %s)",
+                    username, session_id, lat, lng,
+                    session.radius_meters, session.latitude, session.longitude
+                )
                 return JsonResponse({
                     'error': 'You are too far from the class location.'
                 }, status=400)
-            
-            print("✅ GPS OK")
-
-        # ===== CREATE RECORD =====
-        print(f"\n💾 Creating record...")
-        record = AttendanceRecord.objects.create(
-            session=session,
-            student=request.user,
-            captured_image=captured_file,
-            gps_lat=lat if lat != 0 else None,
-            gps_long=lng if lng != 0 else None,
-            status='PENDING'
-        )
-        print(f"✅ Record ID: {record.id}")
 
         # ===== GET REFERENCE IMAGE =====
-        ref_path = None
-        
-        if hasattr(request.user, 'reference_image') and request.user.reference_image:
-            ref_path = request.user.reference_image.path
-            print(f"\n📁 Reference: reference_image")
-        elif hasattr(request.user, 'profile_image') and request.user.profile_image:
-            ref_path = request.user.profile_image.path
-            print(f"\n📁 Reference: profile_image")
+        reference = get_reference_image(request.user)
         
-        if not ref_path:
-            print("❌ No reference image")
-            record.delete()
+        if not reference:
+            logger.info("Mark rejected user=%s session=%s: no reference image", username, session_id)
             return JsonResponse({
                 'error': 'No profile photo found. Please upload one in settings.'
             }, status=400)
 
+        logger.debug("Reference image %s", reference.name)
+
+        # Stored encoding; recomputed on the service/pool only if missing or stale
+        try:
+            with stage('reference'):
+                known_encoding = get_reference_encoding(request.user, refresh=refresh_reference_encoding)
+        except VerificationBusy as e:
+            logger.warning("Verification queue full, asking %s to retry in %ss", username, e.retry_after)
+            return _verification_busy_response(e.retry_after)
+        except VerificationTimeout as e:
+            logger.warning("%s (user=%s session=%s)", e, username, session_id)
+            return JsonResponse({
+                'error': 'Face verification timed out. Please try again.'
+            }, status=504)
+
+        if known_encoding is None and face_encoding_checked(request.user):
+            # Recorded as faceless (just now or earlier): no point detecting again
+            logger.info("Mark rejected user=%s session=%s: no usable face in reference", username, session_id)
+            return JsonResponse({
+                'error': 'No single clear face found in your profile photo. Please update it.'
+            }, status=400)
+
+        # The selfie is verified straight from memory (cv2.imdecode);
+        # it is only written to storage once the record is kept
+        image_bytes = captured_file.read()
+
+        # ===== ASYNC MODE: queue and return a job ID =====
+        if async_mode:
+            try:
+                with stage('db'):
+                    record = AttendanceRecord.objects.create(
+                        session=session,
+                        student=request.user,
+                        captured_image=ContentFile(image_bytes, name=captured_file.name),
+                        gps_lat=lat if lat != 0 else None,
+                        gps_long=lng if lng != 0 else None,
+                        status='PENDING'
+                    )
+            except IntegrityError:
+                return _already_marked_response()
+            adjust_session_counters(session.id, pending=1)
+            invalidate_student_dashboards([request.user.id])
+
+            try:
+                future = submit_face_check(
+                    reference.path,
+                    image_bytes,
+                    threshold=0.5,
+                    known_encoding=known_encoding
+                )
+            except VerificationBusy as e:
+                logger.warning("Verification queue full, asking %s to retry in %ss", username, e.retry_after)
+                record.delete()
+                record.captured_image.delete(save=False)
+                adjust_session_counters(session.id, pending=-1)
+                invalidate_student_dashboards([request.user.id])
+                return _verification_busy_response(e.retry_after)
+
+            watch_pending_verification(record.id, future)
+            logger.info("Queued verification job %s user=%s session=%s", record.id, username, session_id)
+
+            return JsonResponse({
+                'success': True,
+                'pending': True,
+                'job_id': record.id,
+                'status_url': reverse('attendance_job_status', args=[record.id]),
+                'message': 'Photo received. Verifying your face...'
+            }, status=202)
+
         # ===== FACE VERIFICATION =====
-        print(f"\n🤖 Face Verification...")
           
-        result = check_face_match(
-            ref_path, 
-            record.captured_image.path, 
-            threshold=0.5
-        )
+        # Runs in the face service (or the verification pool), not in this request worker
+        try:
+            with stage('verify'):
+                result = run_face_check(
+                    reference.path,
+                    image_bytes,
+                    threshold=0.5,
+                    known_encoding=known_encoding
+                )
+            merge_timings(result.get('timings'))
+        except VerificationBusy as e:
+            logger.warning("Verification queue full, asking %s to retry in %ss", username, e.retry_after)
+            return _verification_busy_response(e.retry_after)
+        except VerificationTimeout as e:
+            logger.warning("%s (user=%s session=%s)", e, username, session_id)
+            return JsonResponse({
+                'error': 'Face verification timed out. Please try again.'
+            }, status=504)
         
-        print(f"\n📊 Result:")
-        print(f"  - Match: {result['match']}")
-        print(f"  - Confidence: {result['confidence']}%")
 
         # ===== PROCESS RESULT =====
         if result['match']:
-            # SUCCESS
-            record.status = 'present'
-            record.save()
+            # SUCCESS: persist the record (and the selfie) only now
+            try:
+                with stage('db'):
+                    record = AttendanceRecord.objects.create(
+                        session=session,
+                        student=request.user,
+                        captured_image=ContentFile(image_bytes, name=captured_file.name),
+                        gps_lat=lat if lat != 0 else None,
+                        gps_long=lng if lng != 0 else None,
+                        status='present'
+                    )
+            except IntegrityError:
+                # A concurrent request for the same session won the race
+                return _already_marked_response()
             
-            print(f"\n✅ ATTENDANCE MARKED")
+            with stage('db'):
+                record_marked_present(request.user.id, session, record.timestamp)
+                adjust_session_counters(session.id, present=1)
+                invalidate_student_dashboards([request.user.id])
+            logger.info(
+                "Attendance marked record=%s user=%s session=%s confidence=%s",
+                record.id, username, session_id, result['confidence']
+            )
             
             return JsonResponse({
                 'success': True,
@@ -263,9 +380,11 @@ def verify_my_face(request):
             })
         
         else:
-            # FAILED
-            print(f"\n❌ VERIFICATION FAILED")
-            record.delete()
+            # FAILED: nothing was written
+            logger.info(
+                "Verification failed user=%s session=%s confidence=%s",
+                username, session_id, result['confidence']
+            )
             
             return JsonResponse({
                 'success': False,
@@ -277,33 +396,206 @@ def verify_my_face(request):
             }, status=400)
 
     except ValueError as e:
-        print(f"\n❌ ValueError: {e}")
+        logger.info("Invalid mark request from %s: %s", username, e)
         return JsonResponse({'error': 'Invalid data format'}, status=400)
     
     except Exception as e:
-        print(f"\n❌ ERROR: {type(e).__name__}: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Mark attendance failed for %s", username)
         
         return JsonResponse({
             'error': 'Server error. Please try again.',
             'technical_details': str(e)
         }, status=500)
-    
-    finally:
-        print(f"\n{'='*60}\n") 
+
+
+@csrf_exempt
+@instrumented('kiosk_identify')
+def kiosk_identify(request, session_id):
+    """
+    Kiosk / classroom-camera attendance (1:N identification)
+    A device logged in as the session's teacher posts one face image; the student
+    is identified against the stored encodings and marked present.
+    Optional POST 'department' limits the search to that department's students.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid Method'}, status=405)
+
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Session expired. Please login again.'}, status=401)
+
+    session = AttendanceSession.objects.filter(id=session_id, teacher=request.user).select_related('subject').first()
+    if session is None:
+        return JsonResponse({'error': 'Session not found'}, status=404)
+    if not session.is_active:
+        return JsonResponse({'error': 'This class session has ended.'}, status=400)
+
+    captured_file = request.FILES.get('captured_image')
+    if not captured_file:
+        return JsonResponse({'error': 'Please capture a photo.'}, status=400)
+    image_bytes = captured_file.read()
+
+    try:
+        with stage('verify'):
+            encoding, error = run_face_encode(image_bytes)
+    except VerificationBusy as e:
+        return _verification_busy_response(e.retry_after)
+    except VerificationTimeout:
+        return JsonResponse({'error': 'Face identification timed out. Please try again.'}, status=504)
+
+    if encoding is None:
+        return JsonResponse({'success': False, 'error': error}, status=400)
+
+    department = request.POST.get('department')
+    with stage('search'):
+        matches = get_face_index().search(
+            encoding,
+            partition=department if department else ALL_PARTITIONS,
+            k=3,
+            threshold=getattr(settings, 'FACE_IDENTIFY_THRESHOLD', 0.5)
+        )
+    if not matches:
+        return JsonResponse({'success': False, 'error': 'Face not recognised. Please try again.'}, status=404)
+
+    student_id, distance = matches[0]
+    candidates = [{'student_id': sid, 'distance': round(d, 4)} for sid, d in matches]
+
+    with stage('db'):
+        student = User.objects.get(pk=student_id)
+        try:
+            record, created = AttendanceRecord.objects.get_or_create(
+                session=session,
+                student=student,
+                defaults={
+                    'captured_image': ContentFile(image_bytes, name=captured_file.name),
+                    'status': 'present',
+                }
+            )
+        except IntegrityError:
+            record, created = AttendanceRecord.objects.get(session=session, student=student), False
+
+        if created:
+            record_marked_present(student.id, session, record.timestamp)
+            adjust_session_counters(session.id, present=1)
+            invalidate_student_dashboards([student.id])
+
+    return JsonResponse({
+        'success': True,
+        'already_marked': not created,
+        'student': {
+            'id': student.id,
+            'roll_number': student.student_id,
+            'name': student.get_full_name() or student.username,
+        },
+        'status': record.status,
+        'confidence': round(max(0.0, (1 - distance) * 100), 2),
+        'candidates': candidates,
+    })
+
+
+@login_required
+@instrumented('group_photo')
+def group_photo_attendance(request, session_id):
+    """
+    Mark a whole class from one classroom photo
+    Every face in the photo is detected and encoded in one pass, matched one-to-one
+    against the enrolled student encodings, and the matched students are marked
+    present with a single bulk_create.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid Method'}, status=405)
+
+    session = get_object_or_404(AttendanceSession, id=session_id)
+    if session.teacher != request.user:
+        return JsonResponse({'error': 'Not your session'}, status=403)
+    if not session.is_active:
+        return JsonResponse({'error': 'This class session has ended.'}, status=400)
+
+    photo = request.FILES.get('group_photo')
+    if not photo:
+        return JsonResponse({'error': 'Please upload a classroom photo.'}, status=400)
+
+    try:
+        with stage('verify'):
+            locations, encodings = get_verification_pool().run(
+                encode_group_photo,
+                photo.read(),
+                timeout=getattr(settings, 'FACE_GROUP_TIMEOUT', 120)
+            )
+    except VerificationBusy as e:
+        return _verification_busy_response(e.retry_after)
+    except VerificationTimeout:
+        return JsonResponse({'error': 'Processing the photo took too long. Please try a smaller image.'}, status=504)
+
+    department = request.POST.get('department')
+    with stage('search'):
+        assigned = get_face_index().assign(
+            encodings,
+            partition=department if department else ALL_PARTITIONS,
+            threshold=getattr(settings, 'FACE_IDENTIFY_THRESHOLD', 0.5)
+        )
+
+    with stage('db'):
+        already_marked = set(
+            AttendanceRecord.objects.filter(session=session).values_list('student_id', flat=True)
+        )
+        new_records = [
+            AttendanceRecord(session=session, student_id=student_id, status='present')
+            for _, student_id, _ in assigned
+            if student_id not in already_marked
+        ]
+        AttendanceRecord.objects.bulk_create(new_records, ignore_conflicts=True)
+        # bulk_create may have skipped conflicting rows: recount instead of adding
+        if new_records:
+            student_ids = [r.student_id for r in new_records]
+            recount_student_summaries(session, student_ids)
+            reconcile_session_counters(session.id)
+            invalidate_student_dashboards(student_ids)
+
+    logger.info(
+        "Group photo session=%s: %d faces, %d identified, %d newly marked",
+        session.id, len(locations), len(assigned), len(new_records)
+    )
+
+    return JsonResponse({
+        'success': True,
+        'faces_detected': len(locations),
+        'identified': len(assigned),
+        'marked': len(new_records),
+        'already_marked': len(assigned) - len(new_records),
+        'unidentified': len(locations) - len(assigned),
+    })
+
+
+def attendance_job_status(request, job_id):
+    """
+    Poll the result of an async attendance marking job
+    Returns status 'pending', 'present' or 'rejected'
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Session expired. Please login again.'}, status=401)
+
+    status = get_job_status(job_id, request.user)
+    if status is None:
+        return JsonResponse({'error': 'Job not found'}, status=404)
+    return JsonResponse(status)
+
+
+def metrics(request):
+    """Prometheus scrape endpoint; only answers METRICS_ALLOWED_IPS (localhost by default)"""
+    if request.META.get('REMOTE_ADDR') not in getattr(settings, 'METRICS_ALLOWED_IPS', ('127.0.0.1', '::1')):
+        return HttpResponse(status=404)
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 
 # apps/attendance/views.py - Add these new views
 
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse
+from django.http import HttpResponse, FileResponse, StreamingHttpResponse
 from django.db.models import Count, Q
 from apps.accounts.models import User, Subject
 from apps.attendance.models import AttendanceSession, AttendanceRecord
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from apps.attendance.reports import subject_attendance_report, build_register
 from datetime import datetime
 
 @login_required
@@ -335,77 +627,8 @@ def attendance_calculator(request):
             'stats': {}
         })
     
-    # Get all sessions for this subject by this faculty
-    all_sessions = AttendanceSession.objects.filter(
-        teacher=request.user,
-        subject=selected_subject
-    ).order_by('start_time')
-    
-    total_sessions = all_sessions.count()
-    
-    # Get all students who have attended at least once (or get from enrollment if you have it)
-    # For now, we'll get unique students from attendance records
-    # Note: Use 'attendancerecord' (lowercase) - the related_name from AttendanceRecord model
-    students_with_records = User.objects.filter(
-        user_type='student',
-        attendancerecord__session__in=all_sessions
-    ).distinct().order_by('student_id')
-    
-    # Calculate attendance for each student
-    attendance_data = []
-    
-    for student in students_with_records:
-        # Count present days
-        present_count = AttendanceRecord.objects.filter(
-            student=student,
-            session__in=all_sessions,
-            status='present'
-        ).count()
-        
-        # Count total marked (present + absent + pending)
-        total_marked = AttendanceRecord.objects.filter(
-            student=student,
-            session__in=all_sessions
-        ).count()
-        
-        # Calculate percentage based on total sessions
-        if total_sessions > 0:
-            percentage = (present_count / total_sessions) * 100
-        else:
-            percentage = 0
-        
-        attendance_data.append({
-            'student': student,
-            'roll_number': student.student_id or 'N/A',
-            'name': student.get_full_name() or student.username,
-            'total_days': total_sessions,
-            'present_days': present_count,
-            'absent_days': total_sessions - present_count,
-            'percentage': round(percentage, 2)
-        })
-    
-    # Sort by roll number
-    attendance_data.sort(key=lambda x: x['roll_number'])
-    
-    # Calculate overall statistics
-    if attendance_data:
-        total_students = len(attendance_data)
-        avg_attendance = sum(d['percentage'] for d in attendance_data) / total_students
-        students_above_75 = sum(1 for d in attendance_data if d['percentage'] >= 75)
-        students_below_75 = total_students - students_above_75
-    else:
-        total_students = 0
-        avg_attendance = 0
-        students_above_75 = 0
-        students_below_75 = 0
-    
-    stats = {
-        'total_students': total_students,
-        'total_sessions': total_sessions,
-        'avg_attendance': round(avg_attendance, 2),
-        'students_above_75': students_above_75,
-        'students_below_75': students_below_75
-    }
+    # Per-student totals from one grouped query (see reports.py)
+    total_sessions, attendance_data, stats = subject_attendance_report(request.user, selected_subject)
     
     return render(request, 'attendance_calculator.html', {
         'subjects': subjects,
@@ -419,7 +642,13 @@ def attendance_calculator(request):
 def download_attendance_excel(request):
     """
     Download attendance data as Excel file
+    ?stream=1 streams a write-only workbook (use for large, department-wide exports)
     """
+    # openpyxl is imported here so that only export requests load it
+    import openpyxl
+    from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+    from apps.attendance.exports import attendance_workbook_file, XLSX_CONTENT_TYPE
+
     if request.user.user_type != 'staff':
         return redirect('dashboard')
     
@@ -430,46 +659,17 @@ def download_attendance_excel(request):
     
     selected_subject = get_object_or_404(Subject, id=subject_id, staff=request.user)
     
-    # Get all sessions for this subject
-    all_sessions = AttendanceSession.objects.filter(
-        teacher=request.user,
-        subject=selected_subject
-    ).order_by('start_time')
-    
-    total_sessions = all_sessions.count()
-    
-    # Get students
-    # Note: Use 'attendancerecord' (lowercase, no underscore)
-    students_with_records = User.objects.filter(
-        user_type='student',
-        attendancerecord__session__in=all_sessions
-    ).distinct().order_by('student_id')
-    
-    # Calculate attendance data
-    attendance_data = []
-    for student in students_with_records:
-        present_count = AttendanceRecord.objects.filter(
-            student=student,
-            session__in=all_sessions,
-            status='present'
-        ).count()
-        
-        if total_sessions > 0:
-            percentage = (present_count / total_sessions) * 100
-        else:
-            percentage = 0
-        
-        attendance_data.append({
-            'roll_number': student.student_id or 'N/A',
-            'name': student.get_full_name() or student.username,
-            'email': student.email,
-            'total_days': total_sessions,
-            'present_days': present_count,
-            'absent_days': total_sessions - present_count,
-            'percentage': round(percentage, 2)
-        })
+    # Streaming mode: write-only workbook fed from a DB cursor, flat memory
+    if request.GET.get('stream') == '1':
+        filename = f"Attendance_{selected_subject.code}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        return FileResponse(
+            attendance_workbook_file(request.user, selected_subject),
+            as_attachment=True,
+            filename=filename,
+            content_type=XLSX_CONTENT_TYPE
+        )
     
-    attendance_data.sort(key=lambda x: x['roll_number'])
+    total_sessions, attendance_data, stats = subject_attendance_report(request.user, selected_subject)
     
     # Create Excel workbook
     wb = openpyxl.Workbook()
@@ -568,19 +768,17 @@ def download_attendance_excel(request):
     ws.cell(row=summary_row, column=1, value="Summary Statistics").font = Font(bold=True, size=12)
     
     ws.cell(row=summary_row + 1, column=1, value="Total Students:")
-    ws.cell(row=summary_row + 1, column=2, value=len(attendance_data))
+    ws.cell(row=summary_row + 1, column=2, value=stats['total_students'])
     
     ws.cell(row=summary_row + 2, column=1, value="Students Above 75%:")
-    above_75 = sum(1 for d in attendance_data if d['percentage'] >= 75)
-    ws.cell(row=summary_row + 2, column=2, value=above_75)
+    ws.cell(row=summary_row + 2, column=2, value=stats['students_above_75'])
     
     ws.cell(row=summary_row + 3, column=1, value="Students Below 75%:")
-    ws.cell(row=summary_row + 3, column=2, value=len(attendance_data) - above_75)
+    ws.cell(row=summary_row + 3, column=2, value=stats['students_below_75'])
     
     if attendance_data:
-        avg_percentage = sum(d['percentage'] for d in attendance_data) / len(attendance_data)
         ws.cell(row=summary_row + 4, column=1, value="Average Attendance:")
-        ws.cell(row=summary_row + 4, column=2, value=f"{avg_percentage:.2f}%")
+        ws.cell(row=summary_row + 4, column=2, value=f"{stats['avg_attendance']:.2f}%")
     
     # Prepare response
     response = HttpResponse(
@@ -591,4 +789,37 @@ def download_attendance_excel(request):
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
     
     wb.save(response)
-    return response
\ No newline at end of file
+    return response
+
+
+@login_required
+def download_attendance_register(request):
+    """
+    Download the attendance register (students x sessions, P/A marks)
+    ?format=csv (default) or ?format=xlsx
+    """
+    from apps.attendance.exports import register_workbook_file, iter_register_csv, XLSX_CONTENT_TYPE
+
+    if request.user.user_type != 'staff':
+        return redirect('dashboard')
+    
+    subject_id = request.GET.get('subject')
+    
+    if not subject_id:
+        return HttpResponse("Subject ID required", status=400)
+    
+    selected_subject = get_object_or_404(Subject, id=subject_id, staff=request.user)
+    register = build_register(request.user, selected_subject)
+    
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    if request.GET.get('format') == 'xlsx':
+        return FileResponse(
+            register_workbook_file(register, selected_subject),
+            as_attachment=True,
+            filename=f"Register_{selected_subject.code}_{stamp}.xlsx",
+            content_type=XLSX_CONTENT_TYPE
+        )
+    
+    response = StreamingHttpResponse(iter_register_csv(register), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="Register_{selected_subject.code}_{stamp}.csv"'
+    return response
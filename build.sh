@@ -13,4 +13,5 @@ echo "from django.contrib.auth import get_user_model; User = get_user_model(); U
 
 echo "--- Starting Server ---"
 # We use 'exec' to allow gunicorn to handle signals properly
-exec gunicorn smart_attendance.wsgi:application --bind 0.0.0.0:8000
\ No newline at end of file
+# Workers, threads and model preloading are configured in gunicorn.conf.py
+exec gunicorn -c gunicorn.conf.py smart_attendance.wsgi:application
\ No newline at end of file
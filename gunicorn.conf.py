@@ -0,0 +1,41 @@
+# gunicorn.conf.py - used by build.sh (gunicorn -c gunicorn.conf.py ...)
+import gc
+import os
+
+# Load Django once in the master. AttendanceConfig.ready() then loads and warms
+# the dlib models there, and every forked worker shares them copy-on-write
+# instead of paying the load on its first attendance mark.
+preload_app = True
+os.environ.setdefault('FACE_PRELOAD_MODELS', '1')
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+# gthread workers: request threads wait on the face verification pool
+# instead of each sync worker running dlib itself
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+
+
+def pre_fork(server, worker):
+    # Keep the preloaded objects out of the workers' garbage collections, which
+    # would otherwise write to (and so copy) every page holding them
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Never reuse an executor (or its pipes) created in the master
+    from apps.attendance.verification import reset_verification_pool
+    from apps.attendance.face_service import reset_face_service_client
+    reset_verification_pool(shutdown=False)
+    reset_face_service_client()
+
+
+def post_worker_init(worker):
+    # Fork the verification processes from this already warm worker now,
+    # not on the first request
+    from apps.attendance.verification import get_verification_pool
+    try:
+        get_verification_pool().start()
+    except Exception as e:
+        worker.log.warning("Verification pool failed to start: %s", e)
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 import dj_database_url
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -160,6 +161,115 @@ REST_FRAMEWORK = {
 
 
 
+# Face verification pool (apps/attendance/verification.py)
+# Each web worker process owns its own pool of FACE_VERIFY_WORKERS processes;
+# set FACE_VERIFY_WORKERS=0 to verify inline in the request thread.
+FACE_VERIFY_WORKERS = int(os.environ.get('FACE_VERIFY_WORKERS', 2))
+FACE_VERIFY_QUEUE_DEPTH = int(os.environ.get('FACE_VERIFY_QUEUE_DEPTH', 8))
+FACE_VERIFY_TIMEOUT = float(os.environ.get('FACE_VERIFY_TIMEOUT', 20))
+FACE_VERIFY_RETRY_AFTER = int(os.environ.get('FACE_VERIFY_RETRY_AFTER', 5))
+# Selfies are searched for faces at this size (longest side, px; 0 = full resolution)
+FACE_DETECT_MAX_DIM = int(os.environ.get('FACE_DETECT_MAX_DIM', 640))
+FACE_DETECT_UPSAMPLE = int(os.environ.get('FACE_DETECT_UPSAMPLE', 0))
+# Uploaded selfies at least this large (longest side, px) are decoded at half size (0 = never)
+FACE_DECODE_REDUCED_MIN_DIM = int(os.environ.get('FACE_DECODE_REDUCED_MIN_DIM', 1600))
+# 1:N identification (kiosk / group photo): max distance and in-memory index refresh interval (s)
+FACE_IDENTIFY_THRESHOLD = float(os.environ.get('FACE_IDENTIFY_THRESHOLD', 0.5))
+FACE_INDEX_MAX_AGE = int(os.environ.get('FACE_INDEX_MAX_AGE', 300))
+# Group photos are searched in overlapping tiles (px) and may take longer than a selfie (s)
+FACE_GROUP_TILE = int(os.environ.get('FACE_GROUP_TILE', 1024))
+FACE_GROUP_TILE_OVERLAP = int(os.environ.get('FACE_GROUP_TILE_OVERLAP', 160))
+FACE_GROUP_TIMEOUT = float(os.environ.get('FACE_GROUP_TIMEOUT', 120))
+# Store marks as PENDING and verify in the background (clients poll the job status)
+ATTENDANCE_ASYNC_MARKING = os.environ.get('ATTENDANCE_ASYNC_MARKING', '0') == '1'
+# Seconds before a PENDING mark whose verification has not finished is rejected
+ATTENDANCE_PENDING_TIMEOUT = int(os.environ.get('ATTENDANCE_PENDING_TIMEOUT', 60))
+# Load and warm the dlib models when Django starts (gunicorn.conf.py turns this on,
+# so the master preloads them once); optional face photo to warm up on
+FACE_PRELOAD_MODELS = os.environ.get('FACE_PRELOAD_MODELS', '0') == '1'
+FACE_WARMUP_IMAGE = os.environ.get('FACE_WARMUP_IMAGE', '')
+# Standalone face verification service (manage.py run_face_verifier), e.g.
+# 'unix:/run/face-verifier.sock' or '127.0.0.1:8765'. Unset: verify in-process.
+# The service reads the reference photos itself, so it needs MEDIA_ROOT too.
+FACE_VERIFIER_ADDRESS = os.environ.get('FACE_VERIFIER_ADDRESS', '')
+FACE_VERIFIER_CONNECT_TIMEOUT = float(os.environ.get('FACE_VERIFIER_CONNECT_TIMEOUT', 1.0))
+# Idle connections kept per web worker process (also its concurrent async jobs)
+FACE_VERIFIER_POOL_SIZE = int(os.environ.get('FACE_VERIFIER_POOL_SIZE', 8))
+# After a failed connect, verify in-process for this many seconds before retrying
+FACE_VERIFIER_RETRY_DOWN = int(os.environ.get('FACE_VERIFIER_RETRY_DOWN', 30))
+# Live monitor feed (apps/attendance/feeds.py): seconds between polls, seconds
+# before a stream is closed (the browser reconnects), seconds between keepalives
+ATTENDANCE_FEED_POLL_INTERVAL = float(os.environ.get('ATTENDANCE_FEED_POLL_INTERVAL', 2))
+ATTENDANCE_FEED_MAX_SECONDS = int(os.environ.get('ATTENDANCE_FEED_MAX_SECONDS', 300))
+ATTENDANCE_FEED_HEARTBEAT = int(os.environ.get('ATTENDANCE_FEED_HEARTBEAT', 15))
+# Cache shared by all worker processes, for the session counters
+# (apps/attendance/counters.py) and dashboard fragments (dashboard.py). The
+# default file cache is shared by the workers of one host, which serialize
+# their counter updates with a lock file in it; run several hosts against
+# Redis or Memcached instead (atomic incr). With other backends the session
+# counters are counted from the records. E.g.
+# ATTENDANCE_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# ATTENDANCE_CACHE_LOCATION=redis://127.0.0.1:6379/1
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'attendance': {
+        'BACKEND': os.environ.get('ATTENDANCE_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get(
+            'ATTENDANCE_CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'smart_attendance_cache')
+        ),
+    },
+}
+# Seconds before cached counters are recounted from the records
+ATTENDANCE_COUNTER_TTL = int(os.environ.get('ATTENDANCE_COUNTER_TTL', 300))
+# Student dashboard fragment cache (apps/attendance/dashboard.py): seconds the
+# shared active-session list and each student's fragments are kept
+DASHBOARD_ACTIVE_SESSIONS_TTL = int(os.environ.get('DASHBOARD_ACTIVE_SESSIONS_TTL', 10))
+DASHBOARD_STUDENT_TTL = int(os.environ.get('DASHBOARD_STUDENT_TTL', 600))
+# Clients allowed to scrape /metrics (comma separated IPs)
+METRICS_ALLOWED_IPS = os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+
+
+# Logging: app loggers write through a queue (apps/attendance/log.py), so request
+# threads never format or write log lines themselves. LOG_LEVEL=DEBUG shows the
+# per-step face verification details; the per-module levels can be raised separately.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'standard': {
+            'format': '%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s',
+        },
+    },
+    'handlers': {
+        'queue': {
+            '()': 'apps.attendance.log.QueueLogHandler',
+            'stream': 'ext://sys.stdout',
+            'formatter': 'standard',
+        },
+    },
+    'loggers': {
+        'apps': {
+            'handlers': ['queue'],
+            'level': LOG_LEVEL,
+            'propagate': False,
+        },
+        'apps.attendance.utils': {
+            'level': os.environ.get('FACE_LOG_LEVEL', LOG_LEVEL),
+        },
+        'apps.attendance.views': {
+            'level': os.environ.get('ATTENDANCE_LOG_LEVEL', LOG_LEVEL),
+        },
+        'django': {
+            'handlers': ['queue'],
+            'level': os.environ.get('DJANGO_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
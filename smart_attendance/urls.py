@@ -4,6 +4,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 
 from apps.attendance import views as attendance_views
+from apps.attendance import feeds as attendance_feeds
 from apps.accounts import views as account_views
 from profiles import views as profile_views    
 urlpatterns = [
@@ -15,15 +16,22 @@ urlpatterns = [
     path('login/', account_views.login_view, name='login'),
     path('logout/', account_views.logout_view, name='logout'),
     path('dashboard/', account_views.dashboard, name='dashboard'),
+    path('api/calendar/', account_views.attendance_calendar, name='attendance_calendar_api'),
     
     # Teacher Attendance
     path('select_class/', attendance_views.select_class, name='select_class'),
     path('create_session/<int:subject_id>/', attendance_views.create_session, name='create_session'),
     path('monitor_session/<int:session_id>/', attendance_views.monitor_session, name='monitor_session'),
     path('end_session/<int:session_id>/', attendance_views.end_session, name='end_session'),
+    path('monitor_session/<int:session_id>/feed/', attendance_feeds.session_feed, name='session_feed'),
+    path('monitor_session/<int:session_id>/group-photo/', attendance_views.group_photo_attendance, name='group_photo_attendance'),
 
     # Student Attendance API (Matches your JS fetch call)
     path('api/mark-attendance/', attendance_views.verify_my_face, name='mark_attendance_api'),
+    path('api/mark-attendance/<int:job_id>/', attendance_views.attendance_job_status, name='attendance_job_status'),
+    path('api/sessions/<int:session_id>/records/', attendance_feeds.session_records, name='session_records_api'),
+    path('api/kiosk/<int:session_id>/identify/', attendance_views.kiosk_identify, name='kiosk_identify'),
+    path('metrics', attendance_views.metrics, name='metrics'),
 
 
 
@@ -33,6 +41,7 @@ urlpatterns = [
 
     path('attendance/calculator/', attendance_views.attendance_calculator, name='attendance_calculator'),
 path('attendance/download-excel/', attendance_views.download_attendance_excel, name='download_attendance_excel'),
+    path('attendance/register/', attendance_views.download_attendance_register, name='download_attendance_register'),
 ] 
 
 if settings.DEBUG: